@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from pydantic import BaseModel
+
+from src.core.config import settings
+from src.core.checkpoint import SqliteCheckpointer, new_run_id
+from src.core.graph import SharedServices
+from src.components.rewriter import ScriptRewriter
+from src.components.scene_cache import SceneCache
+from src.main import load_script, print_reports, run_storyboard
+from src.utils.encoding import PROFILES
+from src.utils.logger import logger
+
+class BatchJob(BaseModel):
+    """
+    批量中的一个任务 (一个故事板或草稿)，对应清单文件中的一项
+    """
+    job_id: str
+    script: str
+    output_dir: str
+    run_id: str
+    status: str = "pending"             # pending | running | done | failed
+    scenes: int = 0
+    seconds: float = 0.0
+    movie_path: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchManifest(BaseModel):
+    batch_id: str
+    jobs: List[BatchJob]
+
+def job_ids(scripts: Sequence[str]) -> List[str]:
+    """按文件名生成任务 ID，同名文件依次加后缀 (_2, _3 ...)"""
+    seen: Dict[str, int] = {}
+    ids = []
+    for script in scripts:
+        stem = Path(script).stem
+        seen[stem] = seen.get(stem, 0) + 1
+        ids.append(stem if seen[stem] == 1 else f"{stem}_{seen[stem]}")
+    return ids
+
+def manifest_path(batch_id: str) -> Path:
+    return settings.OUTPUT_DIR / "batch" / f"{batch_id}.json"
+
+def _save_manifest(manifest: BatchManifest):
+    path = manifest_path(manifest.batch_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(manifest.model_dump_json(indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+def new_manifest(scripts: Sequence[str], batch_id: Optional[str] = None) -> BatchManifest:
+    batch_id = batch_id or new_run_id()
+    return BatchManifest(batch_id=batch_id, jobs=[
+        BatchJob(
+            job_id=job_id,
+            script=str(script),
+            output_dir=str(settings.OUTPUT_DIR / "jobs" / job_id),
+            run_id=f"{batch_id}_{job_id}"
+        )
+        for script, job_id in zip(scripts, job_ids(scripts))
+    ])
+
+async def run_batch(
+    manifest: BatchManifest,
+    max_jobs: Optional[int] = None,
+    profile: Optional[str] = None,
+    resume: bool = False
+) -> BatchManifest:
+    """
+    在同一个进程、同一个事件循环中运行多个故事板:
+    - 共享 LLM 客户端 / lib/ 上下文 / Lint / Critic / TTS 与场景缓存 (SharedServices + SceneCache)
+    - 渲染 / LLM / Lint 名额来自全局调度器 (RENDER_CONCURRENCY 等是整个批次的上限)，任务之间按公平份额分配
+    - 每个任务写入自己的运行目录 OUTPUT_DIR/jobs/<job_id>/
+    最多 max_jobs (默认 BATCH_CONCURRENCY) 个任务同时进行，每个任务内部的场景仍全部并行
+    """
+    services = SharedServices()
+    scene_cache = SceneCache() if settings.SCENE_CACHE_ENABLED else None
+    checkpointer = None
+    if settings.CHECKPOINT_ENABLED or resume:
+        checkpointer = SqliteCheckpointer(settings.OUTPUT_DIR / "checkpoints.sqlite")
+    rewriter: Optional[ScriptRewriter] = None
+    gate = asyncio.Semaphore(max(1, max_jobs or settings.BATCH_CONCURRENCY))
+    _save_manifest(manifest)
+
+    async def run(job: BatchJob):
+        nonlocal rewriter
+        async with gate:
+            job.status, job.error = "running", None
+            _save_manifest(manifest)
+            started = time.monotonic()
+            output_dir = Path(job.output_dir)
+            try:
+                scenes = checkpointer.run_value(job.run_id, "scenes") if resume and checkpointer else None
+                resuming = bool(scenes)
+                if not scenes:
+                    if Path(job.script).suffix.lower() in (".md", ".txt") and rewriter is None:
+                        rewriter = ScriptRewriter()
+                    scenes = await load_script(job.script, output_dir=output_dir, rewriter=rewriter)
+                job.scenes = len(scenes)
+                logger.info(f"📦 [Batch] {job.job_id}: {len(scenes)} scenes" + (" (resumed)" if resuming else ""))
+
+                job.movie_path = await run_storyboard(
+                    scenes, job.run_id,
+                    job_id=job.job_id,
+                    output_dir=output_dir,
+                    services=services,
+                    scene_cache=scene_cache,
+                    checkpointer=checkpointer,
+                    resume=resuming,
+                    profile=profile,
+                    dashboard=False
+                )
+                job.status = "done" if job.movie_path else "failed"
+            except Exception as e:
+                logger.error(f"❌ [Batch] {job.job_id} failed: {e}")
+                job.status, job.error = "failed", str(e)
+            job.seconds = round(time.monotonic() - started, 1)
+            logger.info(f"📦 [Batch] {job.job_id}: {job.status} in {job.seconds}s")
+            _save_manifest(manifest)
+
+    try:
+        await asyncio.gather(*(run(job) for job in manifest.jobs if job.status != "done"))
+    finally:
+        if checkpointer:
+            checkpointer.close()
+    return manifest
+
+async def async_main():
+    parser = argparse.ArgumentParser(description="Run many storyboards / drafts in one process with shared workers")
+    parser.add_argument("scripts", nargs="*", help="Storyboard JSON files or raw drafts (.md / .txt)")
+    parser.add_argument(
+        "--jobs", type=int, default=None,
+        help="Storyboards processed at the same time (default: settings.BATCH_CONCURRENCY)"
+    )
+    parser.add_argument(
+        "--profile", choices=list(PROFILES), default=None,
+        help="Encoding profile for assembly (default: settings.ENCODING_PROFILE)"
+    )
+    parser.add_argument(
+        "--resume", metavar="BATCH_ID", default=None,
+        help="Continue an interrupted batch; finished jobs are skipped, interrupted ones resume from their checkpoints"
+    )
+    args = parser.parse_args()
+    if not args.scripts and not args.resume:
+        parser.error("at least one script or --resume BATCH_ID is required")
+
+    if args.resume:
+        try:
+            manifest = BatchManifest.model_validate_json(manifest_path(args.resume).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError) as e:
+            logger.error(f"No batch manifest found for '{args.resume}': {e}")
+            return
+    else:
+        manifest = new_manifest(args.scripts)
+    logger.info(
+        f"📦 Batch {manifest.batch_id}: {len(manifest.jobs)} jobs "
+        f"(resume with python -m src.batch --resume {manifest.batch_id})"
+    )
+
+    await run_batch(manifest, max_jobs=args.jobs, profile=args.profile, resume=bool(args.resume))
+
+    for job in manifest.jobs:
+        marker = "✅" if job.status == "done" else "❌"
+        logger.info(f"   {marker} {job.job_id:<24} {job.scenes:>3} scenes  {job.seconds:>7.1f}s  {job.movie_path or job.error or ''}")
+    print_reports(manifest.batch_id)
+    logger.info(f"📝 Batch manifest: {manifest_path(manifest.batch_id)}")
+
+def main():
+    asyncio.run(async_main())
+
+if __name__ == "__main__":
+    main()
@@ -1,110 +1,314 @@
+import json
 import subprocess
 import os
+import threading
 from pathlib import Path
-from typing import List
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from src.core.models import RenderArtifact
 from src.utils.logger import logger
 from src.core.config import settings
+from src.utils import media_info
+from src.utils.media_info import MediaInfo
+from src.utils.audio_ops import is_canonical_audio
+from src.utils.encoding import EncodingProfile, Rendition, get_profile, get_renditions
+from src.utils.video_ops import TimelineClip, build_filtergraph, build_ladder_filtergraph
+from src.components.progressive import ProgressiveWriter
+from src.components.clip_library import ClipLibrary, ClipSpec
+from src.utils.hashing import file_digest, text_digest
+from src.utils.tracing import tracer
+
+# 片段编码逻辑变化时递增，使旧的 segments/manifest.json 全部失效
+SEGMENT_FORMAT_VERSION = 2
 
 class Assembler:
-    def __init__(self):
-        self.output_dir = settings.OUTPUT_DIR
-        self.output_dir.mkdir(exist_ok=True)
+    def __init__(self, profile: Optional[EncodingProfile] = None, output_dir: Optional[Path] = None):
+        # 运行目录 (批量模式下每个任务各自一个)，间隔片段库始终位于共享缓存目录
+        self.output_dir = Path(output_dir) if output_dir else settings.OUTPUT_DIR
+        # 编码档位 (preset/CRF/线程/GOP/音频码率)，默认取 settings.ENCODING_PROFILE
+        self.profile = profile or get_profile()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # 最近一次 assemble 中失败的片段: 序号 -> ffmpeg 错误输出
+        self.segment_errors: Dict[int, str] = {}
+        # 最近一次 assemble 中每个片段的处理方式: 序号 -> "copy" | "encode"
+        self.segment_modes: Dict[int, str] = {}
+        # 交付格式 (以第一个片段为准)，为 None 时所有片段都重新编码
+        self._target: Optional[MediaInfo] = None
+        self.progressive: Optional[ProgressiveWriter] = None
+        # 预编码的间隔片段库 (跨运行复用)
+        self.clips = ClipLibrary(settings.OUTPUT_DIR / "cache" / "clips")
 
     def assemble(self, artifacts: List[RenderArtifact], audio_paths: List[str], output_filename: str = "final_movie.mp4") -> str:
         logger.info("🎞️ [Assembler] Starting assembly...")
+
+        if settings.ASSEMBLY_ENGINE == "filtergraph":
+            try:
+                return self._assemble_filtergraph(artifacts, audio_paths, output_filename)
+            except Exception as e:
+                logger.warning(f"   ⚠️ Single-pass assembly failed, falling back to segments: {e}")
         
-        concat_list_path = self.output_dir / "concat_list.txt"
-        segment_paths = []
-        
-        # Prepare output directories
-        segments_dir = self.output_dir / "segments"
-        segments_dir.mkdir(parents=True, exist_ok=True)
-        
-        raw_clips_dir = self.output_dir / "raw_video_clips"
-        raw_clips_dir.mkdir(parents=True, exist_ok=True)
+        return self._assemble_segments(artifacts, audio_paths, output_filename)
 
-        for i, (art, audio) in enumerate(zip(artifacts, audio_paths)):
+    def _assemble_filtergraph(self, artifacts: List[RenderArtifact], audio_paths: List[str], output_filename: str) -> str:
+        """
+        单进程单次编码: 所有场景画面与音频作为输入，由一个 filter_complex 完成补齐、间隔/过渡与拼接
+        不产生中间片段文件
+        """
+        clips = []
+        for art, audio in zip(artifacts, audio_paths):
             if not art or not Path(art.video_path).exists():
                 continue
-            
-            segment_out = segments_dir / f"segment_{i:03d}.mp4"
-            
-            # === 步骤 A: 准备音频 (清洗为 WAV 以保证兼容性) ===
-            final_audio_input = None
-            temp_wav = None # 用于标记是否生成了临时文件
-            
-            # 只有当文件存在且大于 100 字节时才处理
-            if audio and Path(audio).exists() and os.path.getsize(audio) > 100:
-                temp_wav = self.output_dir / f"temp_audio_{i}.wav"
-                
-                # 转为标准 WAV
-                wav_cmd = [
-                    "ffmpeg", "-y", "-v", "quiet",
-                    "-i", str(audio),
-                    "-acodec", "pcm_s16le", "-ar", "44100", "-ac", "2",
-                    str(temp_wav)
-                ]
-                
-                try:
-                    subprocess.run(wav_cmd, check=True)
-                    final_audio_input = str(temp_wav)
-                except subprocess.CalledProcessError:
-                    logger.warning(f"   ⚠️ Audio cleaning failed for segment {i}, using original.")
-                    final_audio_input = str(audio)
-            
-            # === 步骤 B: Muxing (合并) ===
-            cmd = [
-                "ffmpeg", "-y", "-v", "error", # 减少日志输出，只显示错误
-                "-i", str(art.video_path)
-            ]
-            
-            if final_audio_input:
-                cmd.extend(["-i", final_audio_input])
+            video = media_info.probe(art.video_path)
+            has_audio = bool(audio and Path(audio).exists() and os.path.getsize(audio) > 100)
+            duration = media_info.probe_duration(audio) if has_audio else video.duration
+            clips.append(TimelineClip(
+                video_path=str(art.video_path),
+                audio_path=str(audio) if has_audio else None,
+                video_duration=video.duration,
+                duration=duration or video.duration
+            ))
+
+        if not clips:
+            raise ValueError("No valid clips to assemble.")
+
+        first = media_info.probe(clips[0].video_path)
+        transition = settings.ASSEMBLY_TRANSITION if settings.ASSEMBLY_TRANSITION != "none" else None
+        inputs, graph = build_filtergraph(
+            clips,
+            width=first.width or settings.VIDEO_WIDTH,
+            height=first.height or settings.VIDEO_HEIGHT,
+            fps=first.fps or 30.0,
+            spacer=settings.ASSEMBLY_SPACER_SECONDS,
+            transition=transition,
+            transition_duration=settings.ASSEMBLY_TRANSITION_SECONDS
+        )
+
+        output_path = self.output_dir / output_filename
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            *inputs,
+            "-filter_complex", graph,
+            "-map", "[outv]", "-map", "[outa]",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p",
+            *self.profile.video_args(first.fps or 30.0),
+            *self.profile.audio_args(),
+            "-movflags", "+faststart",
+            str(output_path)
+        ]
+        logger.info(f"   🎛️ Encoding {len(clips)} clips in a single pass...")
+        try:
+            with tracer.span("ffmpeg.filtergraph", "ffmpeg", clips=len(clips)):
+                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError((e.stderr or b"").decode(errors="replace").strip() or str(e)) from e
+
+        logger.info(f"✨ Final video saved to: {output_path}")
+        return str(output_path)
+
+    def _assemble_segments(self, artifacts: List[RenderArtifact], audio_paths: List[str], output_filename: str) -> str:
+        """逐片段编码 (并行) 后用 concat demuxer 无损拼接"""
+        self.begin(expected=len(artifacts))
+        for i, (art, audio) in enumerate(zip(artifacts, audio_paths)):
+            self.submit(i, art, audio)
+        return self.finish(output_filename)
+
+    # --- 流水线组装: 场景一完成就在后台合成片段，最后只剩拼接 ---
+    def begin(self, expected: Optional[int] = None):
+        """开始一次组装，expected 为预计的片段数 (用于确定并发数)"""
+        self.segments_dir = self.output_dir / "segments"
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+
+        self._target = None
+        self._target_source: Optional[str] = None
+        self._target_resolved = False
+        self._target_lock = threading.Lock()
+        self.segment_errors, self.segment_modes = {}, {}
+        self._futures: Dict[int, Future] = {}
+        # 增量组装: 输入 (画面/音频/编码参数) 未变化的片段直接复用
+        self._manifest_path = self.segments_dir / "manifest.json"
+        self._manifest = self._load_manifest(self._manifest_path) if settings.ASSEMBLY_INCREMENTAL else {}
+
+        # 渐进式输出 (HLS)，expected 即故事板场景数
+        self.progressive = None
+        if settings.PROGRESSIVE_OUTPUT and expected:
+            self.progressive = ProgressiveWriter(
+                expected, out_dir=self.output_dir / "progressive", spacer_factory=self._ensure_spacer
+            )
+
+        workers = self._worker_count(expected or os.cpu_count() or 1)
+        # ffmpeg 本身就是独立进程，线程池只负责等待子进程，不受 GIL 影响
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assembler")
+        logger.info(f"   ⚙️ Muxing segments with {workers} workers...")
+
+    def submit(self, index: int, artifact: Optional[RenderArtifact], audio_path: Optional[str]) -> Optional[Future]:
+        """提交一个场景 (index 为其在故事板中的位置，决定拼接顺序)，立即返回"""
+        if not artifact or not Path(artifact.video_path).exists():
+            self.skip(index)
+            return None
+        # 只有当文件存在且大于 100 字节时才使用音频
+        has_audio = bool(audio_path and Path(audio_path).exists() and os.path.getsize(audio_path) > 100)
+        if self._target_source is None and settings.ASSEMBLY_STREAM_COPY:
+            # 第一个到达的片段决定交付格式，此后保持不变 (探测与间隔片段编码在线程池中进行)
+            self._target_source = artifact.video_path
+
+        segment_out = self.segments_dir / f"segment_{index:03d}.mp4"
+        future = self._pool.submit(
+            self._build_segment, index, artifact.video_path, audio_path if has_audio else None, segment_out
+        )
+        self._futures[index] = future
+        return future
+
+    def finish(self, output_filename: str = "final_movie.mp4") -> str:
+        """等待所有片段完成，按场景顺序拼接为成片"""
+        done: Dict[int, Tuple[Path, str]] = {}
+        try:
+            for index in sorted(self._futures):
+                i, segment_out, error, digest, mode = self._futures[index].result()
+                # 合成方式由工作线程返回，只在这里 (调用方线程) 记录
+                if mode:
+                    self.segment_modes[i] = mode
+                if error:
+                    self.segment_errors[i] = error
+                else:
+                    done[i] = (segment_out, digest)
+        finally:
+            self._pool.shutdown(wait=True)
+
+        if self.progressive:
+            self.progressive.finalize()
+
+        if settings.ASSEMBLY_INCREMENTAL:
+            self._save_manifest(self._manifest_path, {
+                segment_out.name: {"digest": digest, "mode": self.segment_modes[i]}
+                for i, (segment_out, digest) in sorted(done.items())
+            })
+
+        reused = sum(1 for mode in self.segment_modes.values() if mode == "cached")
+        logger.info(f"   🧩 {len(done)} segments ready ({reused} unchanged, reused).")
+        # 按场景顺序拼接 (与完成顺序无关)
+        return self._concat_segments([str(done[i][0]) for i in sorted(done)], output_filename)
+
+    def skip(self, index: int):
+        """场景失败 (没有片段)，渐进式输出可以越过它继续追加后续场景"""
+        if self.progressive:
+            # 放到线程池中执行: 越过失败场景后可能需要转封装后续片段，不阻塞调用方 (事件循环)
+            self._pool.submit(self.progressive.add, index, None)
+
+    def cancel(self):
+        """放弃本次组装 (例如图执行失败)，不再启动排队中的片段"""
+        pool = getattr(self, "_pool", None)
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- 多档输出: 成片解码一次，split 后同时编码所有档位 ---
+    def render_ladder(self, source_path: str, renditions: Optional[List[Rendition]] = None) -> Path:
+        """
+        由成片生成输出阶梯 (默认 settings.RENDITION_LADDER)，单个 ffmpeg 进程完成全部档位
+        高于源分辨率的视频档位会被跳过 (不放大)。返回 renditions/manifest.json 路径
+        """
+        source = Path(source_path)
+        renditions = renditions if renditions is not None else get_renditions(settings.RENDITION_LADDER)
+        info = media_info.probe(source)
+        if info.height:
+            skipped = [r.name for r in renditions if r.kind == "video" and r.height > info.height]
+            if skipped:
+                logger.info(f"   ⏭️ Skipping renditions above source height {info.height}p: {', '.join(skipped)}")
+            renditions = [r for r in renditions if r.name not in skipped]
+        if not renditions:
+            raise ValueError("No renditions to produce.")
+
+        out_dir = self.output_dir / "renditions"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        graph, labels = build_ladder_filtergraph(renditions)
+
+        cmd = ["ffmpeg", "-y", "-v", "error", "-i", str(source), "-filter_complex", graph]
+        outputs = []
+        for r, label in zip(renditions, labels):
+            out_path = out_dir / f"{source.stem}_{r.name}.{r.extension}"
+            if r.kind == "gif":
+                cmd.extend(["-map", f"[{label}]", "-loop", "0", str(out_path)])
+            else:
+                profile = get_profile(r.profile)
                 cmd.extend([
-                    "-map", "0:v", "-map", "1:a",
-                    # 添加 tpad 滤镜：stop_mode=clone 表示克隆最后一帧，stop_duration=60 表示最多补60秒（足够覆盖语音延迟）
-                    "-vf", "tpad=stop_mode=clone:stop_duration=60", 
-                    "-c:v", "libx264", "-pix_fmt", "yuv420p",
-                    "-c:a", "aac", "-b:a", "192k",
-                    "-shortest" # 配合 tpad 使用，当音频结束时，视频流（已被无限延长）也会在此刻截断
+                    "-map", f"[{label}]", "-map", "0:a?",
+                    "-c:v", "libx264", *profile.video_args(info.fps),
+                    # 成片音轨已是 AAC，各档位直接复制
+                    "-c:a", "copy",
+                    "-movflags", "+faststart",
+                    str(out_path)
                 ])
+            outputs.append((r, out_path))
+
+        logger.info(f"   🪜 Encoding {len(renditions)} renditions in a single pass...")
+        try:
+            self._run(cmd)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError((e.stderr or b"").decode(errors="replace").strip() or str(e)) from e
+
+        manifest = {"source": source.name, "renditions": []}
+        for r, out_path in outputs:
+            # 以实际输出为准 (scale=-2 的取整方式由 ffmpeg 决定)，读取失败时宽度留空
+            width, height = None, r.height
+            if out_path.exists():
+                try:
+                    out_info = media_info.probe(out_path)
+                    width, height = out_info.width, out_info.height or r.height
+                except Exception as e:
+                    logger.warning(f"   ⚠️ Failed to probe rendition {out_path.name}: {e}")
+            manifest["renditions"].append({
+                "name": r.name,
+                "kind": r.kind,
+                "path": out_path.name,
+                "width": width,
+                "height": height,
+                "profile": r.profile if r.kind == "video" else None,
+                "size_bytes": out_path.stat().st_size if out_path.exists() else None,
+            })
+        manifest_path = out_dir / "manifest.json"
+        manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        logger.info(f"✨ Renditions saved to: {out_dir}")
+        return manifest_path
+
+    def _build_segment(
+        self, index: int, video_path: str, audio_path: Optional[str], segment_out: Path
+    ) -> Tuple[int, Path, Optional[str], str, Optional[str]]:
+        """
+        返回 (序号, 输出路径, 错误信息, 输入指纹, 合成方式 cached | copy | encode)
+        任何异常 (读取输入失败等) 都只记为本片段的错误，不影响其他片段的拼接
+        """
+        digest, error, mode = "", None, None
+        try:
+            self._resolve_target()
+            digest = self._segment_digest(video_path, audio_path)
+            entry = self._manifest.get(segment_out.name)
+            if entry and entry.get("digest") == digest and segment_out.exists():
+                mode = "cached"
             else:
-                # 无音频，生成静音
-                cmd.extend(["-c:v", "libx264", "-pix_fmt", "yuv420p", "-an"])
+                _, segment_out, error, mode = self._mux_segment(index, video_path, audio_path, segment_out)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+
+        if error:
+            logger.error(f"   ❌ Failed to mux segment {index}: {error}")
+        else:
+            logger.info(f"   ✅ Segment {index} assembled ({mode}).")
 
-            cmd.append(str(segment_out))
-            
+        if self.progressive:
+            # 渐进式输出只是附带产物，失败时不丢弃已合成的片段
             try:
-                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-                segment_paths.append(str(segment_out))
-                logger.info(f"   ✅ Segment {i} assembled.")
-                
-                # === 修正 Debug 逻辑: 立即删除临时 WAV ===
-                if temp_wav and temp_wav.exists():
-                    temp_wav.unlink()
-                    
-            except subprocess.CalledProcessError as e:
-                logger.error(f"   ❌ Failed to mux segment {i}: {e.stderr.decode()}")
-                continue
+                self.progressive.add(index, None if error else segment_out)
+            except Exception as e:
+                logger.warning(f"   ⚠️ Progressive output failed for segment {index}: {e}")
+        return index, segment_out, error, digest, mode
 
+    def _concat_segments(self, segment_paths: List[str], output_filename: str) -> str:
         if not segment_paths:
-            raise ValueError("No valid segments created.")
+            raise ValueError(f"No valid segments created. Errors: {self.segment_errors}")
 
-        # === 步骤 B.5: 生成黑屏过渡 (Spacer) ===
-        spacer_path = None
-        if segment_paths:
-            try:
-                resolution = self._get_video_resolution(segment_paths[0])
-                spacer_path = raw_clips_dir / "black_spacer.mp4"
-                if not spacer_path.exists():
-                    logger.info(f"   ⚫ Generating 1s black spacer ({resolution})...")
-                    self._create_spacer(resolution, 1.0, spacer_path)
-            except Exception as e:
-                logger.warning(f"   ⚠️ Failed to create spacer: {e}")
-                spacer_path = None
+        concat_list_path = self.output_dir / "concat_list.txt"
+        spacer_path = self._ensure_spacer(Path(segment_paths[0]))
 
-        # === 步骤 C: Concat (拼接) ===
+        # === Concat (拼接) ===
         with open(concat_list_path, "w", encoding="utf-8") as f:
             for i, path in enumerate(segment_paths):
                 f.write(f"file '{Path(path).resolve()}'\n")
@@ -120,7 +324,8 @@ class Assembler:
             "-c", "copy", str(output_path)
         ]
         
-        subprocess.run(concat_cmd, check=True)
+        with tracer.span("ffmpeg.concat", "ffmpeg", segments=len(segment_paths)):
+            subprocess.run(concat_cmd, check=True)
         logger.info(f"✨ Final video saved to: {output_path}")
         
         # 可选：清理中间生成的 segment_xxx.mp4 和列表文件
@@ -129,26 +334,238 @@ class Assembler:
         
         return str(output_path)
 
-    def _get_video_resolution(self, video_path: str) -> str:
-        """获取视频分辨率 (e.g., '1920x1080')"""
-        cmd = [
-            "ffprobe", "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=width,height",
-            "-of", "csv=s=x:p=0",
-            video_path
-        ]
-        return subprocess.check_output(cmd, text=True).strip()
+    def _ensure_spacer(self, reference_segment: Path) -> Optional[Path]:
+        """从间隔片段库取黑屏过渡 (Spacer)，编码参数与参考片段一致；失败返回 None"""
+        try:
+            target = self._target
+            if target is None:
+                width, height = map(int, self._get_video_resolution(str(reference_segment)).split("x"))
+                try:
+                    info = media_info.probe(reference_segment)
+                    fps, timescale = info.fps, info.timescale
+                except Exception:
+                    fps, timescale = None, None
+            else:
+                width, height, fps, timescale = target.width, target.height, target.fps, target.timescale
+
+            return self.clips.get(self._spacer_spec(width, height, fps, timescale))
+        except Exception as e:
+            logger.warning(f"   ⚠️ Failed to create spacer: {e}")
+            return None
+
+    def _spacer_spec(self, width: int, height: int, fps: Optional[float], timescale: Optional[int]) -> ClipSpec:
+        return ClipSpec(
+            width=width,
+            height=height,
+            # 无法读取帧率时使用 Manim 默认的 30 fps
+            fps=fps or 30.0,
+            timescale=timescale,
+            video=" ".join(self.profile.video_args(fps or 30.0)),
+            audio=" ".join(self.profile.audio_args()),
+            duration=1.0
+        )
+
+    def _segment_digest(self, video_path: str, audio_path: Optional[str]) -> str:
+        """片段的输入指纹: 画面与音频内容 + 影响输出的编码参数"""
+        target = self._target
+        return text_digest(
+            SEGMENT_FORMAT_VERSION,
+            file_digest(video_path),
+            file_digest(audio_path) if audio_path else "",
+            settings.ASSEMBLY_STREAM_COPY,
+            self.profile.name,
+            *self.profile.video_args(target.fps if target else None),
+            *self.profile.audio_args(),
+            *((target.video_codec, target.pix_fmt, target.avcc, target.width, target.height, target.fps, target.timescale) if target else ())
+        )
+
+    @staticmethod
+    def _load_manifest(path: Path) -> Dict[str, dict]:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+        if data.get("version") != SEGMENT_FORMAT_VERSION:
+            return {}
+        return data.get("segments", {})
+
+    @staticmethod
+    def _save_manifest(path: Path, segments: Dict[str, dict]):
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(
+            json.dumps({"version": SEGMENT_FORMAT_VERSION, "segments": segments}, indent=2), encoding="utf-8"
+        )
+        os.replace(tmp_path, path)
+
+    def _worker_count(self, job_count: int) -> int:
+        workers = settings.ASSEMBLER_WORKERS
+        if workers <= 0:
+            workers = (os.cpu_count() or 1) // max(1, self.profile.thread_count)
+        return max(1, min(workers, job_count))
 
-    def _create_spacer(self, resolution: str, duration: float, output_path: Path):
-        """生成指定分辨率和时长的黑屏视频 (带静音)"""
+    def _mux_segment(
+        self, index: int, video_path: str, audio_path: Optional[str], segment_out: Path
+    ) -> Tuple[int, Path, Optional[str], str]:
+        """合成单个片段，返回 (序号, 输出路径, 错误信息, 合成方式 copy | encode)"""
+        if self._target and settings.ASSEMBLY_STREAM_COPY:
+            try:
+                if self._mux_stream_copy(video_path, audio_path, segment_out):
+                    return index, segment_out, None, "copy"
+            except (subprocess.CalledProcessError, OSError, media_info.MediaInfoError) as e:
+                logger.warning(f"   ⚠️ Stream copy failed for segment {index}, re-encoding: {e}")
+
+        cmd = self._mux_command(video_path, audio_path, segment_out)
+        try:
+            with tracer.span("ffmpeg.mux", "ffmpeg", segment=index):
+                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            return index, segment_out, None, "encode"
+        except subprocess.CalledProcessError as e:
+            return index, segment_out, (e.stderr or b"").decode(errors="replace").strip() or str(e), "encode"
+        except OSError as e:
+            return index, segment_out, str(e), "encode"
+
+    def _resolve_target(self):
+        """由第一个提交的片段确定交付格式 (只执行一次，在线程池中调用)"""
+        with self._target_lock:
+            if not self._target_resolved and self._target_source:
+                self._target = self._delivery_target(self._target_source)
+            self._target_resolved = True
+
+    def _delivery_target(self, video_path: str) -> Optional[MediaInfo]:
+        """
+        以第一个片段的参数作为交付格式，以下情况放弃直接复制:
+        - 它本身不是 H.264/yuv420p，或读不到 avcC
+        - 按编码档位生成的间隔片段 SPS/PPS 与它不同: concat demuxer 只保留第一个文件的参数集，
+          复制的片段与本机编码的间隔/尾帧/重编码片段混在一起会解码出错
+        """
+        try:
+            info = media_info.probe(video_path)
+        except Exception as e:
+            logger.warning(f"   ⚠️ Failed to probe {video_path}: {e}")
+            return None
+        if info.video_codec != "h264" or info.pix_fmt != "yuv420p" or not info.fps or not info.timescale or not info.avcc:
+            return None
+        try:
+            spacer = self.clips.get(self._spacer_spec(info.width, info.height, info.fps, info.timescale))
+            spacer_avcc = media_info.probe(spacer).avcc
+        except Exception as e:
+            logger.warning(f"   ⚠️ Failed to check spacer parameter sets, re-encoding all segments: {e}")
+            return None
+        if spacer_avcc != info.avcc:
+            logger.info("   ℹ️ Rendered clips use different H.264 parameter sets (SPS/PPS) than the encoding profile, re-encoding all segments.")
+            return None
+        return info
+
+    def _conforms(self, info: MediaInfo) -> bool:
+        target = self._target
+        return bool(target) and (
+            info.video_codec == target.video_codec
+            and info.pix_fmt == target.pix_fmt
+            and info.avcc == target.avcc
+            and (info.width, info.height) == (target.width, target.height)
+            and info.fps == target.fps
+            and info.timescale == target.timescale
+        )
+
+    def _mux_stream_copy(self, video_path: str, audio_path: Optional[str], segment_out: Path) -> bool:
+        """
+        快速路径: 画面已是交付格式时直接复制视频流，只为音频比画面长的部分编码一小段静止尾帧
+        (克隆最后一帧)，再用 concat demuxer 与原片段拼接。返回 False 表示不适用，需要重新编码
+        """
+        info = media_info.probe(video_path)
+        if not self._conforms(info):
+            return False
+
+        threads = str(self.profile.thread_count)
+        if not audio_path:
+            self._run(["ffmpeg", "-y", "-v", "error", "-i", str(video_path), "-map", "0:v", "-c:v", "copy", "-an", str(segment_out)])
+            return True
+
+        audio_duration = media_info.probe_duration(audio_path)
+        # 画面比音频长时需要在非关键帧处截断，只能重新编码
+        if info.duration > audio_duration + 1.0 / info.fps:
+            return False
+
+        audio_args = ["-c:a", "copy"] if is_canonical_audio(audio_path) else self.profile.audio_args()
+        pad = audio_duration - info.duration
+        if pad <= 1.0 / info.fps:
+            self._run([
+                "ffmpeg", "-y", "-v", "error",
+                "-i", str(video_path), "-i", str(audio_path),
+                "-map", "0:v", "-map", "1:a", "-c:v", "copy", *audio_args,
+                "-shortest", str(segment_out)
+            ])
+            return True
+
+        tail_path = segment_out.with_name(f"{segment_out.stem}.tail.mp4")
+        list_path = segment_out.with_name(f"{segment_out.stem}.concat.txt")
+        try:
+            # 从最后一秒中取出最后一帧并克隆，编码参数与原片段一致，保证 concat 可以直接复制
+            self._run([
+                "ffmpeg", "-y", "-v", "error",
+                "-sseof", "-1", "-i", str(video_path),
+                "-vf", f"reverse,trim=end_frame=1,setpts=PTS-STARTPTS,tpad=stop_mode=clone:stop_duration={pad:.3f}",
+                "-r", f"{info.fps:g}",
+                "-c:v", "libx264", "-pix_fmt", "yuv420p", *self.profile.video_args(info.fps),
+                "-video_track_timescale", str(info.timescale),
+                "-an", "-threads", threads, str(tail_path)
+            ])
+            # 尾帧与原片段的 SPS/PPS 不同就不能直接拼接，整个片段重新编码
+            if media_info.probe(tail_path).avcc != info.avcc:
+                return False
+            list_path.write_text(
+                f"file '{Path(video_path).resolve()}'\nfile '{tail_path.resolve()}'\n", encoding="utf-8"
+            )
+            self._run([
+                "ffmpeg", "-y", "-v", "error",
+                "-f", "concat", "-safe", "0", "-i", str(list_path),
+                "-i", str(audio_path),
+                "-map", "0:v", "-map", "1:a", "-c:v", "copy", *audio_args,
+                "-shortest", str(segment_out)
+            ])
+        finally:
+            tail_path.unlink(missing_ok=True)
+            list_path.unlink(missing_ok=True)
+        return True
+
+    @staticmethod
+    def _run(cmd: List[str]):
+        with tracer.span("ffmpeg", "ffmpeg", output=Path(cmd[-1]).name):
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def _mux_command(self, video_path: str, audio_path: Optional[str], segment_out: Path) -> List[str]:
+        """
+        单次 ffmpeg 完成画面补齐与音画合并
+        标准 AAC 音轨 (TTS 阶段已转换) 直接复制音频流；其他格式在同一进程内编码为 AAC，不再落地临时 WAV
+        """
         cmd = [
-            "ffmpeg", "-y", "-v", "error",
-            "-f", "lavfi", "-i", f"color=c=black:s={resolution}:d={duration}",
-            "-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo",
-            "-c:v", "libx264", "-pix_fmt", "yuv420p",
-            "-c:a", "aac", "-b:a", "192k",
-            "-shortest",
-            str(output_path)
+            "ffmpeg", "-y", "-v", "error", # 减少日志输出，只显示错误
+            "-i", str(video_path)
         ]
-        subprocess.run(cmd, check=True)
\ No newline at end of file
+        video_args = self.profile.video_args(self._target.fps if self._target else None)
+
+        if audio_path:
+            audio_args = ["-c:a", "copy"] if is_canonical_audio(audio_path) else self.profile.audio_args()
+            cmd.extend(["-i", str(audio_path)])
+            cmd.extend([
+                "-map", "0:v", "-map", "1:a",
+                # 添加 tpad 滤镜：stop_mode=clone 表示克隆最后一帧，stop_duration=60 表示最多补60秒（足够覆盖语音延迟）
+                "-vf", "tpad=stop_mode=clone:stop_duration=60", 
+                "-c:v", "libx264", "-pix_fmt", "yuv420p", *video_args,
+                *audio_args,
+                "-shortest" # 配合 tpad 使用，当音频结束时，视频流（已被无限延长）也会在此刻截断
+            ])
+        else:
+            # 无音频，生成静音
+            cmd.extend(["-c:v", "libx264", "-pix_fmt", "yuv420p", *video_args, "-an"])
+
+        if self._target:
+            # 与直接复制的片段保持同一时间基，最终 concat 才能无损拼接
+            cmd.extend(["-video_track_timescale", str(self._target.timescale)])
+        cmd.extend(["-threads", str(self.profile.thread_count)])
+        cmd.append(str(segment_out))
+        return cmd
+
+    def _get_video_resolution(self, video_path: str) -> str:
+        """获取视频分辨率 (e.g., '1920x1080')"""
+        return media_info.probe_resolution(video_path)
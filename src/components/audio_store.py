@@ -0,0 +1,172 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from src.core.config import settings
+from src.utils import media_info
+from src.utils.hashing import text_digest
+from src.utils.logger import logger
+
+class AudioEntry(BaseModel):
+    """
+    内容寻址音频缓存中的一条记录 (对应 <key>.json 元数据文件)
+    """
+    key: str
+    path: str
+    duration: float
+    size_bytes: int
+    created_at: float
+    last_access: float
+    text: str = ""  # 便于排查，只保存前 80 个字符
+
+class AudioStore:
+    """
+    内容寻址的 TTS 音频缓存
+    key = hash(文本, 音色, 模型, 语言, 输出格式)，与 scene_id 无关:
+    - 修改 audio_script 后 key 变化，自动重新合成，不会复用旧音频
+    - 不同场景中相同的旁白只合成一次
+    运行目录 (output/audio/<scene_id>.mp3) 中的文件是指向缓存的硬链接 (或软链接/拷贝)
+    """
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.root = root or settings.OUTPUT_DIR / "cache" / "audio"
+        self.max_bytes = settings.TTS_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 缓存总体积: 第一次检查淘汰时扫描一次元数据，之后随 put/evict 增量维护
+        self._total_bytes: Optional[int] = None
+
+    @staticmethod
+    def key_for(text: str, voice: str, model: str, language_type: str, fmt: str) -> str:
+        return text_digest(text, voice, model, language_type, fmt)
+
+    def _blob_path(self, key: str, ext: str) -> Path:
+        return self.root / key[:2] / f"{key}.{ext}"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def staging_path(self, key: str, ext: str) -> Path:
+        """下载/转码中间文件的位置 (与缓存同一文件系统，保证 put 时可原子移动)"""
+        staging = self.root / "staging"
+        staging.mkdir(parents=True, exist_ok=True)
+        return staging / f"{key}.{uuid.uuid4().hex[:8]}.{ext}"
+
+    def _write_meta(self, entry: AudioEntry):
+        meta_path = self._meta_path(entry.key)
+        tmp_path = meta_path.with_suffix(".json.tmp")
+        tmp_path.write_text(entry.model_dump_json(), encoding="utf-8")
+        os.replace(tmp_path, meta_path)
+
+    def _load(self, key: str) -> Optional[AudioEntry]:
+        try:
+            return AudioEntry.model_validate_json(self._meta_path(key).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def get(self, key: str) -> Optional[AudioEntry]:
+        """
+        命中时刷新 last_access (用于 LRU)
+        写入时时长读取失败 (0 秒) 的条目在这里重新解析，仍然失败则视为未命中
+        """
+        entry = self._load(key)
+        if entry is None or not Path(entry.path).exists():
+            return None
+        if entry.duration <= 0:
+            try:
+                entry.duration = media_info.probe_duration(entry.path)
+            except Exception as e:
+                logger.warning(f"⚠️ [AudioStore] Failed to probe {entry.path}: {e}")
+            if entry.duration <= 0:
+                return None
+
+        entry.last_access = time.time()
+        try:
+            self._write_meta(entry)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, src_path: Path, duration: float, text: str = "") -> AudioEntry:
+        """把已生成的音频文件移入缓存并写入元数据"""
+        previous = self._load(key)
+        blob = self._blob_path(key, Path(src_path).suffix.lstrip(".") or "bin")
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src_path, blob)
+
+        now = time.time()
+        entry = AudioEntry(
+            key=key,
+            path=str(blob),
+            duration=duration,
+            size_bytes=blob.stat().st_size,
+            created_at=now,
+            last_access=now,
+            text=text[:80]
+        )
+        self._write_meta(entry)
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += entry.size_bytes - (previous.size_bytes if previous else 0)
+        self.evict(keep={key})
+        return entry
+
+    def link(self, entry: AudioEntry, dest: Path) -> Path:
+        """
+        在运行目录中放置缓存文件的引用: 优先硬链接，其次软链接，最后拷贝
+        先写临时名再 rename，保证 dest 要么是旧文件要么是新文件
+        """
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.link")
+        src = Path(entry.path)
+        try:
+            os.link(src, tmp)
+        except OSError:
+            try:
+                os.symlink(src.resolve(), tmp)
+            except OSError:
+                shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+        return dest
+
+    def entries(self) -> List[AudioEntry]:
+        result = []
+        for meta_path in self.root.glob("*/*.json"):
+            try:
+                result.append(AudioEntry.model_validate_json(meta_path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return result
+
+    def evict(self, keep: Optional[set] = None):
+        """
+        LRU 淘汰: 总体积超过上限时，从最久未使用的条目开始删除
+        运行目录中的硬链接不受影响 (文件内容仍由链接持有)
+        未超过上限时只比较增量维护的总体积，不扫描元数据
+        """
+        if not self.max_bytes:
+            return
+        keep = keep or set()
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(e.size_bytes for e in self.entries())
+            if self._total_bytes <= self.max_bytes:
+                return
+            entries = sorted(self.entries(), key=lambda e: e.last_access)
+            total = sum(e.size_bytes for e in entries)
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                if entry.key in keep:
+                    continue
+                Path(entry.path).unlink(missing_ok=True)
+                self._meta_path(entry.key).unlink(missing_ok=True)
+                total -= entry.size_bytes
+                logger.info(f"🧹 [AudioStore] Evicted {entry.key[:12]} ({entry.size_bytes} bytes)")
+            self._total_bytes = total
@@ -0,0 +1,89 @@
+import os
+import subprocess
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+from src.core.config import settings
+from src.utils.audio_ops import CANONICAL_AUDIO_ARGS
+from src.utils.hashing import text_digest
+from src.utils.logger import logger
+from src.utils.tracing import tracer
+
+class ClipSpec(BaseModel):
+    """
+    预编码的纯色片段 (场景间隔/转场卡) 的全部编码参数
+    参数与片段完全一致，拼接时才能直接 -c copy
+    """
+    width: int
+    height: int
+    fps: float
+    pix_fmt: str = "yuv420p"
+    video: str = ""                      # libx264 调优参数 (编码档位的 preset/CRF/GOP)
+    timescale: Optional[int] = None      # None 表示使用 ffmpeg 默认时间基
+    audio: str = " ".join(CANONICAL_AUDIO_ARGS)  # 音频编码参数 (采样率/声道/码率)
+    duration: float = 1.0
+    color: str = "black"
+
+    @property
+    def key(self) -> str:
+        return text_digest(
+            self.width, self.height, self.fps, self.pix_fmt, self.video, self.timescale, self.audio, self.duration, self.color
+        )
+
+    @property
+    def filename(self) -> str:
+        # 文件名便于排查，唯一性由 key 保证
+        return f"{self.color}_{self.width}x{self.height}_{self.fps:g}fps_{self.duration:g}s_{self.key[:12]}.mp4"
+
+class ClipLibrary:
+    """
+    按编码参数寻址的间隔片段库 (OUTPUT_DIR/cache/clips)
+    - 参数不同 (分辨率/帧率/像素格式/时间基/音频/时长/颜色) 一定是不同文件，不会误用其他配置生成的片段
+    - 按需生成，跨运行复用；先写临时文件再原子重命名，并发请求同一片段只编码一次
+    """
+    def __init__(self, root: Optional[Path] = None):
+        self.root = root or settings.OUTPUT_DIR / "cache" / "clips"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def path_for(self, spec: ClipSpec) -> Path:
+        return self.root / spec.filename
+
+    def get(self, spec: ClipSpec) -> Path:
+        path = self.path_for(spec)
+        if path.exists():
+            return path
+
+        with self._locks_guard:
+            lock = self._locks.setdefault(spec.key, threading.Lock())
+        with lock:
+            if path.exists():
+                return path
+            logger.info(f"   ⚫ [ClipLibrary] Encoding {spec.filename}...")
+            tmp_path = path.with_name(f".{path.stem}.{uuid.uuid4().hex[:8]}.mp4")
+            try:
+                with tracer.span("ffmpeg.clip", "ffmpeg", clip=spec.filename):
+                    subprocess.run(self._command(spec, tmp_path), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                os.replace(tmp_path, path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
+        return path
+
+    @staticmethod
+    def _command(spec: ClipSpec, out_path: Path) -> list:
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "lavfi", "-i", f"color=c={spec.color}:s={spec.width}x{spec.height}:r={spec.fps:g}:d={spec.duration:g}",
+            "-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo",
+            "-c:v", "libx264", "-pix_fmt", spec.pix_fmt, *spec.video.split(),
+            *spec.audio.split(),
+        ]
+        if spec.timescale:
+            cmd.extend(["-video_track_timescale", str(spec.timescale)])
+        cmd.extend(["-t", f"{spec.duration:g}", "-shortest", str(out_path)])
+        return cmd
@@ -1,16 +1,31 @@
 # src/components/critic.py
-import base64
 import json
 import asyncio
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from typing import List, Optional
 
 from src.core.models import CritiqueFeedback, SceneSpec
 from src.core.config import settings
+from src.core.scheduler import scheduler
+from src.utils.tracing import tracer
+from src.components.critic_cache import CriticCache
 from src.llm.client import LLMClient
 # 引入新的构建函数
-from src.llm.prompts import build_critic_system_prompt, build_critic_user_prompt 
+from src.llm.prompts import (
+    build_critic_system_prompt,
+    build_critic_user_prompt,
+    build_critic_contact_sheet_user_prompt
+)
+from src.utils.hashing import file_digest, text_digest
+from src.utils.image_ops import EncodedImage, encode_for_vlm
+from src.utils.logger import metrics
 
 class VisionCritic:
+    # 已编码图片缓存的条数上限 (批量模式下 Critic 由所有任务共享，只需覆盖近期重试的帧)
+    IMAGE_CACHE_SIZE = 32
+
     def __init__(self):
         # 这里的 LLMClient 已经是异步版本了
         self.llm_client = LLMClient()
@@ -21,6 +36,17 @@ class VisionCritic:
         self.api_stubs = self._load_file(settings.LIB_DIR / "api_stubs.txt")
         self.examples = self._load_file(settings.LIB_DIR / "examples.txt")
 
+        # 已编码图片缓存 (LRU): key = 文件内容哈希 + 编码参数
+        # 编码在线程池中进行，访问需要加锁
+        self._image_cache: "OrderedDict[str, EncodedImage]" = OrderedDict()
+        self._image_cache_lock = threading.Lock()
+
+        # 结论缓存: 画面 (像素) 完全没变就不重复调用 VLM
+        # 按模型与 System Prompt 区分，换模型或改 Prompt 后不复用旧结论
+        self.verdict_cache = CriticCache(
+            namespace=text_digest(self.model, build_critic_system_prompt(self.api_stubs, self.examples))
+        ) if settings.CRITIC_CACHE_ENABLED else None
+
     def _load_file(self, path: Path) -> str:
         """辅助方法：读取文件"""
         try:
@@ -28,71 +54,162 @@ class VisionCritic:
         except FileNotFoundError:
             return ""
 
-    def _encode_image(self, image_path: str) -> str:
-        """将图片转换为 Base64 编码"""
+    def _encode_image(self, image_path: str) -> Optional[EncodedImage]:
+        """
+        将图片缩放、压缩后转换为 Base64 编码 (同步，CPU 密集)
+        按文件内容哈希缓存，重复审查同一帧时不会重复编码
+        """
         path = Path(image_path)
         if not path.exists():
             # 这里可以做一个兜底，如果没有图片，就不要去审查了
-            return ""
-            
-        with open(path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+            return None
+
+        cache_key = (
+            f"{file_digest(path)}:{settings.CRITIC_IMAGE_MAX_EDGE}:"
+            f"{settings.CRITIC_IMAGE_FORMAT}:{settings.CRITIC_IMAGE_QUALITY}"
+        )
+        with self._image_cache_lock:
+            cached = self._image_cache.get(cache_key)
+            if cached:
+                self._image_cache.move_to_end(cache_key)
+                return cached
+
+        encoded = encode_for_vlm(
+            path,
+            max_edge=settings.CRITIC_IMAGE_MAX_EDGE,
+            fmt=settings.CRITIC_IMAGE_FORMAT,
+            quality=settings.CRITIC_IMAGE_QUALITY
+        )
+        with self._image_cache_lock:
+            self._image_cache[cache_key] = encoded
+            while len(self._image_cache) > self.IMAGE_CACHE_SIZE:
+                self._image_cache.popitem(last=False)
+        return encoded
 
-    async def review_layout(self, image_path: str, scene: SceneSpec) -> CritiqueFeedback:
+    async def review_layout(
+        self,
+        image_path: str,
+        scene: SceneSpec,
+        timestamps: Optional[List[float]] = None,
+        reuse_rejections: bool = True
+    ) -> CritiqueFeedback:
         """
         [Async] 视觉审查
+        传入 timestamps 时，image_path 是多帧拼图，反馈会标注问题出现的时间点
+        reuse_rejections=False (Fixer 刚改过代码) 时只复用通过的结论，否决的结论一律重新审查
         """
         print(f"👀 [Critic] Reviewing image: {image_path}")
+
+        # 拼图审查的 Prompt 与反馈格式 (带时间戳) 都不同，不走结论缓存
+        cached = None if timestamps else await self._lookup_cache(image_path, scene)
+        if cached and (cached.passed or reuse_rejections):
+            print(f"   ♻️ Frame matches a reviewed one, reusing verdict (passed={cached.passed})")
+            cached.unchanged_frame = not cached.passed
+            return cached
+        unchanged_frame = bool(cached) and not cached.passed
         
-        # 图片编码是 CPU 密集型操作，但对于单张图片通常很快。
-        # 如果图片很大，可以考虑 await asyncio.to_thread(self._encode_image, image_path)
-        base64_image = self._encode_image(image_path)
+        # 图片缩放 + 编码是 CPU 密集型操作，放到线程池避免阻塞事件循环
+        try:
+            image = await asyncio.to_thread(self._encode_image, image_path)
+        except Exception as e:
+            print(f"   ⚠️ Failed to encode image: {e}")
+            image = None
         
-        if not base64_image:
+        if not image:
             print("   ⚠️ Image not found, skipping critique.")
             return CritiqueFeedback(passed=True, score=10, suggestion=None)
         
         # === 修改点：构建动态 System Prompt ===
         system_prompt = build_critic_system_prompt(self.api_stubs, self.examples)
         
-        user_content = build_critic_user_prompt(scene)
+        if timestamps:
+            user_content = build_critic_contact_sheet_user_prompt(scene, timestamps)
+        else:
+            user_content = build_critic_user_prompt(scene)
 
         try:
             # 关键修复: 这里使用 await 调用异步的 LLMClient
             # 注意：LLMClient.client 是 AsyncOpenAI 实例
-            response = await self.llm_client.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": user_content},
+            with tracer.span("llm.vision", "llm", model=self.model):
+                async with scheduler.slot("llm"):
+                    response = await self.llm_client.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
                             {
-                                "type": "image_url",
-                                "image_url": {"url": f"data:image/png;base64,{base64_image}"}
+                                "role": "user",
+                                "content": [
+                                    {"type": "text", "text": user_content},
+                                    {
+                                        "type": "image_url",
+                                        "image_url": {"url": image.data_url}
+                                    }
+                                ]
                             }
-                        ]
-                    }
-                ],
-                max_tokens=500,
-                temperature=0.1, # 降低温度，让它严格遵循 API 约束
-                response_format={"type": "json_object"}
-            )
+                        ],
+                        max_tokens=500,
+                        temperature=0.1, # 降低温度，让它严格遵循 API 约束
+                        response_format={"type": "json_object"}
+                    )
             
+            usage = getattr(response, "usage", None)
+            metrics.log_critic_request(
+                image.size_bytes,
+                getattr(usage, "total_tokens", 0) or 0
+            )
+
             content = response.choices[0].message.content
             # 简单的清洗逻辑
             content = content.replace("```json", "").replace("```", "").strip()
             
             data = json.loads(content)
             
-            return CritiqueFeedback(
+            feedback = CritiqueFeedback(
                 passed=data.get("passed", False),
                 score=data.get("score", 0),
-                suggestion=data.get("suggestion")
+                suggestion=self._format_suggestion(data, timestamps),
+                unchanged_frame=unchanged_frame
             )
+            if not timestamps:
+                await self._store_cache(image_path, scene, feedback)
+            return feedback
 
         except Exception as e:
             print(f"⚠️ [Critic] Validation failed due to API error: {e}")
             # 出错时默认通过，避免卡死流水线，但分数给低一点
-            return CritiqueFeedback(passed=True, score=5, suggestion=None)
\ No newline at end of file
+            return CritiqueFeedback(passed=True, score=5, suggestion=None)
+
+    def _format_suggestion(self, data: dict, timestamps: Optional[List[float]]) -> Optional[str]:
+        """拼图模式下，把带时间戳的 issues 附加到建议中，方便 Fixer 定位是哪一段动画出错"""
+        suggestion = data.get("suggestion")
+        if not timestamps:
+            return suggestion
+
+        lines = []
+        for issue in data.get("issues") or []:
+            if not isinstance(issue, dict) or issue.get("timestamp") is None:
+                continue
+            lines.append(
+                f"- [t={issue['timestamp']}s] {issue.get('object', '?')}: "
+                f"{issue.get('description', issue.get('issue_type', ''))}"
+            )
+        if not lines:
+            return suggestion
+        return "\n".join(filter(None, [suggestion, "Issues by timestamp:", *lines]))
+
+    async def _lookup_cache(self, image_path: str, scene: SceneSpec) -> Optional[CritiqueFeedback]:
+        if not self.verdict_cache or not Path(image_path).exists():
+            return None
+        try:
+            return await asyncio.to_thread(self.verdict_cache.lookup, image_path, scene)
+        except Exception as e:
+            print(f"   ⚠️ Critic cache lookup failed: {e}")
+            return None
+
+    async def _store_cache(self, image_path: str, scene: SceneSpec, feedback: CritiqueFeedback):
+        if not self.verdict_cache:
+            return
+        try:
+            await asyncio.to_thread(self.verdict_cache.store, image_path, scene, feedback)
+        except Exception as e:
+            print(f"   ⚠️ Critic cache store failed: {e}")
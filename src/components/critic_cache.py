@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.core.config import settings
+from src.core.models import CritiqueFeedback, SceneSpec
+from src.llm.prompts import build_critic_user_prompt
+from src.utils.hashing import text_digest
+from src.utils.image_ops import pixel_digest
+from src.utils.logger import logger
+
+# 缓存文件格式变化时递增，旧文件整体作废
+CRITIC_CACHE_VERSION = 3
+
+class CriticCache:
+    """
+    Critic 结论缓存 (跨运行持久化)
+    key = hash(namespace, 审查 Prompt) -> [(帧的像素摘要, CritiqueFeedback)]
+    namespace 由调用方提供 (模型 + System Prompt 的摘要)，换模型或改 Prompt 后不会复用旧结论
+    只有像素完全一致的帧才算命中: 近似哈希分不清"标签从方框上移到方框下"这类修复
+    每个场景最多 max_entries 条、最多 max_scenes 个场景，超出时丢弃最旧的
+    """
+    def __init__(
+        self,
+        cache_path: Optional[Path] = None,
+        namespace: str = "",
+        max_entries: Optional[int] = None,
+        max_scenes: Optional[int] = None
+    ):
+        self.cache_path = cache_path or settings.OUTPUT_DIR / "cache" / "critic_cache.json"
+        self.namespace = namespace
+        self.max_entries = settings.CRITIC_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.max_scenes = settings.CRITIC_CACHE_MAX_SCENES if max_scenes is None else max_scenes
+        self._lock = threading.Lock()
+        # 按写入顺序排列 (最近写入的场景在最后)
+        self._entries: Dict[str, List[dict]] = self._load()
+
+    def _load(self) -> Dict[str, List[dict]]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠️ [CriticCache] Ignoring unreadable cache {self.cache_path}: {e}")
+            return {}
+        if not isinstance(data, dict) or data.get("version") != CRITIC_CACHE_VERSION:
+            return {}
+        return data.get("entries", {})
+
+    def _save(self):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CRITIC_CACHE_VERSION, "entries": self._entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    def scene_key(self, scene: SceneSpec) -> str:
+        # 用户 Prompt 包含场景描述与元素，模板变化时同样失效
+        return text_digest(self.namespace, build_critic_user_prompt(scene))
+
+    def lookup(self, image_path: str, scene: SceneSpec) -> Optional[CritiqueFeedback]:
+        """
+        查找与当前帧像素级一致的历史审查结果
+        """
+        frame = pixel_digest(image_path)
+        with self._lock:
+            candidates = list(self._entries.get(self.scene_key(scene), []))
+
+        for entry in reversed(candidates):
+            if entry["frame"] == frame:
+                feedback = CritiqueFeedback(**entry["feedback"])
+                feedback.cached = True
+                return feedback
+        return None
+
+    def store(self, image_path: str, scene: SceneSpec, feedback: CritiqueFeedback):
+        entry = {
+            "frame": pixel_digest(image_path),
+            "feedback": feedback.model_dump(exclude={"cached"})
+        }
+        key = self.scene_key(scene)
+        with self._lock:
+            entries = self._entries.pop(key, [])
+            # 完全相同的结论已是最新一条时无需重写文件
+            unchanged = bool(entries) and entries[-1] == entry
+            if not unchanged:
+                # 同一帧 (像素摘要相同) 只保留最新的结论，再按条数截断
+                entries = [e for e in entries if e["frame"] != entry["frame"]] + [entry]
+                if self.max_entries > 0:
+                    entries = entries[-self.max_entries:]
+            # 重新插入，最近写入的场景排在最后
+            self._entries[key] = entries
+            if unchanged:
+                return
+            while self.max_scenes > 0 and len(self._entries) > self.max_scenes:
+                self._entries.pop(next(iter(self._entries)))
+            try:
+                self._save()
+            except Exception as e:
+                logger.warning(f"⚠️ [CriticCache] Failed to persist cache: {e}")
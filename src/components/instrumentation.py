@@ -0,0 +1,107 @@
+# src/components/instrumentation.py
+"""
+Manim 布局埋点
+
+在 Lint (dry run) / Render 时把一段 hook 追加到生成的场景代码末尾，
+每次 play / wait 结束后记录所有可见 mobject 的包围盒、层级和文字内容，
+进程退出时写出紧凑 JSON，供 LayoutChecker 做几何审查。
+
+追加到代码末尾 (而不是开头) 是为了不改变用户代码的行号，
+Linter 反馈给 LLM 的报错行号仍然准确。
+"""
+
+_HOOK_TEMPLATE = '''
+
+# --- auto-injected layout instrumentation (do not edit) ---
+def _layout_hook_install(_out_path):
+    import atexit
+    import json
+    from manim import Scene as _Scene, config as _config
+
+    _text_types = {{"Text", "MarkupText", "Paragraph", "Tex", "MathTex", "Title", "Code", "Integer", "DecimalNumber"}}
+    _group_types = {{"VGroup", "Group", "VDict"}}
+    _snapshots = []
+
+    def _visible(mob):
+        try:
+            return (mob.get_fill_opacity() > 0) or (mob.get_stroke_opacity() > 0) or len(mob.submobjects) > 0
+        except Exception:
+            return True
+
+    def _leaves(mob):
+        kind = type(mob).__name__
+        if kind in _group_types:
+            for sub in mob.submobjects:
+                yield from _leaves(sub)
+        else:
+            yield mob
+
+    def _record(scene, event):
+        objects = []
+        for order, top in enumerate(scene.mobjects):
+            for mob in _leaves(top):
+                if not _visible(mob):
+                    continue
+                try:
+                    x0, y0, _ = mob.get_critical_point([-1, -1, 0])
+                    x1, y1, _ = mob.get_critical_point([1, 1, 0])
+                except Exception:
+                    continue
+                if x1 - x0 <= 0 and y1 - y0 <= 0:
+                    continue
+                kind = type(mob).__name__
+                item = {{
+                    "type": kind,
+                    "box": [round(float(v), 3) for v in (x0, y0, x1, y1)],
+                    "z": getattr(mob, "z_index", 0),
+                    "order": order,
+                }}
+                if kind in _text_types:
+                    text = getattr(mob, "text", None) or getattr(mob, "tex_string", None)
+                    item["text"] = str(text)[:80] if text is not None else ""
+                    font_size = getattr(mob, "font_size", None)
+                    if font_size is not None:
+                        item["font_size"] = round(float(font_size), 1)
+                objects.append(item)
+        t = getattr(getattr(scene, "renderer", None), "time", None)
+        _snapshots.append({{
+            "i": len(_snapshots),
+            "t": round(float(t), 3) if t is not None else None,
+            "event": event,
+            "objects": objects,
+        }})
+
+    def _wrap(name):
+        original = getattr(_Scene, name)
+        def wrapper(self, *args, **kwargs):
+            result = original(self, *args, **kwargs)
+            try:
+                _record(self, name)
+            except Exception:
+                pass
+            return result
+        setattr(_Scene, name, wrapper)
+
+    for _name in ("play", "wait", "tear_down"):
+        _wrap(_name)
+
+    def _flush():
+        with open(_out_path, "w", encoding="utf-8") as f:
+            json.dump({{
+                "frame": [float(_config.frame_width), float(_config.frame_height)],
+                "snapshots": _snapshots,
+            }}, f, separators=(",", ":"))
+
+    atexit.register(_flush)
+    return _flush
+
+_layout_hook_flush = _layout_hook_install({out_path!r})
+'''
+
+def build_layout_hook(out_path: str) -> str:
+    """生成埋点代码 (out_path 为进程内可写的 JSON 输出路径)"""
+    return _HOOK_TEMPLATE.format(out_path=str(out_path))
+
+def instrument_code(code: str, out_path: str) -> str:
+    """把埋点追加到场景代码末尾"""
+    return code.rstrip() + "\n" + build_layout_hook(out_path)
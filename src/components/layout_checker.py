@@ -0,0 +1,126 @@
+# src/components/layout_checker.py
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from src.core.models import CritiqueFeedback
+
+class LayoutIssue(BaseModel):
+    """单个几何问题"""
+    kind: str                       # out_of_frame | text_overlap | small_text
+    timestamp: Optional[float] = None
+    objects: List[str] = Field(default_factory=list)
+    detail: str = ""
+
+class LayoutChecker:
+    """
+    [几何 Critic] 基于埋点导出的包围盒做精确的布局检查 (毫秒级)
+    覆盖整条动画时间线 (每次 play / wait 之后)，而不仅仅是最后一帧。
+    """
+    def __init__(
+        self,
+        edge_tolerance: float = 0.05,   # 允许超出画面边缘的距离 (Manim 单位)
+        overlap_ratio: float = 0.15,    # 交叠面积 / 较小包围盒面积 超过该比例视为遮挡
+        min_text_height: float = 0.15,  # 文字最小高度 (Manim 单位)
+        min_font_size: float = 12.0
+    ):
+        self.edge_tolerance = edge_tolerance
+        self.overlap_ratio = overlap_ratio
+        self.min_text_height = min_text_height
+        self.min_font_size = min_font_size
+
+    def load(self, layout_path: Union[str, Path]) -> dict:
+        with open(layout_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def check_file(self, layout_path: Union[str, Path]) -> List[LayoutIssue]:
+        return self.check(self.load(layout_path))
+
+    def check(self, layout: dict) -> List[LayoutIssue]:
+        frame_w, frame_h = layout.get("frame", [14.222, 8.0])
+        issues: Dict[Tuple, LayoutIssue] = {}
+
+        for snap in layout.get("snapshots", []):
+            objects = snap.get("objects", [])
+            if not objects:
+                continue
+            for issue in self._check_snapshot(objects, frame_w, frame_h, snap.get("t")):
+                # 同一问题在后续快照中通常会持续存在，只保留第一次出现的时间点
+                key = (issue.kind, tuple(issue.objects))
+                issues.setdefault(key, issue)
+
+        return list(issues.values())
+
+    def _check_snapshot(self, objects: List[dict], frame_w: float, frame_h: float, t: Optional[float]) -> List[LayoutIssue]:
+        boxes = np.array([o["box"] for o in objects], dtype=float)  # (N, 4): x0, y0, x1, y1
+        is_text = np.array(["text" in o for o in objects])
+        labels = [self._label(o) for o in objects]
+        found: List[LayoutIssue] = []
+
+        # 1. 超出画面
+        half_w, half_h = frame_w / 2 + self.edge_tolerance, frame_h / 2 + self.edge_tolerance
+        outside = (boxes[:, 0] < -half_w) | (boxes[:, 2] > half_w) | (boxes[:, 1] < -half_h) | (boxes[:, 3] > half_h)
+        for i in np.flatnonzero(outside):
+            found.append(LayoutIssue(
+                kind="out_of_frame", timestamp=t, objects=[labels[i]],
+                detail=f"box {objects[i]['box']} exceeds frame ±{frame_w / 2:.2f}, ±{frame_h / 2:.2f}"
+            ))
+
+        # 2. 文字遮挡 (两两区间求交，向量化)
+        ix0 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+        iy0 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+        ix1 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+        iy1 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+        inter = np.clip(ix1 - ix0, 0, None) * np.clip(iy1 - iy0, 0, None)
+
+        widths = boxes[:, 2] - boxes[:, 0]
+        heights = boxes[:, 3] - boxes[:, 1]
+        areas = np.maximum(widths * heights, 1e-6)
+        smaller = np.minimum(areas[:, None], areas[None, :])
+
+        # 非文字图形完全包住文字 (如方框里的标签) 属于正常设计
+        contains = (
+            (boxes[:, None, 0] <= boxes[None, :, 0]) & (boxes[:, None, 1] <= boxes[None, :, 1]) &
+            (boxes[:, None, 2] >= boxes[None, :, 2]) & (boxes[:, None, 3] >= boxes[None, :, 3])
+        )
+        framed = (contains & ~is_text[:, None]) | (contains.T & ~is_text[None, :])
+
+        involves_text = is_text[:, None] | is_text[None, :]
+        overlapping = (inter / smaller > self.overlap_ratio) & involves_text & ~framed
+        overlapping = np.triu(overlapping, k=1)
+        for i, j in zip(*np.nonzero(overlapping)):
+            found.append(LayoutIssue(
+                kind="text_overlap", timestamp=t, objects=[labels[i], labels[j]],
+                detail=f"{inter[i, j] / smaller[i, j]:.0%} of the smaller box is covered"
+            ))
+
+        # 3. 文字过小
+        font_sizes = np.array([o.get("font_size", np.inf) for o in objects], dtype=float)
+        too_small = is_text & ((heights < self.min_text_height) | (font_sizes < self.min_font_size))
+        for i in np.flatnonzero(too_small):
+            found.append(LayoutIssue(
+                kind="small_text", timestamp=t, objects=[labels[i]],
+                detail=f"text height {heights[i]:.2f} units"
+            ))
+
+        return found
+
+    @staticmethod
+    def _label(obj: dict) -> str:
+        text = obj.get("text")
+        return f"{obj['type']}('{text}')" if text else f"{obj['type']}#{obj.get('order', '?')}"
+
+    def to_feedback(self, issues: List[LayoutIssue]) -> CritiqueFeedback:
+        """把几何问题转换为与 VLM Critic 相同的反馈格式，Fixer 无需区分来源"""
+        if not issues:
+            return CritiqueFeedback(passed=True, score=10, suggestion=None)
+
+        lines = []
+        for issue in issues:
+            when = f"t={issue.timestamp:.2f}s" if issue.timestamp is not None else "final frame"
+            lines.append(f"- [{when}] {issue.kind}: {', '.join(issue.objects)} ({issue.detail})")
+        suggestion = "Geometry check found layout problems:\n" + "\n".join(lines)
+        return CritiqueFeedback(passed=False, score=max(0, 10 - 2 * len(issues)), suggestion=suggestion)
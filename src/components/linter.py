@@ -1,21 +1,25 @@
 import ast
+import shutil
 import subprocess
 import tempfile
 import sys
 from pathlib import Path
+from typing import Optional
 
 
 from src.core.models import LintResult, ErrorType
 from src.utils.code_ops import extract_code
+from src.components.instrumentation import instrument_code
 
 class CodeLinter:
     def __init__(self):
         # 预设一些为了安全或性能需要屏蔽的关键词（可选）
         self.forbidden_imports = ["os.system", "subprocess", "eval", "exec"]
 
-    def validate(self, raw_text: str) -> LintResult:
+    def validate(self, raw_text: str, layout_path: Optional[str] = None) -> LintResult:
         """
         主入口：清洗代码 -> AST检查 -> Dry Run
+        传入 layout_path 时，Dry Run 会注入布局埋点并把包围盒 JSON 写到该路径
         """
         code = extract_code(raw_text)
 
@@ -25,7 +29,7 @@ class CodeLinter:
             return syntax_result
 
         # Level 2: Runtime Dry Run (Manim simulation)
-        return self._dry_run(code)
+        return self._dry_run(code, layout_path)
 
     def _check_syntax(self, code: str) -> LintResult:
         """使用 Python 内置 AST 模块进行静态分析"""
@@ -48,7 +52,7 @@ class CodeLinter:
                 traceback=f"SyntaxError: {e.msg} at line {e.lineno}\n{e.text}"
             )
 
-    def _dry_run(self, code: str) -> LintResult:
+    def _dry_run(self, code: str, layout_path: Optional[str] = None) -> LintResult:
         """
         在子进程中执行 Manim 的 Dry Run 模式。
         """
@@ -62,9 +66,10 @@ class CodeLinter:
             (temp_path / "media" / "texts").mkdir(parents=True, exist_ok=True)
             # --- 【修复结束】 ---
 
-            # 写入用户代码
+            # 写入用户代码 (可选追加布局埋点)
+            layout_tmp = temp_path / "layout.json"
             with open(script_path, "w", encoding="utf-8") as f:
-                f.write(code)
+                f.write(instrument_code(code, str(layout_tmp)) if layout_path else code)
 
             # 构造 Manim 命令
             # 显式指定 --media_dir 为当前临时目录，防止它去系统其他地方乱写
@@ -88,6 +93,9 @@ class CodeLinter:
                 )
 
                 if result.returncode == 0:
+                    if layout_path and layout_tmp.exists():
+                        Path(layout_path).parent.mkdir(parents=True, exist_ok=True)
+                        shutil.copyfile(layout_tmp, layout_path)
                     return LintResult(passed=True)
                 else:
                     # 提取 stderr 中的关键报错信息
@@ -0,0 +1,182 @@
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.core.config import settings
+from src.utils.encoding import get_profile
+from src.utils.logger import logger
+from src.utils.tracing import tracer
+
+# (时长, 分片文件名)
+Chunk = Tuple[float, str]
+
+class ProgressiveWriter:
+    """
+    渐进式输出: 把已完成的片段无损转封装为 HLS 分片 (MPEG-TS)，按故事板顺序追加到
+    progressive/index.m3u8 (EVENT 播放列表)。某个场景及其之前的场景全部结束后才会出现在列表中，
+    审阅者可以边渲染边观看前面的内容。最终的 full_movie.mp4 仍由 Assembler 拼接，不重新编码。
+    """
+    def __init__(
+        self,
+        total: int,
+        out_dir: Optional[Path] = None,
+        spacer_factory: Optional[Callable[[Path], Optional[Path]]] = None
+    ):
+        self.total = total
+        self.out_dir = out_dir or settings.OUTPUT_DIR / "progressive"
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        # 清理上一次运行的分片，避免播放列表引用过期内容
+        for old in list(self.out_dir.glob("*.ts")) + list(self.out_dir.glob("*.m3u8")):
+            old.unlink(missing_ok=True)
+
+        self.playlist_path = self.out_dir / "index.m3u8"
+        self.spacer_factory = spacer_factory
+
+        self._lock = threading.Lock()
+        self._ready: Dict[int, Optional[List[Chunk]]] = {}
+        self._next = 0
+        self._entries: List[str] = []
+        # 播放器只在首次加载时读取 TARGETDURATION，整个 EVENT 列表中必须保持不变 (RFC 8216)
+        # 超过它的分片会强制关键帧重新切分 (见 _remux)
+        self._target_duration = settings.PROGRESSIVE_SEGMENT_SECONDS
+        # 黑屏间隔的分片 (由第一个成功的片段生成一次)，单独加锁，编码期间不阻塞播放列表
+        self._spacer_chunks: Optional[List[Chunk]] = None
+        self._spacer_lock = threading.Lock()
+        self._finalized = False
+
+    @property
+    def published(self) -> int:
+        """已按顺序写入播放列表的场景数 (含跳过的失败场景)"""
+        return self._next
+
+    def add(self, index: int, segment_path: Optional[Path]):
+        """
+        片段完成 (segment_path 为 None 表示该场景失败/跳过)
+        转封装与间隔片段生成在调用线程中进行，不持有锁；只有按顺序追加播放列表时加锁
+        """
+        chunks = None
+        if segment_path:
+            try:
+                chunks = self._remux(f"scene_{index:03d}", Path(segment_path))
+            except (subprocess.CalledProcessError, OSError) as e:
+                logger.warning(f"   ⚠️ [Progressive] Failed to remux scene {index}: {e}")
+        if chunks and self.total > 1:
+            self._prepare_spacer(Path(segment_path))
+
+        with self._lock:
+            self._ready[index] = chunks
+            self._flush()
+
+    def finalize(self):
+        """所有场景结束: 未到达的场景视为跳过，写入 ENDLIST"""
+        with self._lock:
+            for index in range(self._next, self.total):
+                self._ready.setdefault(index, None)
+            self._flush()
+            self._finalized = True
+            self._write_playlist()
+
+    def _flush(self):
+        appended = False
+        while self._next in self._ready:
+            chunks = self._ready.pop(self._next)
+            self._next += 1
+            if not chunks:
+                continue
+            if self._entries:
+                self._append(self._spacer_chunks)
+            self._append(chunks)
+            appended = True
+        if appended:
+            self._write_playlist()
+            logger.info(f"   📺 [Progressive] {self._next}/{self.total} scenes published")
+
+    def _append(self, chunks: Optional[List[Chunk]]):
+        if not chunks:
+            return
+        # 每个片段的时间戳从 0 开始，需要声明不连续
+        if self._entries:
+            self._entries.append("#EXT-X-DISCONTINUITY")
+        for duration, name in chunks:
+            self._entries.append(f"#EXTINF:{duration:.3f},")
+            self._entries.append(name)
+
+    def _prepare_spacer(self, reference: Path):
+        """用第一个成功的片段生成同参数的黑屏间隔 (只生成一次，可能需要编码，因此不持有播放列表锁)"""
+        if not self.spacer_factory:
+            return
+        with self._spacer_lock:
+            if self._spacer_chunks is not None:
+                return
+            chunks: List[Chunk] = []
+            try:
+                spacer = self.spacer_factory(reference)
+                if spacer:
+                    chunks = self._remux("spacer", spacer)
+            except (subprocess.CalledProcessError, OSError) as e:
+                logger.warning(f"   ⚠️ [Progressive] Failed to remux spacer: {e}")
+            self._spacer_chunks = chunks
+
+    def _remux(self, name: str, src: Path) -> List[Chunk]:
+        """
+        -c copy 转封装为 TS 分片 (只在关键帧处切分)，返回分片列表
+        GOP 过长导致分片超过 TARGETDURATION 时，改为按 preview 档位重新编码并强制关键帧
+        """
+        chunks = self._segment(name, src)
+        if all(round(duration) <= self._target_duration for duration, _ in chunks):
+            return chunks
+        logger.info(f"   📺 [Progressive] {name}: keyframes too sparse for {self._target_duration}s chunks, re-encoding")
+        for _, chunk in chunks:
+            (self.out_dir / chunk).unlink(missing_ok=True)
+        return self._segment(name, src, [
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", *get_profile("preview").video_args(),
+            "-force_key_frames", f"expr:gte(t,n_forced*{self._target_duration})",
+            "-c:a", "copy"
+        ])
+
+    def _segment(self, name: str, src: Path, codec_args: Optional[List[str]] = None) -> List[Chunk]:
+        playlist = self.out_dir / f"{name}.m3u8"
+        with tracer.span("ffmpeg.hls", "ffmpeg", chunk=name):
+            subprocess.run([
+                "ffmpeg", "-y", "-v", "error",
+                "-i", str(src),
+                *(codec_args or ["-c", "copy"]),
+                "-f", "hls",
+                "-hls_time", str(settings.PROGRESSIVE_SEGMENT_SECONDS),
+                "-hls_playlist_type", "vod",
+                "-hls_segment_filename", str(self.out_dir / f"{name}_%03d.ts"),
+                str(playlist)
+            ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            return self._parse_chunks(playlist.read_text(encoding="utf-8"))
+        finally:
+            playlist.unlink(missing_ok=True)
+
+    @staticmethod
+    def _parse_chunks(text: str) -> List[Chunk]:
+        chunks, duration = [], None
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith("#EXTINF:"):
+                duration = float(line[len("#EXTINF:"):].split(",")[0])
+            elif line and not line.startswith("#") and duration is not None:
+                chunks.append((duration, Path(line).name))
+                duration = None
+        return chunks
+
+    def _write_playlist(self):
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{self._target_duration}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            *self._entries
+        ]
+        if self._finalized:
+            lines.append("#EXT-X-ENDLIST")
+        tmp_path = self.playlist_path.with_name(f".{self.playlist_path.name}.tmp")
+        tmp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.playlist_path)
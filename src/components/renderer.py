@@ -1,24 +1,27 @@
 import subprocess
 import shutil
 import os
+import json
 import asyncio
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 import uuid
 
 from src.core.models import RenderArtifact
 from src.core.config import settings
+from src.core.scheduler import scheduler
+from src.utils.tracing import tracer
+from src.components.instrumentation import instrument_code
+from src.utils import media_info
+from src.utils.image_ops import build_contact_sheet
 
 class RenderError(Exception):
     pass
 
 class ManimRunner:
-    # 全局并发信号量，限制同时运行的 Docker 容器数量
-    # 避免 CPU/内存 爆炸
-    _semaphore = asyncio.Semaphore(2) 
-
-    def __init__(self):
-        self.output_dir = settings.OUTPUT_DIR
+    def __init__(self, output_dir: Optional[Path] = None):
+        # 运行目录 (批量模式下每个任务各自一个)
+        self.output_dir = Path(output_dir) if output_dir else settings.OUTPUT_DIR
         self.docker_image = settings.DOCKER_IMAGE
         self._check_docker_availability()
 
@@ -31,10 +34,12 @@ class ManimRunner:
     async def render_async(self, code: str, scene_id: str, quality: str = "l") -> RenderArtifact:
         """
         [Async] 异步渲染入口，带有并发限制
+        同时运行的 Docker 容器数由全局调度器限制 (RENDER_CONCURRENCY)，靠前的场景与重试中的场景优先
         """
-        async with self._semaphore:
-            # 将阻塞的同步渲染逻辑放到线程池中运行，避免阻塞 asyncio 事件循环
-            return await asyncio.to_thread(self.render_sync, code, scene_id, quality)
+        with tracer.span("render.docker", "render", render_id=scene_id, quality=quality):
+            async with scheduler.slot("render"):
+                # 将阻塞的同步渲染逻辑放到线程池中运行，避免阻塞 asyncio 事件循环
+                return await asyncio.to_thread(self.render_sync, code, scene_id, quality)
 
     def render_sync(self, code: str, scene_id: str, quality: str = "l") -> RenderArtifact:
         """
@@ -51,8 +56,10 @@ class ManimRunner:
 
         script_path = temp_dir / "scene.py"
         
+        # 可选：注入布局埋点，容器内写到挂载目录下的 layout.json
+        instrument = settings.LAYOUT_INSTRUMENTATION
         with open(script_path, "w", encoding="utf-8") as f:
-            f.write(code)
+            f.write(instrument_code(code, "/manim/output/layout.json") if instrument else code)
 
         cmd = [
             "docker", "run", "--rm",
@@ -107,13 +114,33 @@ class ManimRunner:
                 print(f"⚠️ Warning: Failed to extract frame: {e}")
                 final_image_path = "N/A"
 
+            layout_path = None
+            layout_src = temp_dir / "layout.json"
+            if instrument and layout_src.exists():
+                layout_dir = self.output_dir / "layout"
+                layout_dir.mkdir(parents=True, exist_ok=True)
+                layout_path = layout_dir / f"{scene_id}.json"
+                shutil.move(str(layout_src), str(layout_path))
+
+            sheet_path, timestamps = None, []
+            if settings.CRITIC_CONTACT_SHEET:
+                try:
+                    sheet_path, timestamps = self._extract_contact_sheet(
+                        final_video_path, scene_id, temp_dir, layout_path
+                    )
+                except Exception as e:
+                    print(f"⚠️ Warning: Failed to build contact sheet: {e}")
+
             shutil.rmtree(temp_dir, ignore_errors=True)
 
             return RenderArtifact(
                 scene_id=scene_id,
                 video_path=str(final_video_path),
                 last_frame_path=str(final_image_path),
-                code_content=code
+                code_content=code,
+                layout_path=str(layout_path) if layout_path else None,
+                contact_sheet_path=str(sheet_path) if sheet_path else None,
+                keyframe_timestamps=timestamps
             )
 
         except TimeoutError:
@@ -122,6 +149,65 @@ class ManimRunner:
             shutil.rmtree(temp_dir, ignore_errors=True)
             raise RenderError(f"System Error: {str(e)}")
 
+    def _probe_video(self, video_path: Path) -> Tuple[float, float]:
+        """返回 (时长秒, 帧率)"""
+        info = media_info.probe(video_path)
+        if not info.fps:
+            raise RuntimeError(f"Unable to determine frame rate of {video_path}")
+        return info.duration, info.fps
+
+    def _keyframe_times(self, duration: float, fps: float, layout_path: Optional[Path]) -> List[float]:
+        """
+        选择关键帧时间点:
+        - play 模式: 每次 play / wait 结束的时刻 (来自布局埋点)
+        - even 模式 / 没有埋点: 在整段视频上均匀取点，最后一帧必选
+        """
+        count = max(1, settings.CRITIC_KEYFRAMES)
+        last = max(0.0, duration - 1.0 / fps)
+
+        times: List[float] = []
+        if settings.CRITIC_KEYFRAME_MODE == "play" and layout_path and Path(layout_path).exists():
+            with open(layout_path, "r", encoding="utf-8") as f:
+                snapshots = json.load(f).get("snapshots", [])
+            times = sorted({min(s["t"], last) for s in snapshots if s.get("t") is not None})
+            if len(times) > count:
+                # 超出数量时均匀下采样，保留最后一个
+                step = (len(times) - 1) / (count - 1) if count > 1 else 0
+                times = [times[round(i * step)] for i in range(count)] if count > 1 else [times[-1]]
+
+        if not times:
+            times = [last * (i + 1) / count for i in range(count)]
+        return [round(t, 3) for t in times]
+
+    def _extract_contact_sheet(
+        self, video_path: Path, scene_id: str, work_dir: Path, layout_path: Optional[Path]
+    ) -> Tuple[Path, List[float]]:
+        """
+        一次 ffmpeg 调用抽取所有关键帧，再拼成一张带时间戳的网格图
+        """
+        duration, fps = self._probe_video(video_path)
+        times = self._keyframe_times(duration, fps, layout_path)
+        total_frames = max(1, int(duration * fps))
+        frame_ids = sorted({min(int(round(t * fps)), total_frames - 1) for t in times})
+
+        select_expr = "+".join(f"eq(n,{n})" for n in frame_ids)
+        frames_dir = work_dir / "keyframes"
+        frames_dir.mkdir(parents=True, exist_ok=True)
+        subprocess.run([
+            "ffmpeg", "-y", "-v", "error",
+            "-i", str(video_path),
+            "-vf", f"select='{select_expr}',scale={settings.CRITIC_KEYFRAME_WIDTH}:-2",
+            "-vsync", "vfr",
+            str(frames_dir / "frame_%03d.png")
+        ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        frame_paths = sorted(frames_dir.glob("frame_*.png"))
+        timestamps = [round(n / fps, 2) for n in frame_ids][:len(frame_paths)]
+
+        sheet_path = self.output_dir / "picture" / f"{scene_id}_sheet.png"
+        build_contact_sheet(frame_paths, [f"t={t:.2f}s" for t in timestamps], sheet_path)
+        return sheet_path, timestamps
+
     def _find_file(self, root_dir: Path, extension: str) -> Optional[Path]:
         for path in root_dir.rglob(f"*{extension}"):
             return path
@@ -0,0 +1,190 @@
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Set
+
+from pydantic import BaseModel
+
+from src.core.config import settings
+from src.core.models import RenderArtifact, SceneSpec
+from src.utils.hashing import file_digest, text_digest
+from src.utils.logger import logger
+
+# 修改缓存布局或 key 的组成时递增，旧条目自动失效
+SCENE_CACHE_VERSION = 1
+
+# 决定 LLM 生成结果的源码 (提示词模板与 System Prompt 拼装)，内容变化即整体失效
+PROMPT_SOURCES = (
+    Path(__file__).resolve().parent.parent / "llm" / "prompts.py",
+    Path(__file__).resolve().parent / "context_builder.py",
+)
+
+class SceneEntry(BaseModel):
+    """
+    场景缓存中的一条记录 (对应 <key>/entry.json)
+    """
+    key: str
+    scene_id: str               # 写入时的场景 ID，便于排查
+    description: str = ""       # 只保存前 80 个字符
+    created_at: float
+    artifact: RenderArtifact    # 路径指向缓存目录中的副本
+
+class SceneCache:
+    """
+    跨运行的场景级缓存 (OUTPUT_DIR/cache/scenes/<key>/)
+    key = hash(SceneSpec 内容, 模型名, 提示词源码, lib/ 资源, 渲染参数, 旁白音色)，与 scene_id 无关:
+    - 再次运行同一故事板时，未修改的场景直接复用上次通过审查的渲染结果，跳过整个子图
+    - 不同故事板中内容相同的场景也能命中
+    - 修改提示词 / lib/ / 模型后 key 全部变化；单个场景可用 --rerender 强制重新生成，--clear-scene-cache 清空全部
+    渲染产物 (视频、末帧、拼图、埋点) 复制到缓存目录，运行目录中的文件被后续运行覆盖也不影响
+    总体积超过 max_bytes 时按最近命中时间 (entry.json 的 mtime) 淘汰，失效的旧条目也会被清理
+    """
+    ARTIFACT_FILES = ("video_path", "last_frame_path", "contact_sheet_path", "layout_path")
+
+    def __init__(self, root: Optional[Path] = None, lib_dir: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.root = root or settings.OUTPUT_DIR / "cache" / "scenes"
+        self.lib_dir = lib_dir or settings.LIB_DIR
+        self.max_bytes = settings.SCENE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._environment: Optional[str] = None
+        # 缓存总体积，首次淘汰时扫描一次，之后增量维护
+        self._total_bytes: Optional[int] = None
+
+    def environment_digest(self) -> str:
+        """所有场景共享的部分: 模型、提示词源码、lib/ 资源与渲染参数 (每个实例只计算一次)"""
+        if self._environment is None:
+            sources = [file_digest(p) if p.exists() else "" for p in PROMPT_SOURCES]
+            assets = [
+                f"{p.relative_to(self.lib_dir)}:{file_digest(p)}"
+                for p in sorted(self.lib_dir.rglob("*")) if p.is_file()
+            ] if self.lib_dir.exists() else []
+            self._environment = text_digest(
+                SCENE_CACHE_VERSION,
+                settings.PLANNER_MODEL, settings.CODER_MODEL, settings.CRITIC_MODEL,
+                *sources, *assets,
+                settings.DOCKER_IMAGE, settings.VIDEO_WIDTH, settings.VIDEO_HEIGHT,
+                settings.LAYOUT_INSTRUMENTATION, settings.GEOMETRY_CRITIC,
+                settings.CRITIC_CONTACT_SHEET, settings.CRITIC_KEYFRAMES, settings.CRITIC_KEYFRAME_MODE,
+                settings.SCENE_CACHE_SALT
+            )
+        return self._environment
+
+    def key_for(self, scene: SceneSpec, audio_key: str = "") -> str:
+        """audio_key: 旁白的 TTS 缓存 key (包含音色/模型)，旁白时长决定了动画时长"""
+        content = scene.model_dump_json(exclude={"scene_id"})
+        return text_digest(self.environment_digest(), content, audio_key)
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    @staticmethod
+    def _dir_size(path: Path) -> int:
+        try:
+            return sum(p.stat().st_size for p in path.iterdir() if p.is_file())
+        except FileNotFoundError:
+            return 0
+
+    def get(self, key: str, scene_id: str) -> Optional[RenderArtifact]:
+        """命中时返回指向缓存副本的产物 (scene_id 改写为当前场景)，文件缺失视为未命中"""
+        meta_path = self._entry_dir(key) / "entry.json"
+        try:
+            entry = SceneEntry.model_validate_json(meta_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+        artifact = entry.artifact
+        if not Path(artifact.video_path).exists():
+            return None
+        # 记录最近命中时间 (LRU 淘汰依据)
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        artifact.scene_id = scene_id
+        return artifact
+
+    def store(self, key: str, scene: SceneSpec, artifact: RenderArtifact) -> Optional[RenderArtifact]:
+        """复制产物文件并写入元数据 (先写临时目录再整体替换，读者不会看到半个条目)"""
+        if not artifact.video_path or not Path(artifact.video_path).exists():
+            return None
+
+        entry_dir = self._entry_dir(key)
+        staging = entry_dir.with_name(f"{key}.tmp{os.getpid()}_{threading.get_ident()}")
+        try:
+            if staging.exists():
+                shutil.rmtree(staging)
+            staging.mkdir(parents=True)
+            updates = {}
+            for field in self.ARTIFACT_FILES:
+                value = getattr(artifact, field)
+                if not value or value == "N/A" or not Path(value).exists():
+                    continue
+                target = staging / f"{field.replace('_path', '')}{Path(value).suffix}"
+                shutil.copy2(value, target)
+                updates[field] = str(entry_dir / target.name)
+
+            entry = SceneEntry(
+                key=key,
+                scene_id=scene.scene_id,
+                description=scene.description[:80],
+                created_at=time.time(),
+                artifact=artifact.model_copy(update=updates)
+            )
+            (staging / "entry.json").write_text(entry.model_dump_json(indent=2), encoding="utf-8")
+            size = self._dir_size(staging)
+
+            with self._lock:
+                replaced = self._dir_size(entry_dir)
+                if entry_dir.exists():
+                    shutil.rmtree(entry_dir)
+                os.replace(staging, entry_dir)
+                if self._total_bytes is not None:
+                    self._total_bytes += size - replaced
+        except Exception as e:
+            logger.warning(f"⚠️ [SceneCache] Failed to store {scene.scene_id}: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return None
+
+        try:
+            self.evict(keep={key})
+        except OSError as e:
+            logger.warning(f"⚠️ [SceneCache] Eviction failed: {e}")
+        return entry.artifact
+
+    def evict(self, keep: Optional[Set[str]] = None):
+        """
+        LRU 淘汰: 总体积超过上限时，从最久未命中的条目开始删除
+        key 与场景内容绑定，其他故事板或旧版本提示词留下的条目不会再被命中，只能靠这里清理
+        """
+        if not self.max_bytes:
+            return
+        keep = keep or set()
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(self._dir_size(m.parent) for m in self.root.glob("*/*/entry.json"))
+            if self._total_bytes <= self.max_bytes:
+                return
+            entries = sorted(self.root.glob("*/*/entry.json"), key=lambda m: m.stat().st_mtime)
+            sizes = {m: self._dir_size(m.parent) for m in entries}
+            total = sum(sizes.values())
+            for meta_path in entries:
+                if total <= self.max_bytes:
+                    break
+                if meta_path.parent.name in keep:
+                    continue
+                shutil.rmtree(meta_path.parent, ignore_errors=True)
+                total -= sizes[meta_path]
+                logger.info(f"🧹 [SceneCache] Evicted {meta_path.parent.name[:12]} ({sizes[meta_path]} bytes)")
+            self._total_bytes = total
+
+    def clear(self) -> int:
+        """删除全部条目，返回删除的条目数"""
+        removed = 0
+        with self._lock:
+            for meta_path in self.root.glob("*/*/entry.json"):
+                shutil.rmtree(meta_path.parent, ignore_errors=True)
+                removed += 1
+            self._total_bytes = None
+        return removed
@@ -1,11 +1,86 @@
-import dashscope
-import requests
+import asyncio
+import copy
+import json
+import os
 import subprocess
+import threading
+import weakref
+import dashscope
+import httpx
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
 from src.core.config import settings
+from src.core.models import SentenceTiming
+from src.components.audio_store import AudioEntry, AudioStore
+from src.utils import media_info
+from src.utils.audio_ops import CANONICAL_AUDIO_EXT, concat_audio, split_sentences, to_canonical_audio
+from src.utils.hashing import text_digest
 from src.utils.logger import logger
 
+class TTSError(Exception):
+    pass
+
+def scene_audio_path(scene_id: str, output_dir: Optional[Path] = None) -> Optional[Path]:
+    """运行目录中某个场景的旁白音频 (优先标准 AAC 音轨)"""
+    audio_dir = (output_dir or settings.OUTPUT_DIR) / "audio"
+    for ext in (CANONICAL_AUDIO_EXT, "mp3"):
+        path = audio_dir / f"{scene_id}.{ext}"
+        if path.exists():
+            return path
+    return None
+
+class DurationEstimator:
+    """
+    根据文案字数估算旁白时长 (字/秒)
+    每次真实合成后用实际时长校准，结果持久化，下一次运行直接使用校准后的语速
+    """
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or settings.OUTPUT_DIR / "cache" / "tts_rate.json"
+        self._lock = threading.Lock()
+        self.chars = 0
+        self.seconds = 0.0
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.chars, self.seconds = int(data["chars"]), float(data["seconds"])
+        except (FileNotFoundError, KeyError, ValueError):
+            pass
+
+    @staticmethod
+    def _count(text: str) -> int:
+        return len("".join(text.split()))
+
+    @property
+    def chars_per_second(self) -> float:
+        # 样本太少时使用默认语速 (与 Storyboard Prompt 中的 "1 秒 ≈ 4 个汉字" 一致)
+        if self.chars < 50 or self.seconds <= 0:
+            return settings.TTS_CHARS_PER_SECOND
+        return self.chars / self.seconds
+
+    def estimate(self, text: str) -> float:
+        return round(max(2.0, self._count(text) / self.chars_per_second), 2)
+
+    def observe(self, text: str, duration: float):
+        if duration <= 0:
+            return
+        with self._lock:
+            self.chars += self._count(text)
+            self.seconds += duration
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.path.write_text(json.dumps({"chars": self.chars, "seconds": self.seconds}), encoding="utf-8")
+            except OSError as e:
+                logger.warning(f"⚠️ [TTS] Failed to persist speech rate: {e}")
+
 class TTSEngine:
+    # 每个 TTS 服务商一个并发信号量 (类级别共享，所有场景 / fork 出的实例共用)
+    # 避免 50 个场景同时请求时触发限流，也让线程/内存占用保持平稳
+    # asyncio.Semaphore 绑定创建它的事件循环，所以按事件循环分组，循环关闭回收后随之释放
+    _semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = \
+        weakref.WeakKeyDictionary()
+
+    DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
     def __init__(self):
         self.output_dir = settings.OUTPUT_DIR / "audio"
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -15,85 +90,268 @@ class TTSEngine:
         dashscope.base_http_api_url = 'https://dashscope.aliyuncs.com/api/v1'
         
         # 使用 Qwen TTS 模型
+        self.provider = "dashscope"
         self.model = "qwen3-tts-flash" 
         self.voice = "Cherry"
+        self.language_type = "Chinese"
+        self.audio_format = "mp3"
+
+        # 内容寻址缓存 (跨场景、跨运行共享)
+        self.store = AudioStore()
+        # 运行目录中的音频路径 -> 时长 (来自缓存元数据，避免重复 ffprobe)
+        self._durations: Dict[str, float] = {}
+        # 正在合成中的 key，相同文案并发请求时只合成一次
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # 字数 -> 时长估算 (TTS 与规划/写代码并行时使用)
+        self.estimator = DurationEstimator()
+
+        # 重试策略 (测试中可替换为 wait_none)
+        self.retry_wait = wait_exponential(multiplier=0.5, max=8)
+        # httpx 传输层 (测试中可替换为 MockTransport)
+        self._transport: Optional[httpx.AsyncBaseTransport] = None
+
+    @classmethod
+    def _semaphore_for(cls, provider: str) -> asyncio.Semaphore:
+        per_loop = cls._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if provider not in per_loop:
+            per_loop[provider] = asyncio.Semaphore(settings.TTS_CONCURRENCY)
+        return per_loop[provider]
+
+    def fork(self, output_dir: Path) -> "TTSEngine":
+        """
+        输出到另一个运行目录的 TTSEngine (批量模式下每个任务一个)
+        与原实例共享音频缓存、进行中的合成任务与语速估算，相同旁白跨任务只合成一次
+        """
+        engine = copy.copy(self)
+        engine.output_dir = Path(output_dir) / "audio"
+        engine.output_dir.mkdir(parents=True, exist_ok=True)
+        return engine
 
     def get_duration(self, audio_path: str) -> float:
-        """获取音频时长(秒)"""
+        """获取音频时长(秒)，进程内解析文件头，只有未知格式才会调用 ffprobe"""
         if not audio_path or not Path(audio_path).exists():
             return 0.0
-            
-        cmd = [
-            "ffprobe", 
-            "-v", "error", 
-            "-show_entries", "format=duration", 
-            "-of", "default=noprint_wrappers=1:nokey=1", 
-            audio_path
-        ]
+
+        if str(audio_path) in self._durations:
+            return self._durations[str(audio_path)]
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            val = result.stdout.strip()
-            return float(val) if val else 0.0
+            return media_info.probe_duration(audio_path)
         except Exception as e:
             logger.error(f"⚠️ Failed to get duration for {audio_path}: {e}")
             return 0.0
 
-    def generate(self, text: str, scene_id: str) -> str:
+    def cache_key(self, text: str) -> str:
+        return self.store.key_for(text, self.voice, self.model, self.language_type, self.audio_format)
+
+    def _plan(self, text: str) -> Tuple[List[str], List[str], str]:
         """
-        生成音频文件，返回路径
+        返回 (句子列表, 每句的缓存 key, 整段音频的缓存 key)
+        开启分句时，整段音频的 key 由各句 key 组合而成，修改某一句只会重新合成这一句
         """
-        file_path = self.output_dir / f"{scene_id}.mp3"
-        
-        if file_path.exists():
-            logger.info(f"🔊 [TTS] Using cached audio for {scene_id}")
-            return str(file_path)
+        sentences = split_sentences(text) if settings.TTS_SENTENCE_CHUNKING else []
+        if len(sentences) <= 1:
+            key = self.cache_key(text)
+            return [text], [key], key
+        chunk_keys = [self.cache_key(s) for s in sentences]
+        return sentences, chunk_keys, text_digest("concat", *chunk_keys)
 
-        logger.info(f"🔊 [TTS] Generating audio for {scene_id} (DashScope Qwen)...")
+    def cached_duration(self, text: str) -> Optional[float]:
+        """文案已在缓存中时直接返回真实时长 (无需等待合成)"""
+        key = self._plan(text)[2]
+        # 标准音轨转换失败时缓存中只有原始音频，时长相同
+        entry = self.store.get(self._final_key(key)) or self.store.get(key)
+        return entry.duration if entry else None
+
+    @staticmethod
+    def _final_key(key: str) -> str:
+        """运行目录最终使用的音频对应的缓存 key (开启标准音轨时为 AAC 版本)"""
+        return text_digest(CANONICAL_AUDIO_EXT, key) if settings.TTS_CANONICAL_AUDIO else key
+
+    def estimate_timing(self, text: str) -> List[SentenceTiming]:
+        """按字数把估算时长分配到每一句 (真实音频生成前使用)"""
+        sentences = split_sentences(text) or [text]
+        return self._timeline(sentences, [self.estimator.estimate(s) for s in sentences])
+
+    @staticmethod
+    def _timeline(sentences: List[str], durations: List[float]) -> List[SentenceTiming]:
+        timing, cursor = [], 0.0
+        for sentence, duration in zip(sentences, durations):
+            timing.append(SentenceTiming(text=sentence, start=round(cursor, 3), end=round(cursor + duration, 3)))
+            cursor += duration
+        return timing
+
+    def timing_path(self, scene_id: str) -> Path:
+        return self.output_dir / f"{scene_id}.timing.json"
+
+    def load_timing(self, scene_id: str) -> Optional[List[SentenceTiming]]:
         try:
-            # 尝试使用 MultiModalConversation (Refer to apiexample)
-            response = dashscope.MultiModalConversation.call(
-                model=self.model,
-                api_key=settings.DASHSCOPE_API_KEY,
-                text=text,
-                voice=self.voice,
-                language_type="Chinese"
-            )
-            
-            # Check for success
-            if response.status_code == 200:
-                output = response.output
-                # Need to handle output safely as it could be object or dict depending on SDK version
-                # Based on example output:
-                # "output": { "audio": { "url": "..." } }
-                
-                audio_info = None
-                if isinstance(output, dict):
-                    audio_info = output.get('audio')
-                else:
-                    audio_info = getattr(output, 'audio', None)
-                
-                audio_url = None
-                if audio_info:
-                    if isinstance(audio_info, dict):
-                        audio_url = audio_info.get('url')
-                    else:
-                        audio_url = getattr(audio_info, 'url', None)
-
-                if audio_url:
-                    logger.info(f"🔊 [TTS] Downloading audio from {audio_url}")
-                    resp = requests.get(audio_url)
-                    resp.raise_for_status()
-                    with open(file_path, 'wb') as f:
-                        f.write(resp.content)
-                    return str(file_path)
-                else:
-                     logger.error(f"⚠️ [TTS] Audio URL not found in response: {response}")
-                     return ""
-
-            logger.error(f"⚠️ [TTS] DashScope Failed: {response.message}")
-            return ""
-                
+            data = json.loads(self.timing_path(scene_id).read_text(encoding="utf-8"))
+            return [SentenceTiming(**item) for item in data["sentences"]]
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+    async def generate_async(self, text: str, scene_id: str) -> str:
+        """
+        [Async] 生成音频文件，返回路径 (失败返回空字符串)
+        缓存按文案内容寻址，结果以链接形式放到 output/audio/<scene_id>.m4a (标准音轨) 或 .mp3
+        长文案按句切分并发合成，无损拼接，同时输出每句的时间清单 <scene_id>.timing.json
+        """
+        sentences, chunk_keys, key = self._plan(text)
+
+        try:
+            chunks = await asyncio.gather(*[
+                self._entry_for(k, s, scene_id) for k, s in zip(chunk_keys, sentences)
+            ])
+            if len(chunks) == 1:
+                entry = chunks[0]
+            else:
+                entry = self.store.get(key) or await self._once(
+                    key, lambda: self._concat_to_store(key, list(chunks), text)
+                )
+
+            if settings.TTS_CANONICAL_AUDIO:
+                entry = await self._canonical_entry(entry, text)
+
+            ext = Path(entry.path).suffix.lstrip(".")
+            file_path = self.output_dir / f"{scene_id}.{ext}"
+            self.store.link(entry, file_path)
+            # 清理另一种格式的旧链接，避免组装时拿到过期音频
+            for stale_ext in {CANONICAL_AUDIO_EXT, self.audio_format} - {ext}:
+                (self.output_dir / f"{scene_id}.{stale_ext}").unlink(missing_ok=True)
+            self._durations[str(file_path)] = entry.duration
+            self._write_timing(scene_id, self._timeline(sentences, [c.duration for c in chunks]))
+            return str(file_path)
+
         except Exception as e:
             logger.error(f"⚠️ [TTS] DashScope Exception: {e}")
             return ""
+
+    async def _entry_for(self, key: str, text: str, scene_id: str) -> AudioEntry:
+        entry = self.store.get(key)
+        if entry:
+            logger.info(f"🔊 [TTS] Using cached audio for {scene_id} ({key[:12]})")
+            return entry
+        return await self._once(key, lambda: self._synthesize_to_store(key, text, scene_id))
+
+    async def _once(self, key: str, factory) -> AudioEntry:
+        """同一个 key 的并发请求共享同一次合成"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _canonical_entry(self, entry: AudioEntry, text: str) -> AudioEntry:
+        """把音频转换为标准 AAC 音轨并缓存；转换失败 (如缺少 ffmpeg) 时沿用原始音频"""
+        ckey = self._final_key(entry.key)
+        cached = self.store.get(ckey)
+        if cached:
+            return cached
+        try:
+            return await self._once(ckey, lambda: self._transcode_to_store(ckey, entry, text))
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"⚠️ [TTS] Canonical audio conversion failed, using original: {e}")
+            return entry
+
+    async def _transcode_to_store(self, key: str, entry: AudioEntry, text: str) -> AudioEntry:
+        staging = self.store.staging_path(key, CANONICAL_AUDIO_EXT)
+        try:
+            await asyncio.to_thread(to_canonical_audio, entry.path, staging)
+        except BaseException:
+            staging.unlink(missing_ok=True)
+            raise
+        # AAC 编码会引入少量 priming 延迟，时长以原始音频为准
+        return self.store.put(key, staging, entry.duration, text=text)
+
+    async def _concat_to_store(self, key: str, chunks: List[AudioEntry], text: str) -> AudioEntry:
+        staging = self.store.staging_path(key, self.audio_format)
+        await asyncio.to_thread(concat_audio, [c.path for c in chunks], staging)
+        duration = await asyncio.to_thread(self.get_duration, str(staging))
+        return self.store.put(key, staging, duration, text=text)
+
+    def _write_timing(self, scene_id: str, timing: List[SentenceTiming]):
+        path = self.timing_path(scene_id)
+        payload = {
+            "scene_id": scene_id,
+            "duration": timing[-1].end if timing else 0.0,
+            "sentences": [t.model_dump() for t in timing]
+        }
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    async def _synthesize_to_store(self, key: str, text: str, scene_id: str) -> AudioEntry:
+        logger.info(f"🔊 [TTS] Generating audio for {scene_id} (DashScope Qwen)...")
+        staging = self.store.staging_path(key, self.audio_format)
+        async with self._semaphore_for(self.provider):
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(settings.TTS_MAX_RETRIES),
+                wait=self.retry_wait,
+                retry=retry_if_exception_type((TTSError, httpx.HTTPError)),
+                reraise=True
+            ):
+                with attempt:
+                    audio_url = await self._synthesize(text)
+                    logger.info(f"🔊 [TTS] Downloading audio from {audio_url}")
+                    await self._download(audio_url, staging)
+
+        duration = await asyncio.to_thread(self.get_duration, str(staging))
+        self.estimator.observe(text, duration)
+        return self.store.put(key, staging, duration, text=text)
+
+    async def _synthesize(self, text: str) -> str:
+        """调用 DashScope 异步接口，返回音频下载地址"""
+        response = await dashscope.AioMultiModalConversation.call(
+            model=self.model,
+            api_key=settings.DASHSCOPE_API_KEY,
+            text=text,
+            voice=self.voice,
+            language_type=self.language_type
+        )
+
+        if response.status_code != 200:
+            raise TTSError(f"DashScope Failed: {response.message}")
+
+        audio_url = self._extract_audio_url(response.output)
+        if not audio_url:
+            raise TTSError(f"Audio URL not found in response: {response}")
+        return audio_url
+
+    @staticmethod
+    def _extract_audio_url(output) -> Optional[str]:
+        # output 可能是对象也可能是 dict，取决于 SDK 版本
+        # 参考返回结构: "output": { "audio": { "url": "..." } }
+        if isinstance(output, dict):
+            audio_info = output.get('audio')
+        else:
+            audio_info = getattr(output, 'audio', None)
+
+        if not audio_info:
+            return None
+        if isinstance(audio_info, dict):
+            return audio_info.get('url')
+        return getattr(audio_info, 'url', None)
+
+    async def _download(self, url: str, file_path: Path):
+        """
+        流式分块下载到临时文件，完成后原子重命名
+        避免整段音频读入内存，也不会留下写了一半的 mp3 被误当成缓存
+        """
+        tmp_path = file_path.with_name(f".{file_path.name}.part")
+        try:
+            async with httpx.AsyncClient(
+                transport=self._transport,
+                timeout=settings.TTS_DOWNLOAD_TIMEOUT,
+                follow_redirects=True
+            ) as client:
+                async with client.stream("GET", url) as resp:
+                    resp.raise_for_status()
+                    with open(tmp_path, "wb") as f:
+                        async for chunk in resp.aiter_bytes(self.DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+            os.replace(tmp_path, file_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
@@ -0,0 +1,143 @@
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# 状态中会出现的自定义类型 (反序列化白名单)
+_STATE_TYPES = [
+    ("src.core.models", "SceneSpec"),
+    ("src.core.models", "SceneType"),
+    ("src.core.models", "RenderArtifact"),
+    ("src.core.models", "SentenceTiming"),
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT, parent_id TEXT,
+    ckpt_type TEXT, ckpt BLOB, meta_type TEXT, meta BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT, checkpoint_ns TEXT, channel TEXT, version TEXT,
+    value_type TEXT, value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT, task_id TEXT, idx INTEGER,
+    channel TEXT, value_type TEXT, value BLOB, task_path TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+def new_run_id() -> str:
+    """运行 ID (即 LangGraph thread_id)，按时间排序便于查找最近一次运行"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+def _serializer() -> JsonPlusSerializer:
+    try:
+        return JsonPlusSerializer(allowed_msgpack_modules=_STATE_TYPES)
+    except TypeError:
+        # 旧版 langgraph-checkpoint 没有白名单参数
+        return JsonPlusSerializer()
+
+class SqliteCheckpointer(InMemorySaver):
+    """
+    持久化到本地 SQLite 文件的 checkpointer
+    读取沿用 InMemorySaver 的内存结构 (启动时从数据库加载)，每次 put / put_writes 同步写穿到数据库并提交，
+    进程崩溃或 Ctrl-C 后可以用同一个 thread_id (run_id) 从最后完成的节点继续
+    """
+    def __init__(self, db_path: Path):
+        super().__init__(serde=_serializer())
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, ckpt_type, ckpt, meta_type, meta FROM checkpoints"
+        )
+        for thread_id, ns, cid, parent, ckpt_type, ckpt, meta_type, meta in rows:
+            self.storage[thread_id][ns][cid] = ((ckpt_type, ckpt), (meta_type, meta), parent)
+
+        rows = self._conn.execute("SELECT thread_id, checkpoint_ns, channel, version, value_type, value FROM blobs")
+        for thread_id, ns, channel, version, value_type, value in rows:
+            self.blobs[(thread_id, ns, channel, json.loads(version))] = (value_type, value)
+
+        rows = self._conn.execute(
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value, task_path FROM writes"
+        )
+        for thread_id, ns, cid, task_id, idx, channel, value_type, value, task_path in rows:
+            self.writes[(thread_id, ns, cid)][(task_id, idx)] = (task_id, channel, (value_type, value), task_path)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"]["checkpoint_ns"]
+        cid = checkpoint["id"]
+        ckpt, meta, parent = self.storage[thread_id][ns][cid]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, ns, cid, parent, ckpt[0], ckpt[1], meta[0], meta[1])
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (thread_id, ns, channel, json.dumps(version), *self.blobs[(thread_id, ns, channel, version)])
+                    for channel, version in new_versions.items()
+                ]
+            )
+        return next_config
+
+    def put_writes(self, config, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = ""):
+        super().put_writes(config, writes, task_id, task_path)
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        cid = config["configurable"]["checkpoint_id"]
+        stored = self.writes.get((thread_id, ns, cid), {})
+        rows = [
+            (thread_id, ns, cid, tid, idx, channel, value[0], value[1], path)
+            for (tid, idx), (_, channel, value, path) in stored.items()
+            if tid == task_id
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str):
+        super().delete_thread(thread_id)
+        with self._lock, self._conn:
+            for table in ("checkpoints", "blobs", "writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def run_value(self, run_id: str, key: str) -> Any:
+        """读取某次运行父图最新 checkpoint 中的状态字段 (例如 scenes)"""
+        saved = self.get_tuple({"configurable": {"thread_id": run_id, "checkpoint_ns": ""}})
+        return saved.checkpoint["channel_values"].get(key) if saved else None
+
+    def run_writes(self, run_id: str, key: str) -> List[Any]:
+        """
+        父图最新 checkpoint 之后、已完成的任务写入某个字段的值
+        所有场景在同一步中并行执行，中途中断时已结束场景的结果只存在于这些 pending writes 中
+        """
+        saved = self.get_tuple({"configurable": {"thread_id": run_id, "checkpoint_ns": ""}})
+        if not saved:
+            return []
+        return [value for _, channel, value in saved.pending_writes or [] if channel == key]
+
+    def latest_run(self) -> Optional[str]:
+        """最近一次运行的 run_id (只看父图命名空间)"""
+        runs = [t for t, namespaces in self.storage.items() if namespaces.get("")]
+        return max(runs, default=None)
+
+    def close(self):
+        self._conn.close()
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # 项目根目录定位 (假设当前文件在 src/core/config.py)
@@ -21,9 +22,83 @@ class Settings(BaseSettings):
     DOCKER_IMAGE: str = "auto-manim-runner:v1"
     DOCKER_TIMEOUT: int = 60 # 秒
 
+    # TTS Configuration
+    TTS_CONCURRENCY: int = 4            # 每个 TTS 服务商的最大并发请求数
+    TTS_MAX_RETRIES: int = 3
+    TTS_DOWNLOAD_TIMEOUT: float = 60.0  # 秒
+    TTS_CACHE_MAX_BYTES: int = 2 * 1024 ** 3  # 内容寻址音频缓存上限 (LRU 淘汰)，0 表示不限
+    TTS_CHARS_PER_SECOND: float = 4.0   # 未校准时的默认语速，用于在 TTS 完成前估算时长
+    TTS_DURATION_TOLERANCE: float = 1.5 # 真实时长与估算相差超过该值(秒)时重新生成代码
+    TTS_SENTENCE_CHUNKING: bool = True  # 按句切分并发合成，并输出逐句时间清单
+    TTS_CANONICAL_AUDIO: bool = True    # 缓存中额外保存 AAC 音轨 (.m4a)，组装时直接复制音频流
+
+    # Scheduler (渲染 / LLM / Lint 共用的优先级调度，见 src/core/scheduler.py)
+    RENDER_CONCURRENCY: int = 2         # 同时运行的 Docker 渲染容器数
+    LLM_CONCURRENCY: int = 8            # 同时进行的 LLM / VLM 请求数
+    LINT_CONCURRENCY: int = 4           # 同时运行的 Lint 子进程数
+    SCHEDULER_RETRY_BOOST: int = 2      # 每次重试在优先级上前移的场景位置数
+    SCHEDULER_FAIR_SHARE: bool = True   # 多个任务并发时按权重公平分配名额
+
+    # Batch (python -m src.batch，多个故事板共用一个进程的 LLM 客户端 / 调度器 / 缓存)
+    BATCH_CONCURRENCY: int = 4          # 同时进行的故事板数；渲染 / LLM / Lint 名额仍由上面的全局上限控制
+
+    # Checkpoint (断点续跑)
+    CHECKPOINT_ENABLED: bool = True     # 每个节点完成后把图状态写入 OUTPUT_DIR/checkpoints.sqlite，可用 --resume <run_id> 继续
+    CHECKPOINT_KEEP_COMPLETED: bool = False  # 成功完成的运行是否保留 checkpoint (默认删除，避免数据库无限增长)
+
+    # 场景缓存 (跨运行复用通过审查的渲染结果，见 src/components/scene_cache.py)
+    SCENE_CACHE_ENABLED: bool = True    # 内容未变化的场景跳过 规划/写代码/渲染/审查，可用 --rerender 强制重新生成
+    SCENE_CACHE_SALT: str = ""          # 修改后全部场景缓存失效 (例如升级 Manim 镜像之外的渲染环境)
+    SCENE_CACHE_MAX_BYTES: int = 5 * 1024 ** 3  # 场景缓存上限 (LRU 淘汰，包括其他故事板留下的条目)，0 表示不限
+
+    # Tracing (span 记录，导出 Chrome trace / OTLP)
+    TRACING_ENABLED: bool = True        # 运行结束后写出 OUTPUT_DIR/trace_<时间>.json (chrome://tracing 或 ui.perfetto.dev 打开)
+    TRACE_OTLP_ENDPOINT: str = ""       # e.g. http://localhost:4318/v1/traces，需要安装 opentelemetry-sdk 与 OTLP exporter
+
+    # Progress (运行期间的进度事件流与终端面板，见 src/core/progress.py)
+    PROGRESS_EVENTS: bool = True        # 进度事件写入 OUTPUT_DIR/events_<run_id>.jsonl (可 tail -f)
+    PROGRESS_DASHBOARD: bool = True     # 定期在终端输出进度面板 (场景进度、ETA、资源排队)
+    PROGRESS_REFRESH_SECONDS: float = 5.0  # 面板刷新 / 资源采样间隔
+    PROGRESS_STALL_FACTOR: float = 3.0  # 节点耗时超过历史平均值的倍数 (且至少 30 秒) 时标记为 stalled
+
     # Manim Defaults
     VIDEO_WIDTH: int = 1920
     VIDEO_HEIGHT: int = 1080
+
+    # Assembler Configuration
+    ASSEMBLER_WORKERS: int = 0          # 并行合成片段的 ffmpeg 进程数，0 表示按 CPU 核数 / 每进程线程数自动计算
+    ASSEMBLER_FFMPEG_THREADS: int = 2   # 每个 ffmpeg 进程的编码线程数，避免多进程同时抢占所有核心
+    ENCODING_PROFILE: str = "balanced"  # preview | fast | balanced | archival (src/utils/encoding.py)，可用 --profile 按次覆盖
+    RENDITION_LADDER: List[str] = []    # 成片完成后一次解码输出的多档版本，e.g. ["1080p", "720p", "480p", "gif"]
+    ASSEMBLY_STREAM_COPY: bool = True   # 片段已是交付格式 (H.264/yuv420p，参数一致) 时直接复制画面，只编码补齐的尾帧
+    ASSEMBLY_INCREMENTAL: bool = True   # 按输入哈希复用 segments/ 中未变化的片段 (segments/manifest.json)
+    ASSEMBLY_PIPELINED: bool = True     # 场景完成即在后台合成片段 (仅 segments 引擎)，图结束后只剩拼接
+    PROGRESSIVE_OUTPUT: bool = False    # 场景按故事板顺序就绪后追加到 progressive/index.m3u8 (HLS)，可边渲染边观看
+    PROGRESSIVE_SEGMENT_SECONDS: int = 6  # HLS 分片目标时长 (EXT-X-TARGETDURATION，关键帧过稀时重新编码并强制关键帧)
+    ASSEMBLY_ENGINE: str = "segments"   # segments (逐片段编码 + concat) | filtergraph (单个 filter_complex 一次编码)
+    ASSEMBLY_SPACER_SECONDS: float = 1.0  # filtergraph 引擎中场景之间的黑屏间隔
+    ASSEMBLY_TRANSITION: str = "none"   # none | xfade 过渡名 (fade, wipeleft, ...)，仅 filtergraph 引擎，替代黑屏间隔
+    ASSEMBLY_TRANSITION_SECONDS: float = 0.5
+
+    # Vision Critic 图片预处理 (压缩后再上传，降低带宽和图片 token)
+    CRITIC_IMAGE_MAX_EDGE: int = 1024   # 长边缩放上限 (像素)，0 表示不缩放
+    CRITIC_IMAGE_FORMAT: str = "jpeg"   # jpeg | webp | png
+    CRITIC_IMAGE_QUALITY: int = 85      # JPEG/WebP 质量 (1-100)
+
+    # Critic 结论缓存 (按像素摘要，画面完全一致才复用)
+    CRITIC_CACHE_ENABLED: bool = True
+    CRITIC_CACHE_MAX_ENTRIES: int = 8   # 每个场景最多保留的结论数 (超出时丢弃最旧的)
+    CRITIC_CACHE_MAX_SCENES: int = 500  # 最多保留的场景数 (超出时丢弃最久未写入的场景)
+
+    # 几何 Critic (基于 Manim 包围盒埋点)
+    LAYOUT_INSTRUMENTATION: bool = False  # Lint / Render 时注入埋点，导出每次 play/wait 的包围盒
+    GEOMETRY_CRITIC: str = "off"          # off | prefilter (先几何检查，通过后再交给 VLM) | replace (只做几何检查)
+
+    # 多帧拼图审查 (一次 VLM 请求覆盖整段动画)
+    CRITIC_CONTACT_SHEET: bool = False
+    CRITIC_KEYFRAMES: int = 6             # 每个场景抽取的关键帧数量
+    CRITIC_KEYFRAME_MODE: str = "even"    # even (均匀间隔) | play (每次 play/wait 结束时，需开启布局埋点)
+    CRITIC_KEYFRAME_WIDTH: int = 480      # 拼图中单帧的宽度 (像素)
     
     # Pydantic Settings Config
     model_config = SettingsConfigDict(
@@ -1,15 +1,21 @@
 import asyncio
+import functools
+import time
+from pathlib import Path
 from langgraph.graph import StateGraph, END, START
 from langgraph.constants import Send
-from typing import Literal, Dict, Any, List
+from typing import Callable, Collection, Literal, Dict, Any, List, Optional, Tuple
 
 from src.core.config import settings
-from src.core.state import GraphState, AggregateState
-from src.core.models import CodeGenerationRequest
+from src.core.state import GraphState, AggregateState, CachedSceneState
+from src.core.models import CodeGenerationRequest, CritiqueFeedback, RenderArtifact
+from src.core.scheduler import Ticket, scheduler
 from src.components.context_builder import ContextBuilder
 from src.components.linter import CodeLinter
 from src.components.renderer import ManimRunner
 from src.components.critic import VisionCritic 
+from src.components.layout_checker import LayoutChecker
+from src.components.scene_cache import SceneCache
 from src.components.tts import TTSEngine
 from src.llm.client import LLMClient
 from src.llm.prompts import (
@@ -21,30 +27,113 @@ from src.llm.prompts import (
 )
 from src.utils.code_ops import extract_code
 from src.utils.logger import logger, metrics
+from src.utils.tracing import tracer
 
-class ManimGraph:
+class SharedServices:
     """
-    子图：处理单个场景的生命周期 (TTS -> Plan -> Code -> Lint -> Render -> Critic)
+    可在同一进程的多个任务 (故事板) 之间共享的组件:
+    LLM 客户端 (复用 HTTP 连接池)、lib/ 上下文、Lint、Critic (含图片/结论缓存)、几何检查、TTS (音频缓存与进行中的合成)
+    与运行目录绑定的部分 (Docker 渲染输出、旁白链接) 由各任务的 ManimGraph 单独创建
     """
     def __init__(self):
         self.context_builder = ContextBuilder()
-        
-        # 使用异步 LLM Client
         self.planner_llm = LLMClient(model=settings.PLANNER_MODEL)
         self.coder_llm = LLMClient(model=settings.CODER_MODEL)
-        
         self.linter = CodeLinter()
-        self.runner = ManimRunner()
-        self.critic = VisionCritic() 
+        self.critic = VisionCritic()
+        self.layout_checker = LayoutChecker()
         self.tts = TTSEngine()
+        if settings.GEOMETRY_CRITIC != "off" and not settings.LAYOUT_INSTRUMENTATION:
+            logger.warning(
+                f"⚠️ GEOMETRY_CRITIC={settings.GEOMETRY_CRITIC} has no effect without LAYOUT_INSTRUMENTATION=true "
+                "(no bounding boxes are exported, every scene falls back to the VLM critic)"
+            )
+
+class ManimGraph:
+    """
+    子图：处理单个场景的生命周期 (TTS ∥ Plan -> Code -> Lint -> Reconcile -> Render -> Critic)
+    """
+    def __init__(
+        self,
+        on_artifact: Optional[Callable[[str, Optional[RenderArtifact]], None]] = None,
+        job_id: str = "default",
+        scene_cache: Optional[SceneCache] = None,
+        output_dir: Optional[Path] = None,
+        services: Optional[SharedServices] = None
+    ):
+        # 运行目录: 计划、代码、审查报告、渲染产物、旁白 (批量模式下每个任务各自一个)
+        self.output_dir = Path(output_dir) if output_dir else settings.OUTPUT_DIR
+
+        services = services or SharedServices()
+        self.context_builder = services.context_builder
+        
+        # 使用异步 LLM Client
+        self.planner_llm = services.planner_llm
+        self.coder_llm = services.coder_llm
+        
+        self.linter = services.linter
+        self.runner = ManimRunner(output_dir=self.output_dir)
+        self.critic = services.critic
+        self.layout_checker = services.layout_checker
+        self.tts = services.tts.fork(self.output_dir) if output_dir else services.tts
         
         self.MAX_SYNTAX_RETRIES = 3
         self.MAX_VISUAL_RETRIES = 2 
 
+        # 后台进行中的 TTS 任务 (scene_id -> Task)，由 reconcile 节点汇合
+        self._tts_jobs: Dict[str, asyncio.Task] = {}
+
+        # 场景结束回调 (scene_id, artifact 或 None)，用于在图运行期间流水线组装
+        self.on_artifact = on_artifact
+
+        # 全局调度器中的任务标识 (多个任务并发时按此公平分配渲染/LLM/Lint 名额)
+        self.job_id = job_id
+
+        # 跨运行场景缓存 (None 表示关闭)，通过审查的产物在 finalize 时写入
+        self.scene_cache = scene_cache
+
+    def label(self, scene_id: str) -> str:
+        """指标与 trace 中的场景标识，批量模式下带任务前缀 (不同故事板可能有相同的 scene_id)"""
+        return scene_id if self.job_id == "default" else f"{self.job_id}/{scene_id}"
+
+    def _ticket(self, state: GraphState) -> Ticket:
+        return Ticket(
+            job=self.job_id,
+            order=state.get("scene_index", 0),
+            retries=state.get("retries", 0) + state.get("visual_retries", 0)
+        )
+
+    def _instrumented(self, name: str, node):
+        """
+        包装节点: 记录 trace span (scene_id / attempt / node)，
+        节点内的渲染 / LLM / Lint 请求携带本场景的优先级 (故事板位置 + 重试次数)
+        """
+        def span(state: GraphState):
+            return tracer.span(
+                f"node.{name}", "node",
+                scene_id=self.label(state["scene_spec"].scene_id),
+                node=name,
+                attempt=f"v{state.get('visual_retries', 0)}s{state.get('retries', 0)}"
+            )
+
+        if asyncio.iscoroutinefunction(node):
+            @functools.wraps(node)
+            async def run(state: GraphState):
+                with span(state), scheduler.bind(self._ticket(state)):
+                    return await node(state)
+        else:
+            @functools.wraps(node)
+            def run(state: GraphState):
+                with span(state):
+                    return node(state)
+        return run
+
     # --- Node 0: TTS (New in Graph) ---
     async def node_tts(self, state: GraphState) -> Dict[str, Any]:
         """
-        并行生成音频，并修正 duration
+        启动 TTS，但不阻塞后续的规划与写代码:
+        - 缓存命中: 直接使用真实时长
+        - 缓存未命中: 合成放到后台任务，先按字数估算 duration，稍后由 reconcile 节点校正
         """
         # [Debug] 防御性检查
         if "scene_spec" not in state:
@@ -52,24 +141,79 @@ class ManimGraph:
             raise KeyError("scene_spec")
 
         scene = state["scene_spec"]
-        logger.info(f"🔊 [Node: TTS] Generating audio for {scene.scene_id}...")
-        
-        # 将同步的 TTS 生成放到线程池
-        audio_path = await asyncio.to_thread(
-            self.tts.generate, 
-            scene.audio_script, 
-            scene.scene_id
-        )
-        
-        if audio_path:
-            # 获取时长
-            duration = await asyncio.to_thread(self.tts.get_duration, audio_path)
-            if duration > 0:
-                scene.duration = round(duration + 0.5, 2)
+
+        cached = self.tts.cached_duration(scene.audio_script)
+        if cached is not None:
+            logger.info(f"🔊 [Node: TTS] Audio cached for {scene.scene_id}")
+            await self._run_tts(scene)
+            if cached > 0:
+                scene.duration = round(cached + 0.5, 2)
                 logger.info(f"   ⏱️ [TTS] Updated {scene.scene_id} duration to {scene.duration}s")
+            return {
+                "scene_spec": scene,
+                "audio_pending": False,
+                "audio_timing": self.tts.load_timing(scene.scene_id)
+            }
+
+        logger.info(f"🔊 [Node: TTS] Generating audio for {scene.scene_id} in background...")
+        self._tts_jobs[scene.scene_id] = asyncio.create_task(self._run_tts(scene))
+
+        scene.duration = round(self.tts.estimator.estimate(scene.audio_script) + 0.5, 2)
+        logger.info(f"   ⏱️ [TTS] Estimated {scene.scene_id} duration as {scene.duration}s")
         
         # 更新 state 中的 scene_spec (duration 可能变了)
-        return {"scene_spec": scene}
+        # 逐句时间先按字数估算，reconcile 时替换为真实值
+        return {
+            "scene_spec": scene,
+            "audio_pending": True,
+            "audio_timing": self.tts.estimate_timing(scene.audio_script)
+        }
+
+    async def _run_tts(self, scene) -> Tuple[str, float]:
+        # 原生异步: 合成请求与下载都不占用线程池
+        with tracer.span("tts.synthesize", "tts"):
+            audio_path = await self.tts.generate_async(scene.audio_script, scene.scene_id)
+            duration = 0.0
+            if audio_path:
+                duration = await asyncio.to_thread(self.tts.get_duration, audio_path)
+        return audio_path, duration
+
+    # --- Node 0.5: Audio Reconcile ---
+    async def node_reconcile_audio(self, state: GraphState) -> Dict[str, Any]:
+        """
+        汇合点: 渲染前等待后台 TTS 完成，用真实时长替换估算值
+        偏差在容忍范围内只修正 duration (组装时会按音频补齐画面)，否则要求重新生成代码
+        """
+        if not state.get("audio_pending"):
+            return {"audio_mismatch": False}
+
+        scene = state["scene_spec"]
+        job = self._tts_jobs.pop(scene.scene_id, None)
+        # 没有后台任务 (例如从 checkpoint 恢复)，就地合成
+        _, duration = await (job if job else self._run_tts(scene))
+
+        if duration <= 0:
+            logger.warning(f"   ⚠️ [TTS] No audio for {scene.scene_id}, keeping estimated duration")
+            return {"audio_pending": False, "audio_mismatch": False}
+
+        estimated = scene.duration
+        scene.duration = round(duration + 0.5, 2)
+        mismatch = abs(scene.duration - estimated) > settings.TTS_DURATION_TOLERANCE
+        logger.info(
+            f"   ⏱️ [TTS] {scene.scene_id} duration {estimated}s (estimated) -> {scene.duration}s"
+            + (" — regenerating code" if mismatch else "")
+        )
+
+        update = {
+            "scene_spec": scene,
+            "audio_pending": False,
+            "audio_mismatch": mismatch,
+            "audio_timing": self.tts.load_timing(scene.scene_id) or state.get("audio_timing")
+        }
+        if mismatch:
+            # 以真实时长按布局计划重新写代码 (初始模式，而非修复模式)
+            update.update({"code": None, "fix_instructions": None, "error_log": None, "retries": 0})
+        return update
 
     # --- Node 1: Planner ---
     async def node_plan_layout(self, state: GraphState) -> Dict[str, Any]:
@@ -87,12 +231,12 @@ class ManimGraph:
         # Async call
         plan = await self.planner_llm.generate_text(
             build_planner_system_prompt(), 
-            build_planner_user_prompt(scene)
+            build_planner_user_prompt(scene, state.get("audio_timing"))
         )
         
         # Save file (non-blocking ideally, but small file IO is ok)
         try:
-            plan_dir = settings.OUTPUT_DIR / "plan"
+            plan_dir = self.output_dir / "plan"
             plan_dir.mkdir(parents=True, exist_ok=True)
             with open(plan_dir / f"{scene.scene_id}_plan.md", "w", encoding="utf-8") as f:
                 f.write(plan)
@@ -129,7 +273,7 @@ class ManimGraph:
             vis_try = state.get("visual_retries", 0)
             syn_try = state.get("retries", 0)
             
-            fix_dir = settings.OUTPUT_DIR / "fix_plan"
+            fix_dir = self.output_dir / "fix_plan"
             fix_dir.mkdir(parents=True, exist_ok=True)
             
             filename = f"{scene.scene_id}_fix_v{vis_try}_s{syn_try}.md"
@@ -160,7 +304,9 @@ class ManimGraph:
             error_summary = f"Runtime: {state['error_log']}"
 
         sys_prompt = self.context_builder.build_system_prompt()
-        user_prompt = build_code_user_prompt(req, plan, fix_instructions, error_summary)
+        user_prompt = build_code_user_prompt(
+            req, plan, fix_instructions, error_summary, timing=state.get("audio_timing")
+        )
         
         # Async call
         raw_resp = await self.coder_llm.generate_code(sys_prompt, user_prompt)
@@ -172,7 +318,7 @@ class ManimGraph:
             vis_try = state.get("visual_retries", 0)
             syn_try = state.get("retries", 0)
             
-            code_dir = settings.OUTPUT_DIR / "scenes_code"
+            code_dir = self.output_dir / "scenes_code"
             code_dir.mkdir(parents=True, exist_ok=True)
             
             filename = f"{scene.scene_id}_code_v{vis_try}_s{syn_try}.py"
@@ -186,9 +332,22 @@ class ManimGraph:
     # --- Node 4: Lint (CPU Bound) ---
     async def node_check_syntax(self, state: GraphState) -> Dict[str, Any]:
         # Linter 包含 subprocess 调用，虽然是 CPU 密集，但最好也扔到线程池
-        res = await asyncio.to_thread(self.linter.validate, state["code"])
+        layout_path = None
+        if settings.LAYOUT_INSTRUMENTATION:
+            layout_path = self.output_dir / "layout" / f"{state['scene_spec'].scene_id}_lint.json"
+            # 删除上一版代码的埋点，Dry Run 没有导出时不能让几何检查读到旧的包围盒
+            layout_path.unlink(missing_ok=True)
+
+        # 取整到秒，兼容 mtime 精度较低的文件系统
+        lint_started = int(time.time())
+        with tracer.span("lint.subprocess", "lint"):
+            async with scheduler.slot("lint"):
+                res = await asyncio.to_thread(
+                    self.linter.validate, state["code"], str(layout_path) if layout_path else None
+                )
         if res.passed:
-            return {"error_log": None}
+            fresh = layout_path is not None and layout_path.exists() and layout_path.stat().st_mtime >= lint_started
+            return {"error_log": None, "layout_path": str(layout_path) if fresh else None}
         else:
             return {"error_log": res.traceback}
 
@@ -218,24 +377,41 @@ class ManimGraph:
     async def node_critic(self, state: GraphState) -> Dict[str, Any]:
         logger.info(f"👀 [Node: Critic] {state['scene_spec'].scene_id}")
         artifact = state.get("artifact")
-        
-        if not artifact or not artifact.last_frame_path or artifact.last_frame_path == "N/A":
-             return {"critic_feedback": None}
-
-        # Critic 内部调用了 OpenAI API，需要看它是否也是 async
-        # 假设 Critic 目前是同步的 (requests/standard openai)，我们用 to_thread
-        # 理想情况是把 Critic 也改成 async，这里用 to_thread 兼容
-        feedback = await self.critic.review_layout(
-            artifact.last_frame_path, 
-            state["scene_spec"]
-        )
+
+        # 几何检查: 基于包围盒的精确判断，可作为 VLM 的前置过滤或直接替代
+        feedback = await self._geometry_review(state)
+        if feedback and feedback.passed and settings.GEOMETRY_CRITIC != "replace":
+            feedback = None
+
+        if feedback is None:
+            if not artifact or not artifact.last_frame_path or artifact.last_frame_path == "N/A":
+                return {"critic_feedback": None}
+
+            # Critic 内部调用了 OpenAI API，需要看它是否也是 async
+            # 假设 Critic 目前是同步的 (requests/standard openai)，我们用 to_thread
+            # 理想情况是把 Critic 也改成 async，这里用 to_thread 兼容
+            if artifact.contact_sheet_path and Path(artifact.contact_sheet_path).exists():
+                # 多帧拼图: 一次请求覆盖整段动画
+                feedback = await self.critic.review_layout(
+                    artifact.contact_sheet_path,
+                    state["scene_spec"],
+                    timestamps=artifact.keyframe_timestamps
+                )
+            else:
+                # Fixer 改过代码之后，不能复用被否决的结论 (只复用通过的结论)
+                fixed = state.get("visual_retries", 0) > 0 or state.get("retries", 0) > 0
+                feedback = await self.critic.review_layout(
+                    artifact.last_frame_path, 
+                    state["scene_spec"],
+                    reuse_rejections=not fixed
+                )
         
         # --- [Add] Save Critic Report ---
         try:
             scene = state["scene_spec"]
             vis_try = state.get("visual_retries", 0)
             
-            critic_dir = settings.OUTPUT_DIR / "critic"
+            critic_dir = self.output_dir / "critic"
             critic_dir.mkdir(parents=True, exist_ok=True)
             
             filename = f"{scene.scene_id}_critic_v{vis_try}.txt"
@@ -248,32 +424,82 @@ class ManimGraph:
 
         visual_evidence = feedback.suggestion if feedback.suggestion else "Visual check failed."
 
+        # 视觉重试中画面与已被否决的帧像素级一致，说明上一轮修复没有改变画面
+        if feedback.unchanged_frame and not feedback.passed and state.get("visual_retries", 0) > 0:
+            logger.info(f"   ♻️ [Critic] {state['scene_spec'].scene_id}: fix had no visual effect")
+            visual_evidence = (
+                "NOTE: The previous fix had NO VISUAL EFFECT - the rendered frame is "
+                "identical to one that was already rejected. Make a substantially "
+                f"different change.\n{visual_evidence}"
+            )
+
         if feedback.passed:
             return {"critic_feedback": None}
         else:
             return {"critic_feedback": visual_evidence}
 
+    async def _geometry_review(self, state: GraphState) -> Optional[CritiqueFeedback]:
+        """
+        读取埋点导出的包围盒做几何审查；未开启或没有埋点数据时返回 None
+        优先使用渲染产物的埋点，其次使用 Lint (dry run) 阶段的埋点
+        """
+        if settings.GEOMETRY_CRITIC == "off":
+            return None
+
+        artifact = state.get("artifact")
+        layout_path = (artifact.layout_path if artifact else None) or state.get("layout_path")
+        if not layout_path or not Path(layout_path).exists():
+            return None
+
+        try:
+            issues = await asyncio.to_thread(self.layout_checker.check_file, layout_path)
+        except Exception as e:
+            logger.warning(f"Geometry check failed, falling back to VLM: {e}")
+            return None
+
+        feedback = self.layout_checker.to_feedback(issues)
+        logger.info(f"   📐 [Geometry] {state['scene_spec'].scene_id}: {len(issues)} issue(s)")
+        return feedback
+
     # --- Node 7: Finalizer ---
     async def node_finalize(self, state: GraphState) -> Dict[str, Any]:
         """
         [重要] 子图结束节点。
         将单数 artifact 转换为列表 output_artifacts，以便父图 reducer 合并。
         """
+        # 失败的场景可能没有经过 reconcile，等待后台 TTS 结束，避免遗留悬空任务
+        job = self._tts_jobs.pop(state["scene_spec"].scene_id, None)
+        if job:
+            await job
+
         art = state.get("artifact")
+        self.notify(state["scene_spec"].scene_id, art)
+
+        # 只缓存通过审查的结果 (达到视觉重试上限的产物下次仍应重新生成)
+        if art and self.scene_cache and state.get("scene_key") and state.get("critic_feedback") is None:
+            await asyncio.to_thread(self.scene_cache.store, state["scene_key"], state["scene_spec"], art)
+
         if art:
             # 记录成功指标
             metrics.log_scene_finish(
-                state["scene_spec"].scene_id, True, 
+                self.label(state["scene_spec"].scene_id), True, 
                 state.get("retries",0), state.get("visual_retries",0)
             )
             return {"output_artifacts": [art]}
         else:
             # 失败记录
             metrics.log_scene_finish(
-                state["scene_spec"].scene_id, False, 0, 0
+                self.label(state["scene_spec"].scene_id), False, 0, 0
             )
             return {"output_artifacts": []} # 返回空列表
 
+    def notify(self, scene_id: str, art: Optional[RenderArtifact]):
+        if self.on_artifact:
+            try:
+                self.on_artifact(scene_id, art)
+            except Exception as e:
+                logger.warning(f"⚠️ on_artifact callback failed for {scene_id}: {e}")
+
     # --- Routing ---
     def node_prep_syntax_retry(self, state: GraphState):
         return {"retries": state.get("retries", 0) + 1}
@@ -285,11 +511,16 @@ class ManimGraph:
             "error_log": None
         }
 
-    def edge_router_after_lint(self, state: GraphState) -> Literal["render", "fixer", "failed"]:
+    def edge_router_after_lint(self, state: GraphState) -> Literal["reconcile", "fixer", "failed"]:
         if state.get("error_log"):
             if state.get("retries", 0) >= self.MAX_SYNTAX_RETRIES:
                 return "failed"
             return "fixer" 
+        return "reconcile"
+
+    def edge_router_after_reconcile(self, state: GraphState) -> Literal["render", "generate"]:
+        if state.get("audio_mismatch"):
+            return "generate"
         return "render"
 
     def edge_router_after_render(self, state: GraphState) -> Literal["critic", "finalize", "fixer"]:
@@ -314,17 +545,22 @@ class ManimGraph:
     def compile(self):
         workflow = StateGraph(GraphState)
         
-        workflow.add_node("tts", self.node_tts)
-        workflow.add_node("plan", self.node_plan_layout)
-        workflow.add_node("generate", self.node_generate_code)
-        workflow.add_node("lint", self.node_check_syntax)
-        workflow.add_node("render", self.node_render)
-        workflow.add_node("critic", self.node_critic)
-        workflow.add_node("fixer", self.node_analyze_error)
-        workflow.add_node("prep_syn", self.node_prep_syntax_retry)
-        workflow.add_node("prep_vis", self.node_prep_visual_retry)
-        workflow.add_node("finalize", self.node_finalize)
-        workflow.add_node("failed", self.node_finalize) # 失败也走 finalize，返回空列表
+        nodes = {
+            "tts": self.node_tts,
+            "reconcile": self.node_reconcile_audio,
+            "plan": self.node_plan_layout,
+            "generate": self.node_generate_code,
+            "lint": self.node_check_syntax,
+            "render": self.node_render,
+            "critic": self.node_critic,
+            "fixer": self.node_analyze_error,
+            "prep_syn": self.node_prep_syntax_retry,
+            "prep_vis": self.node_prep_visual_retry,
+            "finalize": self.node_finalize,
+            "failed": self.node_finalize, # 失败也走 finalize，返回空列表
+        }
+        for name, node in nodes.items():
+            workflow.add_node(name, self._instrumented(name, node))
 
         # Flow
         workflow.set_entry_point("tts")
@@ -333,7 +569,11 @@ class ManimGraph:
         workflow.add_edge("generate", "lint")
         
         workflow.add_conditional_edges("lint", self.edge_router_after_lint, 
-                                       {"render": "render", "fixer": "fixer", "failed": "failed"})
+                                       {"reconcile": "reconcile", "fixer": "fixer", "failed": "failed"})
+
+        # TTS 在后台与 plan/generate/lint 并行，渲染前在此汇合
+        workflow.add_conditional_edges("reconcile", self.edge_router_after_reconcile,
+                                       {"render": "render", "generate": "generate"})
         
         workflow.add_conditional_edges("render", self.edge_router_after_render, 
                                        {"critic": "critic", "fixer": "fixer", "finalize": "finalize"})
@@ -355,9 +595,34 @@ class ParallelManimFlow:
     """
     总控图：负责 Map (分发场景) 和 Reduce (收集结果)
     """
-    def __init__(self):
+    def __init__(
+        self,
+        on_artifact: Optional[Callable[[str, Optional[RenderArtifact]], None]] = None,
+        job_id: str = "default",
+        scene_cache: Optional[SceneCache] = None,
+        rerender: Optional[Collection[str]] = None,
+        output_dir: Optional[Path] = None,
+        services: Optional[SharedServices] = None
+    ):
         # 编译单场景子图
-        self.scene_graph = ManimGraph().compile()
+        self.manim = ManimGraph(
+            on_artifact=on_artifact, job_id=job_id, scene_cache=scene_cache,
+            output_dir=output_dir, services=services
+        )
+        self.scene_graph = self.manim.compile()
+
+        # 场景缓存: rerender 中的场景跳过查找 (强制重新生成，结果覆盖旧条目)
+        self.scene_cache = scene_cache
+        self.rerender = set(rerender or ())
+
+    def _cached_artifact(self, scene) -> Tuple[Optional[str], Optional[RenderArtifact]]:
+        """返回 (缓存 key, 命中的产物)；未开启缓存时都为 None"""
+        if not self.scene_cache:
+            return None, None
+        key = self.scene_cache.key_for(scene, self.manim.tts.cache_key(scene.audio_script))
+        if scene.scene_id in self.rerender:
+            return key, None
+        return key, self.scene_cache.get(key, scene.scene_id)
 
     def map_scenes(self, state: AggregateState):
         """
@@ -367,12 +632,20 @@ class ParallelManimFlow:
         # print(f"DEBUG: Mapping scenes: {len(state.get('scenes', []))}")
         
         tasks = []
-        for scene in state["scenes"]:
+        for index, scene in enumerate(state["scenes"]):
+            key, cached = self._cached_artifact(scene)
+            if cached:
+                logger.info(f"♻️ [SceneCache] Hit for {scene.scene_id}, skipping generation")
+                tasks.append(Send("cached_scene", {"scene_spec": scene, "scene_index": index, "artifact": cached}))
+                continue
+
             # 构建完整的 GraphState 初始值
             # 必须包含 GraphState 所有的 Required 字段
             # Optional 字段可以设为 None
             initial_scene_state: GraphState = {
                 "scene_spec": scene,
+                "scene_index": index,
+                "scene_key": key,
                 "retries": 0,
                 "visual_retries": 0,
                 "code": None,
@@ -380,22 +653,43 @@ class ParallelManimFlow:
                 "critic_feedback": None,
                 "layout_plan": None,
                 "fix_instructions": None,
+                "layout_path": None,
+                "audio_pending": False,
+                "audio_mismatch": False,
+                "audio_timing": None,
                 "artifact": None,
                 "output_artifacts": []
             }
             tasks.append(Send("process_scene", initial_scene_state))
         return tasks
 
-    def compile(self):
+    async def node_cached_scene(self, state: CachedSceneState) -> Dict[str, Any]:
+        """
+        命中场景缓存: 只需保证运行目录中有旁白音频 (TTS 缓存命中时只是建立链接)，然后直接输出产物
+        """
+        scene, art = state["scene_spec"], state["artifact"]
+        with tracer.span("node.cached", "node", scene_id=self.manim.label(scene.scene_id), node="cached"):
+            await self.manim._run_tts(scene)
+        self.manim.notify(scene.scene_id, art)
+        metrics.log_scene_cached(self.manim.label(scene.scene_id))
+        return {"output_artifacts": [art]}
+
+    def compile(self, checkpointer=None):
+        """
+        checkpointer 不为空时每个节点 (包括场景子图内部) 完成后持久化状态，
+        以相同 thread_id 重新调用并传入 None 即可从中断处继续
+        """
         workflow = StateGraph(AggregateState)
 
         # 添加处理节点的子图
         workflow.add_node("process_scene", self.scene_graph)
+        workflow.add_node("cached_scene", self.node_cached_scene, input_schema=CachedSceneState)
 
         # 设置入口，使用 map_scenes 进行动态扇出
         workflow.add_conditional_edges(START, self.map_scenes)
         
         # 所有 process_scene 完成后，Reducer 会自动工作，直接结束
         workflow.add_edge("process_scene", END)
+        workflow.add_edge("cached_scene", END)
 
-        return workflow.compile()
\ No newline at end of file
+        return workflow.compile(checkpointer=checkpointer)
\ No newline at end of file
@@ -63,6 +63,16 @@ class CritiqueFeedback(BaseModel):
         None, 
         description="语义化修改建议 (e.g., 'Use next_to instead of shift')"
     )
+    cached: bool = Field(default=False, description="是否直接复用了结论缓存 (画面与已审查过的帧像素级一致)")
+    unchanged_frame: bool = Field(default=False, description="画面与一张已被否决的帧像素级一致")
+
+class SentenceTiming(BaseModel):
+    """
+    [TTS] 旁白中单句的时间位置，供 Planner / Coder 对齐动画节奏
+    """
+    text: str
+    start: float = Field(..., ge=0, description="开始时间(秒)")
+    end: float = Field(..., ge=0, description="结束时间(秒)")
 
 class RenderArtifact(BaseModel):
     """
@@ -71,4 +81,7 @@ class RenderArtifact(BaseModel):
     video_path: str
     last_frame_path: str
     code_content: str
-    scene_id: str
\ No newline at end of file
+    scene_id: str
+    layout_path: Optional[str] = Field(None, description="布局埋点导出的包围盒 JSON (开启 LAYOUT_INSTRUMENTATION 时)")
+    contact_sheet_path: Optional[str] = Field(None, description="关键帧拼图 (开启 CRITIC_CONTACT_SHEET 时)")
+    keyframe_timestamps: List[float] = Field(default_factory=list, description="拼图中每一帧对应的时间点(秒)")
\ No newline at end of file
@@ -0,0 +1,304 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, TextIO
+
+from pydantic import BaseModel
+
+from src.core.config import settings
+from src.core.scheduler import Scheduler, scheduler
+from src.utils.logger import logger
+
+# 单个场景一次通过时经过的节点 (ETA 按此路径上剩余节点的历史耗时求和)
+SCENE_PATH = ("tts", "plan", "generate", "lint", "reconcile", "render", "critic", "finalize")
+# 修复分支结束后回到 generate 重新走一遍
+_RESUME_AT = {"fixer": "generate", "prep_syn": "generate", "prep_vis": "generate", "failed": None}
+
+# 还没有历史数据时的默认节点耗时 (秒)
+DEFAULT_NODE_SECONDS = {
+    "tts": 1.0, "plan": 20.0, "generate": 30.0, "lint": 5.0, "reconcile": 5.0,
+    "render": 40.0, "critic": 15.0, "fixer": 20.0, "finalize": 0.5, "cached": 1.0,
+}
+
+# 属于场景的顶层任务 (子图 / 命中场景缓存)
+_SCENE_TASKS = ("process_scene", "cached_scene")
+
+class ProgressEvent(BaseModel):
+    """
+    进度事件 (events_<run_id>.jsonl 中的一行)
+    event: run_start | scene_start | node_start | node_end | stalled | scene_end | resources | run_end
+    """
+    ts: float
+    run_id: str
+    event: str
+    scene_id: Optional[str] = None
+    node: Optional[str] = None
+    attempt: Optional[str] = None       # v<视觉重试>s<语法重试>
+    duration: Optional[float] = None    # node_end / scene_end: 耗时 (秒)
+    eta: Optional[float] = None         # 该场景 (或 run_* 事件中整次运行) 预计剩余秒数
+    success: Optional[bool] = None
+    cached: Optional[bool] = None
+    error: Optional[str] = None
+    resources: Optional[Dict[str, Dict[str, int]]] = None
+    done: Optional[int] = None
+    total: Optional[int] = None
+
+class SceneProgress(BaseModel):
+    scene_id: str
+    index: int
+    status: str = "pending"             # pending | running | done | cached | failed
+    node: Optional[str] = None
+    attempt: Optional[str] = None
+    node_started: float = 0.0           # time.monotonic()
+    started: float = 0.0
+    stalled: bool = False
+
+class NodeHistory:
+    """
+    每个节点的历史平均耗时 (跨运行持久化)，用于估算场景剩余时间
+    """
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or settings.OUTPUT_DIR / "cache" / "node_durations.json"
+        self._stats: Dict[str, List[float]] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._stats = {k: [int(v[0]), float(v[1])] for k, v in data.items()}
+        except (FileNotFoundError, KeyError, ValueError, TypeError, IndexError):
+            pass
+
+    def mean(self, node: str) -> float:
+        count, seconds = self._stats.get(node, (0, 0.0))
+        if count == 0:
+            return DEFAULT_NODE_SECONDS.get(node, 0.0)
+        return seconds / count
+
+    def observe(self, node: str, duration: float):
+        count, seconds = self._stats.get(node, (0, 0.0))
+        self._stats[node] = [count + 1, seconds + duration]
+
+    def remaining(self, node: Optional[str], elapsed: float = 0.0, finished: bool = False) -> float:
+        """
+        场景在 node 上已耗时 elapsed 时的预计剩余秒数
+        finished=True 表示 node 刚结束、下一个节点尚未开始
+        """
+        if node is None:
+            return sum(self.mean(n) for n in SCENE_PATH)
+        current = 0.0 if finished else max(0.0, self.mean(node) - elapsed)
+        if node in _RESUME_AT:
+            resume = _RESUME_AT[node]
+            rest = SCENE_PATH[SCENE_PATH.index(resume):] if resume else ()
+        elif node in SCENE_PATH:
+            rest = SCENE_PATH[SCENE_PATH.index(node) + 1:]
+        else:
+            rest = ()
+        return current + sum(self.mean(n) for n in rest)
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self._stats), encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"⚠️ [Progress] Failed to persist node durations: {e}")
+
+def _fmt(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    return f"{seconds // 60}m{seconds % 60:02d}s" if seconds >= 60 else f"{seconds}s"
+
+class ProgressTracker:
+    """
+    消费 LangGraph astream (stream_mode=tasks, subgraphs=True) 的任务开始/结束事件，生成结构化进度:
+    - 节点开始/结束、重试次数 (attempt)、按历史节点耗时估算的场景剩余时间
+    - 定期采样调度器各资源 (render/llm/lint) 的占用与排队深度，超出历史耗时 PROGRESS_STALL_FACTOR 倍的节点标记为 stalled
+    - 每个事件追加到 JSONL 文件 (可 tail -f)，并定期在终端输出进度面板
+    """
+    def __init__(
+        self,
+        run_id: str,
+        scene_ids: Sequence[str],
+        events_path: Optional[Path] = None,
+        history: Optional[NodeHistory] = None,
+        sched: Optional[Scheduler] = None
+    ):
+        self.run_id = run_id
+        self.events_path = events_path
+        self.history = history or NodeHistory()
+        self.scheduler = sched or scheduler
+        self.scenes: Dict[str, SceneProgress] = {
+            sid: SceneProgress(scene_id=sid, index=i) for i, sid in enumerate(scene_ids)
+        }
+        # 进行中的任务 id -> (scene_id, 节点名, 开始时间)
+        self._tasks: Dict[str, tuple] = {}
+        self._started = time.monotonic()
+        self._file: Optional[TextIO] = None
+        if events_path:
+            Path(events_path).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(events_path, "a", encoding="utf-8")
+
+    # --- 事件输出 ---
+    def emit(self, event: str, **fields: Any) -> ProgressEvent:
+        ev = ProgressEvent(ts=time.time(), run_id=self.run_id, event=event, **fields)
+        if self._file:
+            self._file.write(ev.model_dump_json(exclude_none=True) + "\n")
+            self._file.flush()
+        return ev
+
+    def _scene(self, scene_id: str) -> SceneProgress:
+        if scene_id not in self.scenes:
+            self.scenes[scene_id] = SceneProgress(scene_id=scene_id, index=len(self.scenes))
+        return self.scenes[scene_id]
+
+    def restore(self, scene_ids: Sequence[str]):
+        """续跑: 上一次运行已完成的场景不会再产生任务事件，直接标记为完成 (不计入剩余时间)"""
+        for scene_id in scene_ids:
+            if scene_id in self.scenes:
+                self.scenes[scene_id].status = "done"
+
+    # --- 消费 astream 的 tasks 事件 ---
+    def handle(self, namespace: tuple, chunk: Dict[str, Any]) -> Optional[ProgressEvent]:
+        now = time.monotonic()
+        task_id, name = chunk.get("id"), chunk.get("name")
+
+        if "input" in chunk:
+            state = chunk["input"] if isinstance(chunk["input"], dict) else {}
+            spec = state.get("scene_spec")
+            if spec is None or (not namespace and name not in _SCENE_TASKS):
+                return None
+            scene = self._scene(spec.scene_id)
+            self._tasks[task_id] = (scene.scene_id, name, now)
+            if not namespace:
+                scene.status, scene.started = "running", now
+                return self.emit("scene_start", scene_id=scene.scene_id, cached=name == "cached_scene" or None)
+            scene.node, scene.node_started, scene.stalled = name, now, False
+            scene.attempt = f"v{state.get('visual_retries', 0)}s{state.get('retries', 0)}"
+            return self.emit(
+                "node_start", scene_id=scene.scene_id, node=name, attempt=scene.attempt,
+                eta=round(self.history.remaining(name), 1)
+            )
+
+        if task_id not in self._tasks:
+            return None
+        scene_id, name, started = self._tasks.pop(task_id)
+        scene = self._scene(scene_id)
+        duration = now - started
+        error = str(chunk["error"]) if chunk.get("error") else None
+
+        if not namespace:
+            result = chunk.get("result") or {}
+            cached = name == "cached_scene"
+            success = error is None and bool(result.get("output_artifacts"))
+            scene.status = ("cached" if cached else "done") if success else "failed"
+            scene.node = None
+            return self.emit(
+                "scene_end", scene_id=scene_id, duration=round(duration, 3),
+                success=success, cached=cached or None, error=error,
+                done=self.finished, total=len(self.scenes)
+            )
+
+        if error is None:
+            self.history.observe(name, duration)
+        return self.emit(
+            "node_end", scene_id=scene_id, node=name, attempt=scene.attempt,
+            duration=round(duration, 3), error=error,
+            eta=round(self.history.remaining(name, finished=True), 1)
+        )
+
+    # --- 汇总 ---
+    @property
+    def finished(self) -> int:
+        return sum(1 for s in self.scenes.values() if s.status in ("done", "cached", "failed"))
+
+    def scene_eta(self, scene: SceneProgress, now: Optional[float] = None) -> Optional[float]:
+        if scene.status in ("done", "cached", "failed"):
+            return 0.0
+        if scene.node is None:
+            return self.history.remaining(None)
+        return self.history.remaining(scene.node, (now or time.monotonic()) - scene.node_started)
+
+    def run_eta(self) -> float:
+        """场景并行执行，整次运行的剩余时间取最慢场景 (下限估计，不含组装)"""
+        now = time.monotonic()
+        return max((self.scene_eta(s, now) or 0.0 for s in self.scenes.values()), default=0.0)
+
+    def sample(self) -> List[ProgressEvent]:
+        """采样资源占用，并检查卡住的节点"""
+        now = time.monotonic()
+        events = [self.emit(
+            "resources", resources=self.scheduler.snapshot(),
+            done=self.finished, total=len(self.scenes), eta=round(self.run_eta(), 1)
+        )]
+        for scene in self.scenes.values():
+            if scene.status != "running" or scene.node is None or scene.stalled:
+                continue
+            elapsed = now - scene.node_started
+            limit = max(30.0, settings.PROGRESS_STALL_FACTOR * self.history.mean(scene.node))
+            if elapsed > limit:
+                scene.stalled = True
+                events.append(self.emit(
+                    "stalled", scene_id=scene.scene_id, node=scene.node,
+                    attempt=scene.attempt, duration=round(elapsed, 1)
+                ))
+        return events
+
+    def dashboard_lines(self, max_rows: int = 12) -> List[str]:
+        now = time.monotonic()
+        counts = {k: sum(1 for s in self.scenes.values() if s.status == k) for k in ("cached", "failed")}
+        lines = [
+            f"📺 {self.finished}/{len(self.scenes)} scenes done "
+            f"({counts['cached']} cached, {counts['failed']} failed) — "
+            f"elapsed {_fmt(now - self._started)}, ETA ~{_fmt(self.run_eta())}"
+        ]
+        for name, res in sorted(self.scheduler.snapshot().items()):
+            full = "🔴" if res["active"] >= res["capacity"] and res["waiting"] else "  "
+            lines.append(f"   {full} {name:<7} active {res['active']}/{res['capacity']}  queue {res['waiting']}")
+
+        running = sorted((s for s in self.scenes.values() if s.status == "running"), key=lambda s: s.index)
+        for scene in running[:max_rows]:
+            elapsed = now - scene.node_started if scene.node else 0.0
+            flag = "  ⚠️ stalled" if scene.stalled else ""
+            lines.append(
+                f"   ▶ {scene.scene_id:<16} {scene.node or '-':<10} {scene.attempt or '':<5} "
+                f"{_fmt(elapsed):>6}  eta {_fmt(self.scene_eta(scene, now))}{flag}"
+            )
+        if len(running) > max_rows:
+            lines.append(f"   … {len(running) - max_rows} more running")
+        return lines
+
+    # --- 驱动 ---
+    async def _monitor(self, interval: float, dashboard: bool):
+        while True:
+            await asyncio.sleep(interval)
+            self.sample()
+            if dashboard:
+                for line in self.dashboard_lines():
+                    logger.info(line)
+
+    async def stream(self, app, graph_input, config: Dict[str, Any], dashboard: bool = True) -> Dict[str, Any]:
+        """
+        以 astream 代替 ainvoke 运行图，返回父图最终状态
+        """
+        self.emit("run_start", done=self.finished, total=len(self.scenes), eta=round(self.run_eta(), 1))
+        monitor = asyncio.create_task(self._monitor(settings.PROGRESS_REFRESH_SECONDS, dashboard))
+        final_state: Dict[str, Any] = {}
+        success = False
+        try:
+            async for namespace, mode, chunk in app.astream(
+                graph_input, config=config, stream_mode=["tasks", "values"], subgraphs=True
+            ):
+                if mode == "values" and not namespace:
+                    final_state = chunk
+                elif mode == "tasks":
+                    self.handle(namespace, chunk)
+            success = True
+        finally:
+            monitor.cancel()
+            self.emit("run_end", success=success, done=self.finished, total=len(self.scenes))
+            self.history.save()
+        return final_state
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
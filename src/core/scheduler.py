@@ -0,0 +1,158 @@
+import asyncio
+import contextvars
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from src.core.config import settings
+from src.utils.tracing import tracer
+
+class Ticket(BaseModel):
+    """
+    一次资源请求的优先级信息
+    - order: 场景在故事板中的位置 (越小越先)
+    - retries: 已经历的重试次数 (语法 + 视觉)，每次重试前移 SCHEDULER_RETRY_BOOST 个位置，
+      已在关键路径上反复修正的场景不再排到后面场景之后
+    - job: 所属任务 (一次运行/一个故事板)，用于多任务之间的公平分配
+    """
+    job: str = "default"
+    order: int = 0
+    retries: int = 0
+
+    @property
+    def rank(self) -> int:
+        return self.order - settings.SCHEDULER_RETRY_BOOST * self.retries
+
+# 没有绑定 Ticket 的调用 (例如 Rewriter) 排在所有场景之后
+_LOWEST = Ticket(job="default", order=1 << 30)
+_current: contextvars.ContextVar[Optional[Ticket]] = contextvars.ContextVar("scheduler_ticket", default=None)
+
+class _Waiter:
+    __slots__ = ("ticket", "seq", "future")
+
+    def __init__(self, ticket: Ticket, seq: int, future: asyncio.Future):
+        self.ticket, self.seq, self.future = ticket, seq, future
+
+class PriorityLimiter:
+    """
+    按优先级唤醒的异步信号量
+    有空位且无人排队时直接进入；否则空位释放时先按任务公平份额 (已占用 / 权重 最小的任务)，
+    再按 Ticket.rank、到达顺序选择下一个等待者
+    """
+    def __init__(self, name: str, capacity: int, shares: Dict[str, float]):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self._shares = shares
+        self._active = 0
+        self._in_use: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, ticket: Ticket):
+        if self._active < self.capacity and not self._waiters:
+            self._grant(ticket)
+            return
+
+        waiter = _Waiter(ticket, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # 已被唤醒但随即取消: 归还名额
+                self.release(ticket)
+            raise
+
+    def release(self, ticket: Ticket):
+        self._active -= 1
+        self._in_use[ticket.job] = self._in_use.get(ticket.job, 1) - 1
+        self._wake()
+
+    def _grant(self, ticket: Ticket):
+        self._active += 1
+        self._in_use[ticket.job] = self._in_use.get(ticket.job, 0) + 1
+
+    def _wake(self):
+        while self._active < self.capacity and self._waiters:
+            waiter = min(self._waiters, key=self._sort_key)
+            self._waiters.remove(waiter)
+            if waiter.future.cancelled():
+                continue
+            self._grant(waiter.ticket)
+            waiter.future.set_result(None)
+
+    def _sort_key(self, waiter: _Waiter):
+        share = 0.0
+        if settings.SCHEDULER_FAIR_SHARE:
+            job = waiter.ticket.job
+            share = self._in_use.get(job, 0) / self._shares.get(job, 1.0)
+        return (share, waiter.ticket.rank, waiter.seq)
+
+class Scheduler:
+    """
+    全局调度器: 渲染 (Docker)、LLM 请求、Lint 共用同一套优先级规则
+    图节点通过 bind() 声明当前场景的 Ticket，底层组件 (ManimRunner / LLMClient / Linter) 只需 slot(resource)
+    """
+    def __init__(self):
+        self._shares: Dict[str, float] = {}
+        self._limiters: Dict[str, PriorityLimiter] = {}
+
+    def limiter(self, resource: str) -> PriorityLimiter:
+        if resource not in self._limiters:
+            capacity = {
+                "render": settings.RENDER_CONCURRENCY,
+                "llm": settings.LLM_CONCURRENCY,
+                "lint": settings.LINT_CONCURRENCY,
+            }.get(resource, 1)
+            self._limiters[resource] = PriorityLimiter(resource, capacity, self._shares)
+        return self._limiters[resource]
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """各资源当前占用 / 排队 / 容量 (进度面板与事件流使用)"""
+        return {
+            name: {"active": limiter.active, "waiting": limiter.waiting, "capacity": limiter.capacity}
+            for name, limiter in self._limiters.items()
+        }
+
+    def set_share(self, job: str, weight: float):
+        """设置任务的公平份额权重 (默认 1.0)，权重越大同时占用的名额越多"""
+        self._shares[job] = max(weight, 1e-6)
+
+    @contextmanager
+    def bind(self, ticket: Ticket) -> Iterator[Ticket]:
+        """在当前协程上下文中声明 Ticket，期间所有 slot() 都使用它"""
+        token = _current.set(ticket)
+        try:
+            yield ticket
+        finally:
+            _current.reset(token)
+
+    @asynccontextmanager
+    async def slot(self, resource: str, ticket: Optional[Ticket] = None):
+        ticket = ticket or _current.get() or _LOWEST
+        limiter = self.limiter(resource)
+        start = time.perf_counter_ns()
+        await limiter.acquire(ticket)
+        end = time.perf_counter_ns()
+        if end - start > 1_000_000:
+            # 只记录真正排过队的请求 (>1ms)，trace 中可看到时间耗在等名额上
+            tracer.record(f"wait.{resource}", "wait", start, end, resource=resource)
+        try:
+            yield
+        finally:
+            limiter.release(ticket)
+
+scheduler = Scheduler()
@@ -1,6 +1,6 @@
 import operator
 from typing import TypedDict, Optional, List, Annotated, Any
-from src.core.models import SceneSpec, RenderArtifact
+from src.core.models import SceneSpec, RenderArtifact, SentenceTiming
 
 class GraphState(TypedDict):
     """
@@ -8,6 +8,8 @@ class GraphState(TypedDict):
     """
     # --- 输入数据 ---
     scene_spec: SceneSpec
+    scene_index: int            # 在故事板中的位置，用于全局调度优先级
+    scene_key: Optional[str]    # 场景缓存 key (未开启场景缓存时为 None)，成功后按此写入缓存
     
     # --- 中间状态 ---
     code: Optional[str]         # 当前生成的 Python 代码
@@ -17,6 +19,10 @@ class GraphState(TypedDict):
     critic_feedback: Optional[str] # 视觉专家的修改建议
     layout_plan: Optional[str]
     fix_instructions: Optional[str]
+    layout_path: Optional[str]  # Lint 阶段埋点导出的包围盒 JSON
+    audio_pending: bool         # TTS 仍在后台进行，scene_spec.duration 是估算值
+    audio_mismatch: bool        # 真实时长偏差超出容忍度，需要按真实时长重新生成代码
+    audio_timing: Optional[List[SentenceTiming]]  # 旁白逐句时间 (估算或真实)
     
     # --- 最终产物 (单数) ---
     # 子图内部流转使用
@@ -28,6 +34,14 @@ class GraphState(TypedDict):
     # 注意：LangGraph 的 reducer 需要确保类型匹配，Annotated[List, add] 是标准的
     output_artifacts: Annotated[List[RenderArtifact], operator.add]
 
+class CachedSceneState(TypedDict):
+    """
+    [命中场景缓存] 跳过子图，直接输出缓存的产物
+    """
+    scene_spec: SceneSpec
+    scene_index: int
+    artifact: RenderArtifact
+
 class AggregateState(TypedDict):
     """
     [父图状态] 全局 Map-Reduce 状态
@@ -1,5 +1,7 @@
 from openai import AsyncOpenAI
 from src.core.config import settings
+from src.core.scheduler import scheduler
+from src.utils.tracing import tracer
 
 class LLMClient:
     def __init__(self, model: str = None):
@@ -24,15 +26,17 @@ class LLMClient:
 
     async def _call_llm(self, system_prompt: str, user_prompt: str, temperature: float) -> str:
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=temperature,
-                max_tokens=2000
-            )
+            with tracer.span("llm.chat", "llm", model=self.model):
+                async with scheduler.slot("llm"):
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        temperature=temperature,
+                        max_tokens=2000
+                    )
             return response.choices[0].message.content
         except Exception as e:
             return f"# LLM Call Error: {str(e)}"
\ No newline at end of file
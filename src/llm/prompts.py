@@ -1,6 +1,19 @@
 # src/llm/prompts.py
 
-from src.core.models import CodeGenerationRequest, SceneSpec
+from typing import List, Optional
+from src.core.models import CodeGenerationRequest, SceneSpec, SentenceTiming
+
+def format_narration_timing(timing: Optional[List[SentenceTiming]]) -> str:
+    """逐句时间表，让动画节拍对齐旁白 (单句时无意义，返回空字符串)"""
+    if not timing or len(timing) < 2:
+        return ""
+    lines = "\n".join(f"- [{t.start:.1f}s - {t.end:.1f}s] {t.text}" for t in timing)
+    return f"""
+# NARRATION TIMING
+Each sentence of the narration starts at the time shown. Time each animation beat (play/wait) so that
+the visual for a sentence appears when that sentence is spoken.
+{lines}
+"""
 
 # -------------------------------------------------------------------------
 # 1. Storyboard Phase (场景拆解)
@@ -138,15 +151,16 @@ For each element, explicitly specify:
 - **Relation**: (e.g., "Connected to [Prev Node] with a straight arrow")
 """
 
-def build_planner_user_prompt(scene: SceneSpec) -> str:
+def build_planner_user_prompt(scene: SceneSpec, timing: Optional[List[SentenceTiming]] = None) -> str:
     return f"""
 # SCENE TO PLAN
 **Description**: {scene.description}
 **Elements**: {', '.join(scene.elements)}
-
+{format_narration_timing(timing)}
 # TASK
 Generate a Layout Plan that strictly adheres to the SAFE ZONE and FLOWCHART RULES (Rectangles + Straight Lines + TL->TR->BR->BL path).
 """
+
 # -------------------------------------------------------------------------
 # 3. Fixer Phase (错误分析与修复指导) - [关键优化]
 # -------------------------------------------------------------------------
@@ -223,7 +237,8 @@ def build_code_user_prompt(
     request: CodeGenerationRequest, 
     layout_plan: str = None, 
     fix_instructions: str = None,
-    error_context: str = None
+    error_context: str = None,
+    timing: Optional[List[SentenceTiming]] = None
 ) -> str:
     prompt = f"""
 # SCENE SPEC
@@ -232,6 +247,7 @@ Narrative: "{request.scene.audio_script}"
 Duration: {request.scene.duration}s
 Elements: {', '.join(request.scene.elements)}
 """
+    prompt += format_narration_timing(timing)
 
     if fix_instructions:
         # --- 修复模式: 全量上下文 ---
@@ -308,4 +324,18 @@ Scene Description: "{scene.description}"
 Visual Elements: {', '.join(scene.elements)}
 
 Analyze the attached image frame.
-"""
\ No newline at end of file
+"""
+
+def build_critic_contact_sheet_user_prompt(scene: SceneSpec, timestamps: list) -> str:
+    stamps = ", ".join(f"t={t:.2f}s" for t in timestamps)
+    return f"""
+Scene Description: "{scene.description}"
+Visual Elements: {', '.join(scene.elements)}
+
+The attached image is a CONTACT SHEET: {len(timestamps)} keyframes of the same animation,
+tiled left-to-right, top-to-bottom. Each tile is labeled with its timestamp ({stamps}).
+
+Review EVERY tile, not only the last one. Mid-animation failures (overlaps, cut-offs) count.
+For each critical issue, add a "timestamp" field (seconds, taken from the tile label) to the issue object,
+and mention the timestamp in "suggestion".
+"""
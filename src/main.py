@@ -2,18 +2,28 @@ import json
 import argparse
 import os
 import asyncio
-from typing import List
+from pathlib import Path
+from typing import List, Optional
 
 from src.core.models import SceneSpec
 from src.core.config import settings
-from src.core.graph import ParallelManimFlow
+from src.core.graph import ParallelManimFlow, SharedServices
+from src.core.checkpoint import SqliteCheckpointer, new_run_id
+from src.core.progress import ProgressTracker
 from src.components.assembler import Assembler
+from src.components.scene_cache import SceneCache
+from src.components.tts import scene_audio_path
 from src.components.rewriter import ScriptRewriter
+from src.utils.encoding import PROFILES, get_profile
 from src.utils.logger import logger, metrics
+from src.utils.tracing import tracer
 
-async def load_script(file_path: str) -> List[SceneSpec]:
+async def load_script(
+    file_path: str, output_dir: Optional[Path] = None, rewriter: Optional[ScriptRewriter] = None
+) -> List[SceneSpec]:
     """
     加载剧本文件 (异步操作)
+    草稿改写后的故事板保存到 output_dir (默认 settings.OUTPUT_DIR)；批量模式下传入共享的 rewriter
     """
     ext = os.path.splitext(file_path)[1].lower()
     
@@ -28,10 +38,11 @@ async def load_script(file_path: str) -> List[SceneSpec]:
         with open(file_path, "r", encoding="utf-8") as f:
             content = f.read()
         
-        rewriter = ScriptRewriter()
+        rewriter = rewriter or ScriptRewriter()
         result = await rewriter.rewrite(content)
         
-        output_path = settings.OUTPUT_DIR / "storyboard.json"
+        output_path = (output_dir or settings.OUTPUT_DIR) / "storyboard.json"
+        output_path.parent.mkdir(parents=True, exist_ok=True)
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(result, f, indent=2, ensure_ascii=False)
         logger.info(f"💾 Saved storyboard to {output_path}")
@@ -42,22 +53,58 @@ async def load_script(file_path: str) -> List[SceneSpec]:
     else:
         raise ValueError(f"Unsupported file format: {ext}")
 
-async def async_main():
-    parser = argparse.ArgumentParser(description="Auto Manim Video Generator v3.0 (Parallel)")
-    parser.add_argument("script", help="Path to the storyboard JSON or raw draft")
-    args = parser.parse_args()
-
-    # 1. 加载数据
-    try:
-        scenes = await load_script(args.script)
-        logger.info(f"📂 Loaded script with {len(scenes)} scenes.")
-    except Exception as e:
-        logger.error(f"Failed to load script: {e}")
-        return
+async def run_storyboard(
+    scenes: List[SceneSpec],
+    run_id: str,
+    job_id: str = "default",
+    output_dir: Optional[Path] = None,
+    services: Optional[SharedServices] = None,
+    scene_cache: Optional[SceneCache] = None,
+    checkpointer: Optional[SqliteCheckpointer] = None,
+    resume: bool = False,
+    profile: Optional[str] = None,
+    rerender: Optional[List[str]] = None,
+    dashboard: bool = True
+) -> Optional[str]:
+    """
+    运行一个故事板: 并行图 -> 组装 -> 多档输出，返回成片路径 (失败时为 None)
+    单次运行与批量模式共用；批量模式下各任务共享 services / scene_cache / checkpointer 与全局调度器
+    """
+    output_dir = Path(output_dir) if output_dir else settings.OUTPUT_DIR
 
     # 2. 初始化并行图
-    logger.info("🚀 Initializing Parallel Workflow...")
-    app = ParallelManimFlow().compile()
+    logger.info(f"🚀 Initializing Parallel Workflow ({job_id})...")
+    scene_order = {s.scene_id: i for i, s in enumerate(scenes)}
+    assembler = Assembler(profile=get_profile(profile), output_dir=output_dir)
+
+    # 流水线组装: 每个场景结束后立即在后台合成片段，图结束时只剩拼接
+    pipelined = settings.ASSEMBLY_PIPELINED and settings.ASSEMBLY_ENGINE == "segments"
+    on_artifact = None
+    # 已交给 Assembler 的场景序号 (续跑时此前已完成的场景不会再触发回调，图结束后补交)
+    submitted = set()
+    if pipelined:
+        assembler.begin(expected=len(scenes))
+
+        def on_artifact(scene_id, art):
+            index = scene_order.get(scene_id, len(scenes))
+            submitted.add(index)
+            if art:
+                audio_p = scene_audio_path(scene_id, output_dir)
+                assembler.submit(index, art, str(audio_p) if audio_p else None)
+            else:
+                assembler.skip(index)
+
+    # 场景缓存: 未修改的场景直接复用上次的渲染结果
+    if rerender is not None:
+        rerender = rerender or [s.scene_id for s in scenes]
+        unknown = set(rerender) - set(scene_order)
+        if unknown:
+            logger.warning(f"--rerender: unknown scene IDs {sorted(unknown)}")
+
+    app = ParallelManimFlow(
+        on_artifact=on_artifact, job_id=job_id, scene_cache=scene_cache, rerender=rerender,
+        output_dir=output_dir, services=services
+    ).compile(checkpointer=checkpointer)
     
     # 3. 构造初始状态
     initial_state = {
@@ -67,46 +114,168 @@ async def async_main():
 
     # 4. 执行并行图 (Map-Reduce)
     logger.info(f"⚡ Dispatching {len(scenes)} scenes in parallel...")
+    events_path = output_dir / f"events_{run_id}.jsonl" if settings.PROGRESS_EVENTS else None
+    if events_path:
+        logger.info(f"📡 Progress events: {events_path}")
+    progress = ProgressTracker(run_id, [s.scene_id for s in scenes], events_path=events_path)
+    if resume and checkpointer:
+        # 上一次运行中已完成的场景: 已合并到状态中的，以及中断那一步里已经结束的 (pending writes)
+        done = list(checkpointer.run_value(run_id, "output_artifacts") or [])
+        for arts in checkpointer.run_writes(run_id, "output_artifacts"):
+            done.extend(arts or [])
+        progress.restore([art.scene_id for art in done if art])
     try:
-        # ainvoke 启动异步执行
+        # astream 启动异步执行，同时产生节点开始/结束事件
         run_config = {"recursion_limit": 100}
-        final_state = await app.ainvoke(initial_state, config=run_config)
+        if checkpointer:
+            run_config["configurable"] = {"thread_id": run_id}
+        # 续跑: 输入为 None，已完成的场景直接复用结果，进行中的场景从最后完成的节点继续
+        final_state = await progress.stream(
+            app, None if resume else initial_state, run_config, dashboard=dashboard
+        )
         artifacts = final_state.get("output_artifacts", [])
         
         logger.info(f"✅ Workflow finished. Collected {len(artifacts)} artifacts.")
+
+        # 续跑时上一次已完成的场景没有经过 on_artifact，补交给流水线组装
+        if pipelined:
+            for art in artifacts:
+                if scene_order.get(art.scene_id, len(scenes)) not in submitted:
+                    on_artifact(art.scene_id, art)
         
     except Exception as e:
         logger.error(f"❌ Parallel Execution Failed: {e}")
-        return
+        if pipelined:
+            assembler.cancel()
+        return None
+    finally:
+        progress.close()
 
     # 5. 组装 (Audio 路径需要从文件名推断，因为 TTS 现在是在 Graph 内部做的)
     # 假设 TTS 按照 scene_id 生成了文件
-    if artifacts:
+    movie_path = None
+    if artifacts and pipelined:
+        logger.info("\n🧩 Finishing pipelined assembly...")
+        try:
+            movie_path = await asyncio.to_thread(assembler.finish, output_filename="full_movie.mp4")
+        except Exception as e:
+            logger.error(f"Assembly failed: {e}")
+    elif artifacts:
         logger.info("\n🧩 Assembling final video...")
-        assembler = Assembler()
         
         # 按照场景顺序对 artifacts 排序 (并发执行可能导致乱序)
-        # 建立 scene_id 到 index 的映射
-        scene_order = {s.scene_id: i for i, s in enumerate(scenes)}
         artifacts.sort(key=lambda x: scene_order.get(x.scene_id, 999))
         
         # 收集对应的音频路径
         audio_paths = []
         for art in artifacts:
-            audio_p = settings.OUTPUT_DIR / "audio" / f"{art.scene_id}.mp3"
-            audio_paths.append(str(audio_p) if audio_p.exists() else None)
+            audio_p = scene_audio_path(art.scene_id, output_dir)
+            audio_paths.append(str(audio_p) if audio_p else None)
 
         try:
-            assembler.assemble(artifacts, audio_paths, output_filename="full_movie.mp4")
+            movie_path = await asyncio.to_thread(
+                assembler.assemble, artifacts, audio_paths, output_filename="full_movie.mp4"
+            )
         except Exception as e:
             logger.error(f"Assembly failed: {e}")
     else:
+        if pipelined:
+            assembler.cancel()
         logger.warning("No artifacts generated. Nothing to assemble.")
 
-    # 6. 报告
+    # 6. 多档输出 (1080p/720p/480p/GIF...)，一次解码同时编码
+    if movie_path and settings.RENDITION_LADDER:
+        try:
+            await asyncio.to_thread(assembler.render_ladder, movie_path)
+        except Exception as e:
+            logger.error(f"Rendition ladder failed: {e}")
+
+    # 成片已生成的运行不再需要续跑；组装失败时保留，可 --resume 直接重新组装
+    if checkpointer and movie_path and not settings.CHECKPOINT_KEEP_COMPLETED:
+        checkpointer.delete_thread(run_id)
+    return movie_path
+
+def print_reports(run_id: str):
+    """指标汇总与 trace (单次运行或整个批次一份)"""
     metrics.print_summary()
     metrics.save_report()
 
+    if settings.TRACING_ENABLED:
+        trace_path = tracer.export_chrome(settings.OUTPUT_DIR / f"trace_{run_id}.json")
+        logger.info("⏱️ Critical path per scene (self time by category):")
+        for line in tracer.summary_lines():
+            logger.info(f"   {line}")
+        logger.info(f"🧵 Trace saved to: {trace_path} (open in ui.perfetto.dev)")
+        if settings.TRACE_OTLP_ENDPOINT and not tracer.export_otlp(settings.TRACE_OTLP_ENDPOINT):
+            logger.warning("OTLP export skipped: opentelemetry-sdk / OTLP exporter not installed")
+
+async def async_main():
+    parser = argparse.ArgumentParser(description="Auto Manim Video Generator v3.0 (Parallel)")
+    parser.add_argument("script", nargs="?", help="Path to the storyboard JSON or raw draft")
+    parser.add_argument(
+        "--resume", metavar="RUN_ID", default=None,
+        help="Continue an interrupted run from its last checkpoint (use 'latest' for the most recent run)"
+    )
+    parser.add_argument(
+        "--profile", choices=list(PROFILES), default=None,
+        help="Encoding profile for assembly (default: settings.ENCODING_PROFILE)"
+    )
+    parser.add_argument(
+        "--rerender", nargs="*", metavar="SCENE_ID", default=None,
+        help="Ignore cached results for these scenes (all scenes if no ID is given); new results replace the cache entries"
+    )
+    parser.add_argument(
+        "--clear-scene-cache", action="store_true",
+        help="Delete every scene cache entry (from all storyboards) before running; may be used without a script"
+    )
+    args = parser.parse_args()
+    if not args.script and not args.resume and not args.clear_scene_cache:
+        parser.error("a script path or --resume RUN_ID is required")
+
+    if args.clear_scene_cache:
+        removed = SceneCache().clear()
+        logger.info(f"🧹 Cleared {removed} scene cache entries.")
+        if not args.script and not args.resume:
+            return
+
+    checkpointer = None
+    if settings.CHECKPOINT_ENABLED or args.resume:
+        checkpointer = SqliteCheckpointer(settings.OUTPUT_DIR / "checkpoints.sqlite")
+
+    # 1. 加载数据 (续跑时场景列表来自 checkpoint，不重新读取/改写剧本)
+    if args.resume:
+        run_id = checkpointer.latest_run() if args.resume == "latest" else args.resume
+        scenes = checkpointer.run_value(run_id, "scenes") if run_id else None
+        if not scenes:
+            logger.error(f"No checkpoint found for run '{args.resume}'.")
+            return
+        logger.info(f"♻️ Resuming run {run_id} ({len(scenes)} scenes).")
+    else:
+        run_id = new_run_id()
+        try:
+            scenes = await load_script(args.script)
+            logger.info(f"📂 Loaded script with {len(scenes)} scenes.")
+        except Exception as e:
+            logger.error(f"Failed to load script: {e}")
+            return
+        if checkpointer:
+            logger.info(f"🧷 Run ID: {run_id} (resume with --resume {run_id})")
+
+    await run_storyboard(
+        scenes, run_id,
+        scene_cache=SceneCache() if settings.SCENE_CACHE_ENABLED else None,
+        checkpointer=checkpointer,
+        resume=bool(args.resume),
+        profile=args.profile,
+        rerender=args.rerender,
+        dashboard=settings.PROGRESS_DASHBOARD
+    )
+
+    # 7. 报告
+    print_reports(run_id)
+    if checkpointer:
+        checkpointer.close()
+
 def main():
     # 异步入口封装
     asyncio.run(async_main())
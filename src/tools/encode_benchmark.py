@@ -0,0 +1,183 @@
+"""
+编码档位基准测试: 用每个档位重新编码 output/raw_video_clips 中的样例片段，
+统计编码速度 (帧/秒)、输出体积与画质 (SSIM；ffmpeg 编译了 libvmaf 时额外计算 VMAF)
+
+用法: python -m src.tools.encode_benchmark [--profiles fast balanced] [--clips-dir DIR] [--limit N]
+"""
+import argparse
+import json
+import re
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from src.core.config import settings
+from src.utils import media_info
+from src.utils.encoding import PROFILES, EncodingProfile
+from src.utils.logger import logger
+
+_SSIM_RE = re.compile(r"SSIM .*All:\s*([\d.]+)")
+_VMAF_RE = re.compile(r"VMAF score[:=]\s*([\d.]+)")
+
+class BenchmarkResult(BaseModel):
+    profile: str
+    clip: str
+    frames: int = 0
+    seconds: float = 0.0            # 编码耗时 (墙钟)
+    encode_fps: float = 0.0
+    size_bytes: int = 0
+    bitrate_kbps: float = 0.0
+    ssim: Optional[float] = None
+    vmaf: Optional[float] = None
+    error: Optional[str] = None
+
+def encode_command(profile: EncodingProfile, src: Path, out: Path, fps: Optional[float]) -> List[str]:
+    """与 Assembler 相同的视频编码参数；样例片段没有音轨，只测画面"""
+    return [
+        "ffmpeg", "-y", "-v", "error",
+        "-i", str(src),
+        "-map", "0:v",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", *profile.video_args(fps),
+        "-threads", str(profile.thread_count),
+        "-an", str(out)
+    ]
+
+def quality_command(distorted: Path, reference: Path, metric: str) -> List[str]:
+    """metric: ssim | libvmaf，第一个输入为待测视频，第二个为参考视频"""
+    return [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", str(distorted), "-i", str(reference),
+        "-lavfi", f"[0:v][1:v]{metric}",
+        "-f", "null", "-"
+    ]
+
+def parse_ssim(log: str) -> Optional[float]:
+    match = _SSIM_RE.search(log)
+    return float(match.group(1)) if match else None
+
+def parse_vmaf(log: str) -> Optional[float]:
+    match = _VMAF_RE.search(log)
+    return float(match.group(1)) if match else None
+
+def has_libvmaf() -> bool:
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-filters"], capture_output=True, text=True)
+    except OSError:
+        return False
+    return "libvmaf" in result.stdout
+
+def _measure(distorted: Path, reference: Path, metric: str) -> str:
+    result = subprocess.run(quality_command(distorted, reference, metric), capture_output=True, text=True)
+    return result.stderr
+
+def benchmark_clip(profile: EncodingProfile, clip: Path, work_dir: Path, vmaf: bool = False) -> BenchmarkResult:
+    result = BenchmarkResult(profile=profile.name, clip=clip.name)
+    out = work_dir / f"{clip.stem}.{profile.name}.mp4"
+    try:
+        info = media_info.probe(clip)
+        start = time.perf_counter()
+        subprocess.run(
+            encode_command(profile, clip, out, info.fps),
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        result.seconds = time.perf_counter() - start
+
+        result.frames = round(info.duration * info.fps) if info.fps else 0
+        result.encode_fps = result.frames / result.seconds if result.seconds > 0 else 0.0
+        result.size_bytes = out.stat().st_size
+        if info.duration:
+            result.bitrate_kbps = result.size_bytes * 8 / info.duration / 1000
+
+        result.ssim = parse_ssim(_measure(out, clip, "ssim"))
+        if vmaf:
+            result.vmaf = parse_vmaf(_measure(out, clip, "libvmaf"))
+    except subprocess.CalledProcessError as e:
+        result.error = (e.stderr or b"").decode(errors="replace").strip() or str(e)
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+def run_benchmark(
+    clips: List[Path],
+    profiles: List[EncodingProfile],
+    work_dir: Path,
+    vmaf: bool = False
+) -> List[BenchmarkResult]:
+    work_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    for profile in profiles:
+        for clip in clips:
+            logger.info(f"   ⏱️ [Benchmark] {profile.name} <- {clip.name}")
+            results.append(benchmark_clip(profile, clip, work_dir, vmaf=vmaf))
+    return results
+
+def _mean(values: List[Optional[float]]) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+def summarize(results: List[BenchmarkResult]) -> Dict[str, dict]:
+    """按档位汇总: 总帧数 / 总耗时得到整体编码速度，画质取各片段平均值"""
+    summary: Dict[str, dict] = {}
+    for name in dict.fromkeys(r.profile for r in results):
+        ok = [r for r in results if r.profile == name and not r.error]
+        frames = sum(r.frames for r in ok)
+        seconds = sum(r.seconds for r in ok)
+        summary[name] = {
+            "clips": len(ok),
+            "failed": sum(1 for r in results if r.profile == name and r.error),
+            "encode_fps": frames / seconds if seconds > 0 else 0.0,
+            "size_bytes": sum(r.size_bytes for r in ok),
+            "ssim": _mean([r.ssim for r in ok]),
+            "vmaf": _mean([r.vmaf for r in ok]),
+        }
+    return summary
+
+def format_table(summary: Dict[str, dict]) -> str:
+    lines = [f"{'profile':<10} {'clips':>5} {'fps':>8} {'size (MB)':>10} {'SSIM':>7} {'VMAF':>6}"]
+    for name, row in summary.items():
+        ssim = f"{row['ssim']:.4f}" if row["ssim"] is not None else "-"
+        vmaf = f"{row['vmaf']:.2f}" if row["vmaf"] is not None else "-"
+        lines.append(
+            f"{name:<10} {row['clips']:>5} {row['encode_fps']:>8.1f} "
+            f"{row['size_bytes'] / 1024 ** 2:>10.2f} {ssim:>7} {vmaf:>6}"
+        )
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark assembler encoding profiles")
+    parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES))
+    parser.add_argument("--clips-dir", type=Path, default=settings.OUTPUT_DIR / "raw_video_clips")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N clips (0 = all)")
+    parser.add_argument("--no-vmaf", action="store_true", help="Skip VMAF even if ffmpeg has libvmaf")
+    args = parser.parse_args()
+
+    clips = sorted(args.clips_dir.glob("*.mp4"))
+    if args.limit > 0:
+        clips = clips[:args.limit]
+    if not clips:
+        logger.error(f"No sample clips found in {args.clips_dir}")
+        return
+
+    vmaf = not args.no_vmaf and has_libvmaf()
+    if not vmaf:
+        logger.info("   ℹ️ [Benchmark] VMAF disabled (ffmpeg built without libvmaf or --no-vmaf), reporting SSIM only")
+
+    bench_dir = settings.OUTPUT_DIR / "benchmark"
+    results = run_benchmark(clips, [PROFILES[name] for name in args.profiles], bench_dir / "encodes", vmaf=vmaf)
+    summary = summarize(results)
+    logger.info("\n" + format_table(summary))
+
+    report_path = bench_dir / f"encode_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    report_path.write_text(json.dumps({
+        "profiles": {name: PROFILES[name].model_dump() for name in args.profiles},
+        "summary": summary,
+        "results": [r.model_dump() for r in results],
+    }, indent=2), encoding="utf-8")
+    logger.info(f"📝 Benchmark report saved to: {report_path}")
+
+if __name__ == "__main__":
+    main()
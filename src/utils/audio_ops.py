@@ -0,0 +1,135 @@
+# src/utils/audio_ops.py
+import re
+import subprocess
+import tempfile
+import wave
+from pathlib import Path
+from typing import List, Union
+
+from src.utils import media_info
+from src.utils.tracing import tracer
+
+# 成片使用的标准音轨格式: TTS 阶段转换一次写入缓存，组装时直接 -c:a copy
+CANONICAL_AUDIO_EXT = "m4a"
+CANONICAL_AUDIO_ARGS = ["-c:a", "aac", "-b:a", "192k", "-ar", "44100", "-ac", "2"]
+
+# 句末标点 (中英文)，标点保留在句子末尾
+_SENTENCE_RE = re.compile(r"[^。！？!?；;\n]+[。！？!?；;]*")
+# 英文句号 (含省略号) 只有后面是空白或文本结尾时才算句末，3.14 / example.com 不会被切开
+_PERIOD_RE = re.compile(r"\.+(?=\s|$)")
+# 以句号结尾但通常不是句末的缩写 (小写比较，不含最后的句号)
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "e.g", "i.e", "fig", "no", "approx", "inc", "ltd", "u.s",
+}
+
+def _is_abbreviation(word: str) -> bool:
+    word = word.lstrip("(\"'“‘")
+    # 单个大写字母是姓名缩写 (J. Smith)
+    return word.lower() in _ABBREVIATIONS or (len(word) == 1 and word.isupper())
+
+def _split_periods(piece: str) -> List[str]:
+    parts, start = [], 0
+    for match in _PERIOD_RE.finditer(piece):
+        words = piece[start:match.start()].split()
+        if not words or _is_abbreviation(words[-1]):
+            continue
+        parts.append(piece[start:match.end()])
+        start = match.end()
+    parts.append(piece[start:])
+    return parts
+
+def split_sentences(text: str, min_chars: int = 4) -> List[str]:
+    """
+    按句末标点切分文案。过短的片段 (如单独的 "好。") 合并到前一句，避免产生过多碎片请求
+    英文句号需要后跟空白，并排除小数与常见缩写 (见 _split_periods)
+    """
+    sentences: List[str] = []
+    for match in _SENTENCE_RE.finditer(text):
+        for piece in _split_periods(match.group(0)):
+            piece = piece.strip()
+            if not piece:
+                continue
+            if sentences and len(piece) < min_chars:
+                # 英文片段之间保留空格
+                sep = " " if sentences[-1][-1].isascii() and piece[0].isascii() else ""
+                sentences[-1] += sep + piece
+            else:
+                sentences.append(piece)
+    return sentences or ([text.strip()] if text.strip() else [])
+
+def concat_audio(paths: List[Union[str, Path]], out_path: Union[str, Path]) -> Path:
+    """
+    无损拼接多段音频 (不重新编码):
+    - WAV: 参数一致时直接拼接 PCM 数据
+    - MP3: 去掉 ID3 标签与 Xing/Info 帧后拼接 MPEG 帧
+    - 其他格式: 回退到 ffmpeg concat (-c copy)
+    """
+    out_path = Path(out_path)
+    formats = {media_info.probe(p).format for p in paths}
+    if formats == {"wav"}:
+        _concat_wav(paths, out_path)
+    elif formats == {"mp3"}:
+        _concat_mp3(paths, out_path)
+    else:
+        _concat_ffmpeg(paths, out_path)
+    return out_path
+
+def _concat_wav(paths: List[Union[str, Path]], out_path: Path):
+    params = None
+    with wave.open(str(out_path), "wb") as out:
+        for p in paths:
+            with wave.open(str(p), "rb") as src:
+                current = (src.getnchannels(), src.getsampwidth(), src.getframerate())
+                if params is None:
+                    params = current
+                    out.setnchannels(current[0])
+                    out.setsampwidth(current[1])
+                    out.setframerate(current[2])
+                elif current != params:
+                    raise ValueError(f"WAV parameters differ: {current} != {params} ({p})")
+                out.writeframes(src.readframes(src.getnframes()))
+
+def _concat_mp3(paths: List[Union[str, Path]], out_path: Path):
+    with open(out_path, "wb") as out:
+        for p in paths:
+            data = Path(p).read_bytes()
+            frame = media_info.find_mp3_frame(data, media_info.id3v2_size(data))
+            if not frame:
+                raise ValueError(f"No MPEG audio frame in {p}")
+            start = frame.offset
+            # Xing/Info 帧只记录元数据，拼接后帧数会失真，必须去掉
+            if media_info.mp3_info_frame_count(data, frame) is not None:
+                start += frame.length
+            end = len(data) - 128 if data[-128:-125] == b"TAG" else len(data)
+            out.write(data[start:end])
+
+def _concat_ffmpeg(paths: List[Union[str, Path]], out_path: Path):
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        for p in paths:
+            f.write(f"file '{Path(p).resolve()}'\n")
+        list_path = f.name
+    try:
+        with tracer.span("ffmpeg.concat_audio", "ffmpeg", chunks=len(paths)):
+            subprocess.run([
+                "ffmpeg", "-y", "-v", "error",
+                "-f", "concat", "-safe", "0", "-i", list_path,
+                "-c", "copy", str(out_path)
+            ], check=True)
+    finally:
+        Path(list_path).unlink(missing_ok=True)
+
+def is_canonical_audio(path: Union[str, Path]) -> bool:
+    return Path(path).suffix.lstrip(".").lower() == CANONICAL_AUDIO_EXT
+
+def to_canonical_audio(src: Union[str, Path], out_path: Union[str, Path]) -> Path:
+    """转换为标准 AAC 音轨 (44.1kHz 双声道)，组装阶段无需再转码"""
+    out_path = Path(out_path)
+    with tracer.span("ffmpeg.aac", "ffmpeg"):
+        subprocess.run([
+            "ffmpeg", "-y", "-v", "error",
+            "-i", str(src), "-vn",
+            *CANONICAL_AUDIO_ARGS,
+            "-movflags", "+faststart",
+            str(out_path)
+        ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return out_path
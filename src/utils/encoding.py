@@ -0,0 +1,87 @@
+# src/utils/encoding.py
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from src.core.config import settings
+
+class EncodingProfile(BaseModel):
+    """
+    一组 libx264 / AAC 编码参数
+    crf 与 video_bitrate 二选一 (同时设置时以码率为准)；threads / gop_seconds 为空时使用 ffmpeg 默认值
+    """
+    name: str
+    preset: str = "medium"
+    crf: Optional[int] = 23
+    video_bitrate: Optional[str] = None   # e.g. "6M"，设置后使用 ABR 并限制峰值码率
+    threads: Optional[int] = None         # 每个 ffmpeg 进程的编码线程数，为空时使用 ASSEMBLER_FFMPEG_THREADS
+    gop_seconds: Optional[float] = None   # 关键帧间隔 (秒)，影响拖动定位与 HLS 切片粒度
+    audio_bitrate: str = "192k"
+
+    @property
+    def thread_count(self) -> int:
+        return self.threads or settings.ASSEMBLER_FFMPEG_THREADS
+
+    def video_args(self, fps: Optional[float] = None) -> List[str]:
+        """编码器调优参数 (不含 -c:v / -pix_fmt)，GOP 需要帧率才能换算为帧数"""
+        args = ["-preset", self.preset]
+        if self.video_bitrate:
+            args += ["-b:v", self.video_bitrate, "-maxrate", self.video_bitrate, "-bufsize", self.video_bitrate]
+        elif self.crf is not None:
+            args += ["-crf", str(self.crf)]
+        if self.gop_seconds and fps:
+            args += ["-g", str(max(1, round(self.gop_seconds * fps)))]
+        return args
+
+    def audio_args(self) -> List[str]:
+        return ["-c:a", "aac", "-b:a", self.audio_bitrate, "-ar", "44100", "-ac", "2"]
+
+# balanced 与引入编码档位之前的默认输出一致 (libx264 medium / CRF 23 / AAC 192k)
+PROFILES: Dict[str, EncodingProfile] = {
+    "preview": EncodingProfile(
+        name="preview", preset="ultrafast", crf=30, threads=1, gop_seconds=2, audio_bitrate="96k"
+    ),
+    "fast": EncodingProfile(
+        name="fast", preset="veryfast", crf=25, gop_seconds=2, audio_bitrate="128k"
+    ),
+    "balanced": EncodingProfile(name="balanced"),
+    "archival": EncodingProfile(
+        name="archival", preset="slow", crf=18, threads=4, gop_seconds=2, audio_bitrate="256k"
+    ),
+}
+
+def get_profile(name: Optional[str] = None) -> EncodingProfile:
+    """按名称取编码档位，为空时使用 settings.ENCODING_PROFILE"""
+    key = (name or settings.ENCODING_PROFILE).lower()
+    if key not in PROFILES:
+        raise ValueError(f"Unknown encoding profile '{key}'. Available: {', '.join(PROFILES)}")
+    return PROFILES[key]
+
+class Rendition(BaseModel):
+    """
+    输出阶梯中的一档: kind="video" 为 H.264 MP4 (按 profile 编码，音频直接复制)，
+    kind="gif" 为预览动图 (调色板两步法，只取开头 gif_seconds 秒)
+    """
+    name: str
+    height: int
+    kind: str = "video"             # video | gif
+    profile: str = "balanced"       # 编码档位名 (仅 video)
+    gif_fps: float = 10.0
+    gif_seconds: float = 10.0
+
+    @property
+    def extension(self) -> str:
+        return "gif" if self.kind == "gif" else "mp4"
+
+RENDITIONS: Dict[str, Rendition] = {
+    "1080p": Rendition(name="1080p", height=1080),
+    "720p": Rendition(name="720p", height=720),
+    "480p": Rendition(name="480p", height=480, profile="fast"),
+    "gif": Rendition(name="gif", height=270, kind="gif"),
+}
+
+def get_renditions(names: List[str]) -> List[Rendition]:
+    unknown = [n for n in names if n not in RENDITIONS]
+    if unknown:
+        raise ValueError(f"Unknown rendition(s) {', '.join(unknown)}. Available: {', '.join(RENDITIONS)}")
+    return [RENDITIONS[n] for n in names]
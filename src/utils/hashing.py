@@ -0,0 +1,25 @@
+import hashlib
+from pathlib import Path
+from typing import Union
+
+def file_digest(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """
+    计算文件内容的 SHA-256 摘要。
+    分块读取，避免把大文件 (视频/音频) 整体读入内存。
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def text_digest(*parts: object) -> str:
+    """
+    将若干字段拼接后计算 SHA-256，用作缓存键。
+    字段之间使用不可见分隔符，避免 ("ab", "c") 与 ("a", "bc") 冲突。
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import io
+from pathlib import Path
+from typing import List, Union
+
+from PIL import Image, ImageDraw, ImageFont
+from pydantic import BaseModel
+
+# Pillow 保存格式 -> data URL 的 MIME 类型
+_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "jpg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+
+class EncodedImage(BaseModel):
+    """
+    已经压缩、可直接内联到 VLM 请求里的图片
+    """
+    data: str          # Base64 编码后的内容
+    mime_type: str
+    width: int
+    height: int
+    size_bytes: int    # 编码前的字节数 (即实际上传的图片体积)
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.data}"
+
+def encode_for_vlm(
+    image_path: Union[str, Path],
+    max_edge: int = 1024,
+    fmt: str = "jpeg",
+    quality: int = 85
+) -> EncodedImage:
+    """
+    将渲染帧缩放到指定长边并重新编码，降低上传体积和图片 token 数。
+    CPU 密集，调用方应放到线程池执行。
+    """
+    fmt_key = fmt.lower()
+    if fmt_key not in _FORMATS:
+        raise ValueError(f"Unsupported image format: {fmt}")
+    pil_format, mime_type = _FORMATS[fmt_key]
+
+    with Image.open(image_path) as img:
+        img.load()
+        if max_edge and max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        # JPEG 不支持透明通道
+        if pil_format == "JPEG" and img.mode != "RGB":
+            img = img.convert("RGB")
+
+        buf = io.BytesIO()
+        save_kwargs = {}
+        if pil_format in ("JPEG", "WEBP"):
+            save_kwargs["quality"] = quality
+        if pil_format == "PNG":
+            save_kwargs["optimize"] = True
+        img.save(buf, format=pil_format, **save_kwargs)
+        width, height = img.size
+
+    raw = buf.getvalue()
+    return EncodedImage(
+        data=base64.b64encode(raw).decode("utf-8"),
+        mime_type=mime_type,
+        width=width,
+        height=height,
+        size_bytes=len(raw)
+    )
+
+def pixel_digest(image_path: Union[str, Path]) -> str:
+    """
+    解码后像素的 SHA-256 摘要 (与文件编码、元数据无关)。
+    只有像素完全一致的两帧摘要才相同，元素移动一个像素也会得到不同的摘要。
+    """
+    with Image.open(image_path) as img:
+        rgba = img.convert("RGBA")
+        h = hashlib.sha256(f"{rgba.width}x{rgba.height}".encode("utf-8"))
+        h.update(rgba.tobytes())
+    return h.hexdigest()
+
+def build_contact_sheet(
+    frame_paths: List[Union[str, Path]],
+    labels: List[str],
+    out_path: Union[str, Path],
+    columns: int = 3,
+    label_height: int = 24
+) -> Path:
+    """
+    将多张关键帧拼成一张带标签 (时间戳) 的网格图，用于一次性发给 VLM 审查
+    """
+    if not frame_paths:
+        raise ValueError("No frames to tile.")
+
+    frames = []
+    for p in frame_paths:
+        with Image.open(p) as img:
+            frames.append(img.convert("RGB"))
+
+    tile_w = max(f.width for f in frames)
+    tile_h = max(f.height for f in frames) + label_height
+    columns = max(1, min(columns, len(frames)))
+    rows = (len(frames) + columns - 1) // columns
+
+    sheet = Image.new("RGB", (tile_w * columns, tile_h * rows), (40, 40, 40))
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default()
+
+    for idx, (frame, label) in enumerate(zip(frames, labels)):
+        x = (idx % columns) * tile_w
+        y = (idx // columns) * tile_h
+        draw.rectangle([x, y, x + tile_w - 1, y + label_height - 1], fill=(255, 215, 0))
+        draw.text((x + 6, y + 4), label, fill=(0, 0, 0), font=font)
+        sheet.paste(frame, (x, y + label_height))
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    sheet.save(out_path)
+    return out_path
@@ -35,6 +35,12 @@ class MetricsTracker:
         self.total_cost_tokens = 0 # 估算
         self.syntax_retries = 0
         self.visual_retries = 0
+        # Critic 请求开销 (上传图片字节数 / VLM token 用量)
+        self.critic_requests = 0
+        self.critic_image_bytes = 0
+        self.critic_tokens = 0
+        # 命中跨运行场景缓存、跳过生成的场景
+        self.cached_scenes = 0
         self.start_time = datetime.now()
         self.scene_metrics: Dict[str, Any] = {}
 
@@ -51,6 +57,23 @@ class MetricsTracker:
             "visual_retries": vis_retries
         }
 
+    def log_scene_cached(self, scene_id: str):
+        self.total_scenes += 1
+        self.successful_scenes += 1
+        self.cached_scenes += 1
+        self.scene_metrics[scene_id] = {
+            "success": True,
+            "cached": True,
+            "syntax_retries": 0,
+            "visual_retries": 0
+        }
+
+    def log_critic_request(self, image_bytes: int, tokens: int):
+        self.critic_requests += 1
+        self.critic_image_bytes += image_bytes
+        self.critic_tokens += tokens
+        self.total_cost_tokens += tokens
+
     def print_summary(self):
         duration = datetime.now() - self.start_time
         logger.info("\n" + "="*40)
@@ -58,6 +81,13 @@ class MetricsTracker:
         logger.info(f"   Success Rate: {self.successful_scenes}/{self.total_scenes}")
         logger.info(f"   Total Syntax Retries (Linter): {self.syntax_retries}")
         logger.info(f"   Total Visual Retries (Critic): {self.visual_retries}")
+        if self.cached_scenes:
+            logger.info(f"   Scene Cache Hits: {self.cached_scenes}/{self.total_scenes}")
+        if self.critic_requests:
+            logger.info(
+                f"   Critic Requests: {self.critic_requests} "
+                f"(image {self.critic_image_bytes / 1024:.1f} KB, {self.critic_tokens} tokens)"
+            )
         logger.info("="*40 + "\n")
 
     def save_report(self):
@@ -0,0 +1,391 @@
+# src/utils/media_info.py
+"""
+进程内媒体元数据读取 (不启动 ffprobe)
+
+- MP3: 解析帧头，优先使用 Xing/Info/VBRI 中的总帧数，否则按 CBR 码率估算
+- WAV: 解析 RIFF fmt/data chunk
+- MP4/M4A/MOV: 遍历 box，读取 mvhd/tkhd/mdhd/stts
+
+只有遇到无法识别的格式时才回退到 ffprobe。结果按 (路径, 文件大小, 修改时间) 缓存，命中时只需一次 stat。
+"""
+import json
+import os
+import struct
+import subprocess
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+class MediaInfo(BaseModel):
+    format: str                      # mp3 | wav | mp4 | ffprobe
+    duration: float = 0.0            # 秒
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[float] = None
+    video_codec: Optional[str] = None  # h264 | hevc | ...
+    pix_fmt: Optional[str] = None      # yuv420p | yuv422p | ... (无法确定时为 None)
+    timescale: Optional[int] = None    # 视频轨时间基 (1/timescale 秒)
+    avcc: Optional[str] = None         # H.264 avcC 记录 (含 SPS/PPS) 的十六进制，完全相同才能无损拼接
+
+    @property
+    def resolution(self) -> str:
+        return f"{self.width}x{self.height}"
+
+class MediaInfoError(Exception):
+    pass
+
+_memo: Dict[Tuple[str, int, int], MediaInfo] = {}
+_memo_lock = threading.Lock()
+
+def probe(path: Union[str, Path]) -> MediaInfo:
+    """
+    读取媒体信息
+    缓存 key 为 (路径, 文件大小, 修改时间 ns): 不读取文件内容，可以在事件循环线程中调用；文件被改写后自动失效
+    """
+    stat = os.stat(path)
+    digest = (str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns)
+    with _memo_lock:
+        if digest in _memo:
+            return _memo[digest]
+
+    info = _parse(Path(path))
+    if info is None:
+        info = _ffprobe(Path(path))
+
+    with _memo_lock:
+        _memo[digest] = info
+    return info
+
+def probe_duration(path: Union[str, Path]) -> float:
+    return probe(path).duration
+
+def probe_resolution(path: Union[str, Path]) -> str:
+    """返回 'WxH' (e.g. '1920x1080')"""
+    info = probe(path)
+    if not info.width or not info.height:
+        raise MediaInfoError(f"No video stream in {path}")
+    return info.resolution
+
+def _parse(path: Path) -> Optional[MediaInfo]:
+    with open(path, "rb") as f:
+        head = f.read(12)
+        f.seek(0)
+        try:
+            if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+                return _parse_wav(f)
+            if head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide"):
+                return _parse_mp4(f, path.stat().st_size)
+            if head[:3] == b"ID3" or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+                return _parse_mp3(f, path.stat().st_size)
+        except (struct.error, MediaInfoError, IndexError, ZeroDivisionError):
+            return None
+    return None
+
+# ---------------------------------------------------------------------------
+# MP3
+# ---------------------------------------------------------------------------
+_MP3_BITRATES = {
+    (3, 3): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],  # MPEG1 Layer I
+    (3, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],     # MPEG1 Layer II
+    (3, 1): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],      # MPEG1 Layer III
+    (2, 3): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],     # MPEG2 Layer I
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],          # MPEG2 Layer II
+    (2, 1): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],          # MPEG2 Layer III
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+class Mp3Frame(BaseModel):
+    offset: int
+    version: int       # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+    layer: int         # 3 = Layer I, 2 = Layer II, 1 = Layer III
+    bitrate: int       # bps
+    sample_rate: int
+    padding: int
+    mono: bool
+
+    @property
+    def samples(self) -> int:
+        if self.layer == 3:
+            return 384
+        if self.layer == 1 and self.version != 3:
+            return 576
+        return 1152
+
+    @property
+    def length(self) -> int:
+        if self.layer == 3:
+            return (12 * self.bitrate // self.sample_rate + self.padding) * 4
+        return self.samples // 8 * self.bitrate // self.sample_rate + self.padding
+
+def id3v2_size(data: bytes) -> int:
+    """ID3v2 标签总长度 (不存在时为 0)"""
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+def parse_mp3_header(data: bytes, offset: int) -> Optional[Mp3Frame]:
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset:offset + 4]
+    if b0 != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+    bitrate_idx, sr_idx = b2 >> 4, (b2 >> 2) & 3
+    if version == 1 or layer == 0 or bitrate_idx in (0, 15) or sr_idx == 3:
+        return None
+    table = _MP3_BITRATES[(3 if version == 3 else 2, layer)]
+    return Mp3Frame(
+        offset=offset,
+        version=version,
+        layer=layer,
+        bitrate=table[bitrate_idx] * 1000,
+        sample_rate=_MP3_SAMPLE_RATES[version][sr_idx],
+        padding=(b2 >> 1) & 1,
+        mono=(b3 >> 6) == 3
+    )
+
+def find_mp3_frame(data: bytes, start: int = 0) -> Optional[Mp3Frame]:
+    """从 start 开始寻找第一个有效帧 (要求下一帧头也有效，避免把数据误判成同步字)"""
+    pos = data.find(b"\xff", start)
+    while 0 <= pos < len(data) - 4:
+        frame = parse_mp3_header(data, pos)
+        if frame:
+            nxt = pos + frame.length
+            if nxt + 4 > len(data) or parse_mp3_header(data, nxt):
+                return frame
+        pos = data.find(b"\xff", pos + 1)
+    return None
+
+def mp3_info_frame_count(data: bytes, frame: Mp3Frame) -> Optional[int]:
+    """读取首帧中的 Xing/Info 或 VBRI 头记录的总帧数 (该帧本身不含音频)"""
+    if frame.version == 3:
+        side_info = 17 if frame.mono else 32
+    else:
+        side_info = 9 if frame.mono else 17
+    xing = frame.offset + 4 + side_info
+    tag = data[xing:xing + 4]
+    if tag in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 1:
+            return struct.unpack(">I", data[xing + 8:xing + 12])[0]
+        return 0
+    vbri = frame.offset + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        return struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+    return None
+
+def _parse_mp3(f: BinaryIO, file_size: int) -> MediaInfo:
+    data = f.read(64 * 1024)
+    start = id3v2_size(data)
+    if start > len(data) - 4:
+        f.seek(0)
+        data = f.read(start + 64 * 1024)
+
+    frame = find_mp3_frame(data, start)
+    if not frame:
+        raise MediaInfoError("No MPEG audio frame found")
+
+    frames = mp3_info_frame_count(data, frame)
+    if frames:
+        duration = frames * frame.samples / frame.sample_rate
+    else:
+        # CBR: 按码率估算 (扣除 ID3v1 尾标签)
+        f.seek(max(0, file_size - 128))
+        tail = 128 if f.read(3) == b"TAG" else 0
+        duration = (file_size - frame.offset - tail) * 8 / frame.bitrate
+    return MediaInfo(format="mp3", duration=round(duration, 3))
+
+# ---------------------------------------------------------------------------
+# WAV
+# ---------------------------------------------------------------------------
+def _parse_wav(f: BinaryIO) -> MediaInfo:
+    f.seek(12)
+    byte_rate = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        chunk_id, size = struct.unpack("<4sI", header)
+        if chunk_id == b"fmt ":
+            fmt = f.read(size)
+            byte_rate = struct.unpack("<I", fmt[8:12])[0]
+            if size % 2:
+                f.seek(1, 1)
+            continue
+        if chunk_id == b"data" and byte_rate:
+            return MediaInfo(format="wav", duration=round(size / byte_rate, 3))
+        f.seek(size + (size % 2), 1)
+    raise MediaInfoError("Incomplete WAV file")
+
+# ---------------------------------------------------------------------------
+# MP4 / ISO BMFF
+# ---------------------------------------------------------------------------
+def iter_boxes(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """遍历 [start, end) 范围内的 box，产出 (类型, 内容起点, box 终点)"""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, box_type = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            raise MediaInfoError(f"Corrupt box {box_type!r} at {pos}")
+        yield box_type, pos + header, pos + size
+        pos += size
+
+def find_box(f: BinaryIO, start: int, end: int, *path: bytes) -> Optional[Tuple[int, int]]:
+    """按路径查找嵌套 box，返回 (内容起点, 终点)"""
+    for box_type, body, box_end in iter_boxes(f, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return body, box_end
+            return find_box(f, body, box_end, *path[1:])
+    return None
+
+def _read_full_box(f: BinaryIO, body: int, size: int) -> Tuple[int, bytes]:
+    f.seek(body)
+    version = f.read(1)[0]
+    f.read(3)
+    return version, f.read(size)
+
+def _parse_mp4(f: BinaryIO, file_size: int) -> MediaInfo:
+    moov = find_box(f, 0, file_size, b"moov")
+    if not moov:
+        raise MediaInfoError("No moov box")
+
+    info = MediaInfo(format="mp4")
+    mvhd = find_box(f, moov[0], moov[1], b"mvhd")
+    if mvhd:
+        version, data = _read_full_box(f, mvhd[0], 32)
+        if version == 1:
+            timescale, duration = struct.unpack(">IQ", data[16:28])
+        else:
+            timescale, duration = struct.unpack(">II", data[8:16])
+        if timescale:
+            info.duration = round(duration / timescale, 3)
+
+    for box_type, body, box_end in iter_boxes(f, moov[0], moov[1]):
+        if box_type != b"trak":
+            continue
+        hdlr = find_box(f, body, box_end, b"mdia", b"hdlr")
+        if not hdlr:
+            continue
+        _, data = _read_full_box(f, hdlr[0], 8)
+        if data[4:8] != b"vide":
+            continue
+
+        tkhd = find_box(f, body, box_end, b"tkhd")
+        if tkhd:
+            version, data = _read_full_box(f, tkhd[0], 92)
+            offset = 32 if version == 1 else 20
+            # 跳过 reserved(8) + layer/alt_group/volume/reserved(8) + matrix(36)
+            width, height = struct.unpack(">II", data[offset + 52:offset + 60])
+            info.width, info.height = width >> 16, height >> 16
+
+        info.fps, info.timescale = _video_timing(f, body, box_end)
+        info.video_codec, info.pix_fmt, info.avcc = _video_codec(f, body, box_end)
+        break
+
+    return info
+
+def _video_timing(f: BinaryIO, trak_body: int, trak_end: int) -> Tuple[Optional[float], Optional[int]]:
+    """返回 (帧率, 时间基)"""
+    mdhd = find_box(f, trak_body, trak_end, b"mdia", b"mdhd")
+    if not mdhd:
+        return None, None
+    version, data = _read_full_box(f, mdhd[0], 32)
+    timescale = struct.unpack(">I", data[16:20] if version == 1 else data[8:12])[0]
+
+    stts = find_box(f, trak_body, trak_end, b"mdia", b"minf", b"stbl", b"stts")
+    if not stts:
+        return None, timescale
+    _, data = _read_full_box(f, stts[0], 12)
+    entry_count = struct.unpack(">I", data[0:4])[0]
+    if not entry_count:
+        return None, timescale
+    sample_delta = struct.unpack(">I", data[8:12])[0]
+    return (round(timescale / sample_delta, 3) if sample_delta else None), timescale
+
+_CODEC_NAMES = {b"avc1": "h264", b"avc3": "h264", b"hvc1": "hevc", b"hev1": "hevc", b"mp4v": "mpeg4", b"av01": "av1"}
+# H.264 High 系列 profile，avcC 末尾带 chroma_format / bit_depth 扩展字段
+_AVC_HIGH_PROFILES = {100, 110, 122, 144}
+_CHROMA_NAMES = {0: "gray", 1: "yuv420p", 2: "yuv422p", 3: "yuv444p"}
+
+def _video_codec(f: BinaryIO, trak_body: int, trak_end: int) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    从 stsd 采样描述读取 (编码格式, 像素格式, avcC 十六进制)
+    像素格式与参数集目前只解析 H.264 的 avcC
+    """
+    stsd = find_box(f, trak_body, trak_end, b"mdia", b"minf", b"stbl", b"stsd")
+    if not stsd:
+        return None, None, None
+    # full box header(4) + entry_count(4)，随后是第一个 sample entry
+    entries = stsd[0] + 8
+    for entry_type, entry_body, entry_end in iter_boxes(f, entries, stsd[1]):
+        codec = _CODEC_NAMES.get(entry_type, entry_type.decode("latin-1").strip())
+        if codec != "h264":
+            return codec, None, None
+        # VisualSampleEntry 固定字段共 78 字节，之后是 avcC 等子 box
+        for child_type, child_body, child_end in iter_boxes(f, entry_body + 78, entry_end):
+            if child_type == b"avcC":
+                f.seek(child_body)
+                avcc = f.read(child_end - child_body)
+                try:
+                    return codec, _avc_pix_fmt(avcc), avcc.hex()
+                except (IndexError, struct.error):
+                    return codec, None, avcc.hex()
+        return codec, None, None
+    return None, None, None
+
+def _avc_pix_fmt(avcc: bytes) -> Optional[str]:
+    profile = avcc[1]
+    if profile not in _AVC_HIGH_PROFILES:
+        # Baseline / Main / Extended 只支持 8 bit 4:2:0
+        return "yuv420p"
+    pos = 6
+    for _ in range(avcc[5] & 0x1F):
+        pos += 2 + struct.unpack(">H", avcc[pos:pos + 2])[0]
+    num_pps = avcc[pos]
+    pos += 1
+    for _ in range(num_pps):
+        pos += 2 + struct.unpack(">H", avcc[pos:pos + 2])[0]
+    if len(avcc) < pos + 2:
+        return None
+    chroma = _CHROMA_NAMES.get(avcc[pos] & 0x03)
+    bit_depth = (avcc[pos + 1] & 0x07) + 8
+    if chroma is None or bit_depth == 8:
+        return chroma
+    return f"{chroma}{bit_depth}le"
+
+# ---------------------------------------------------------------------------
+# Fallback
+# ---------------------------------------------------------------------------
+def _ffprobe(path: Path) -> MediaInfo:
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration:stream=codec_type,codec_name,pix_fmt,time_base,width,height,r_frame_rate",
+        "-of", "json",
+        str(path)
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    data = json.loads(result.stdout or "{}")
+
+    info = MediaInfo(format="ffprobe", duration=float(data.get("format", {}).get("duration") or 0.0))
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "video":
+            info.width, info.height = stream.get("width"), stream.get("height")
+            num, _, den = stream.get("r_frame_rate", "0/1").partition("/")
+            info.fps = float(num) / float(den or 1) if float(den or 1) else None
+            info.video_codec, info.pix_fmt = stream.get("codec_name"), stream.get("pix_fmt")
+            _, _, tb_den = stream.get("time_base", "").partition("/")
+            info.timescale = int(tb_den) if tb_den.isdigit() else None
+            break
+    return info
@@ -0,0 +1,216 @@
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from src.core.config import settings
+
+class Span(BaseModel):
+    span_id: str
+    parent_id: Optional[str] = None
+    name: str
+    category: str                       # node | llm | render | lint | ffmpeg | wait
+    start_ns: int                       # 相对 Tracer 启动时刻
+    end_ns: int = 0
+    thread: str = ""
+    attrs: Dict[str, Any] = Field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return max(0, self.end_ns - self.start_ns) / 1e9
+
+class SceneBreakdown(BaseModel):
+    """单个场景的关键路径: 场景内节点串行执行，墙钟时间按 (子 span 扣除后的) 自身耗时归类"""
+    scene_id: str
+    wall: float
+    breakdown: Dict[str, float]
+
+# (当前 span id, 继承给子 span 的属性 scene_id/attempt/...)
+_current: contextvars.ContextVar[Tuple[Optional[str], Dict[str, Any]]] = contextvars.ContextVar(
+    "trace_span", default=(None, {})
+)
+
+class Tracer:
+    """
+    轻量 span 记录器: 图节点、LLM 请求、Docker 渲染、Lint、ffmpeg 以及调度排队都记录为 span
+    - span 的父子关系与 scene_id / attempt 等属性通过 contextvars 传递 (asyncio 任务与 to_thread 自动继承)
+    - 导出 Chrome trace JSON (chrome://tracing / ui.perfetto.dev)，每个场景一条轨道
+    - 可选回放到 OpenTelemetry SDK 并通过 OTLP 发送给本地 collector
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._spans: List[Span] = []
+        self._epoch_ns = time.perf_counter_ns()
+        self._epoch_wall_ns = time.time_ns()
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def _now(self) -> int:
+        return time.perf_counter_ns() - self._epoch_ns
+
+    @contextmanager
+    def span(self, name: str, category: str, **attrs: Any) -> Iterator[Optional[Span]]:
+        """记录一个 span；attrs 中的 scene_id / attempt 等会被子 span 继承"""
+        if not settings.TRACING_ENABLED:
+            yield None
+            return
+
+        parent_id, inherited = _current.get()
+        merged = {**inherited, **{k: v for k, v in attrs.items() if v is not None}}
+        span = Span(
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent_id,
+            name=name,
+            category=category,
+            start_ns=self._now(),
+            thread=threading.current_thread().name,
+            attrs=merged
+        )
+        token = _current.set((span.span_id, merged))
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            span.end_ns = self._now()
+            with self._lock:
+                self._spans.append(span)
+
+    def record(self, name: str, category: str, start_ns: int, end_ns: int, **attrs: Any):
+        """记录已结束的区间 (例如调度排队)，start/end 为 time.perf_counter_ns()"""
+        if not settings.TRACING_ENABLED:
+            return
+        parent_id, inherited = _current.get()
+        with self._lock:
+            self._spans.append(Span(
+                span_id=uuid.uuid4().hex[:16],
+                parent_id=parent_id,
+                name=name,
+                category=category,
+                start_ns=start_ns - self._epoch_ns,
+                end_ns=end_ns - self._epoch_ns,
+                thread=threading.current_thread().name,
+                attrs={**inherited, **attrs}
+            ))
+
+    # --- 导出 ---
+    def export_chrome(self, path: Path) -> Path:
+        spans = self.spans
+        tracks: Dict[str, int] = {}
+        events: List[dict] = []
+        for span in sorted(spans, key=lambda s: s.start_ns):
+            track = str(span.attrs.get("scene_id") or f"pipeline/{span.thread}")
+            if track not in tracks:
+                tracks[track] = len(tracks) + 1
+                events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tracks[track], "args": {"name": track}})
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": max(0, span.end_ns - span.start_ns) / 1000,
+                "pid": 1,
+                "tid": tracks[track],
+                "args": {k: str(v) for k, v in span.attrs.items()}
+            })
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+        return path
+
+    def export_otlp(self, endpoint: str) -> bool:
+        """回放到 OpenTelemetry SDK 并通过 OTLP/HTTP 导出；未安装 opentelemetry 时返回 False"""
+        try:
+            from opentelemetry import trace
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            return False
+
+        provider = TracerProvider(resource=Resource.create({"service.name": "markdown-to-video"}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+        otel = provider.get_tracer("src.utils.tracing")
+
+        # 父 span 先开始，按开始时间回放即可保证父节点已存在
+        started: Dict[str, Any] = {}
+        for span in sorted(self.spans, key=lambda s: s.start_ns):
+            parent = started.get(span.parent_id)
+            context = trace.set_span_in_context(parent) if parent else None
+            otel_span = otel.start_span(
+                span.name,
+                context=context,
+                start_time=self._epoch_wall_ns + span.start_ns,
+                attributes={"category": span.category, **{k: str(v) for k, v in span.attrs.items()}}
+            )
+            started[span.span_id] = otel_span
+        for span in self.spans:
+            started[span.span_id].end(end_time=self._epoch_wall_ns + span.end_ns)
+        provider.shutdown()
+        return True
+
+    # --- 关键路径分析 ---
+    def critical_path(self) -> List[SceneBreakdown]:
+        """
+        每个场景: 节点 span 串行构成关键路径，墙钟时间 = 第一个节点开始到最后一个节点结束。
+        每个 span 的自身耗时 (扣除子 span) 按类别归类: wait.* (调度排队)、llm、render、lint、ffmpeg，
+        节点自身耗时记为 node:<节点名> (例如 reconcile 中等待 TTS)。
+        在节点结束后仍在运行的后台 span (例如 TTS 合成任务) 不在关键路径上，不计入
+        """
+        spans = self.spans
+        children: Dict[str, List[Span]] = {}
+        for span in spans:
+            if span.parent_id:
+                children.setdefault(span.parent_id, []).append(span)
+
+        result = []
+        scene_ids = dict.fromkeys(s.attrs["scene_id"] for s in spans if s.category == "node" and s.attrs.get("scene_id"))
+        for scene_id in scene_ids:
+            nodes = [s for s in spans if s.category == "node" and s.attrs.get("scene_id") == scene_id]
+            breakdown: Dict[str, float] = {}
+
+            def visit(span: Span, limit_ns: int):
+                kids = [c for c in children.get(span.span_id, []) if c.end_ns <= limit_ns]
+                own = span.duration - sum(c.duration for c in kids)
+                label = f"node:{span.attrs.get('node', span.name)}" if span.category == "node" else (
+                    span.name if span.category == "wait" else span.category
+                )
+                breakdown[label] = breakdown.get(label, 0.0) + max(0.0, own)
+                for c in kids:
+                    visit(c, limit_ns)
+
+            for node in nodes:
+                visit(node, node.end_ns)
+            wall = (max(n.end_ns for n in nodes) - min(n.start_ns for n in nodes)) / 1e9
+            result.append(SceneBreakdown(
+                scene_id=scene_id,
+                wall=wall,
+                breakdown=dict(sorted(breakdown.items(), key=lambda kv: -kv[1]))
+            ))
+        return sorted(result, key=lambda b: -b.wall)
+
+    def summary_lines(self, top: int = 5) -> List[str]:
+        """最慢的场景在前 (它决定了成片何时可以组装完成)"""
+        lines = []
+        for i, scene in enumerate(self.critical_path()):
+            parts = ", ".join(f"{k} {v:.1f}s" for k, v in list(scene.breakdown.items())[:top])
+            marker = "🔥" if i == 0 else "  "
+            lines.append(f"{marker} {scene.scene_id}: {scene.wall:.1f}s — {parts}")
+        return lines
+
+tracer = Tracer()
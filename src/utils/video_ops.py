@@ -0,0 +1,121 @@
+# src/utils/video_ops.py
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from src.utils.encoding import Rendition
+
+class TimelineClip(BaseModel):
+    """成片时间线上的一个场景"""
+    video_path: str
+    audio_path: Optional[str] = None
+    video_duration: float               # 画面原始时长 (秒)
+    duration: float                     # 片段最终时长: 有音频时等于音频时长，否则等于画面时长
+
+def _fmt(value: float) -> str:
+    return f"{value:.3f}".rstrip("0").rstrip(".") or "0"
+
+def build_filtergraph(
+    clips: List[TimelineClip],
+    width: int,
+    height: int,
+    fps: float,
+    spacer: float = 1.0,
+    transition: Optional[str] = None,
+    transition_duration: float = 0.5
+) -> Tuple[List[str], str]:
+    """
+    构建单次编码的 ffmpeg filter_complex，返回 (输入参数, 滤镜图)，输出标签为 [outv] [outa]
+    - 每个场景: 统一分辨率/帧率，tpad 克隆最后一帧补齐到音频时长，音频 apad 后截断到同一时长
+    - 无音频的场景使用 anullsrc 静音
+    - 场景之间: transition 为空时插入 color/anullsrc 生成的黑屏间隔，否则使用 xfade/acrossfade 过渡
+    """
+    if not clips:
+        raise ValueError("No clips to assemble.")
+
+    inputs: List[str] = []
+    chains: List[str] = []
+    labels: List[Tuple[str, str]] = []
+    rate = _fmt(fps)
+
+    for i, clip in enumerate(clips):
+        v_in = len(inputs) // 2
+        inputs.extend(["-i", clip.video_path])
+        pad = max(0.0, clip.duration - clip.video_duration) + 1.0 / fps
+        chains.append(
+            f"[{v_in}:v]fps={rate},"
+            f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,format=yuv420p,"
+            f"tpad=stop_mode=clone:stop_duration={_fmt(pad)},"
+            f"trim=duration={_fmt(clip.duration)},setpts=PTS-STARTPTS,settb=AVTB[v{i}]"
+        )
+        if clip.audio_path:
+            a_in = len(inputs) // 2
+            inputs.extend(["-i", clip.audio_path])
+            chains.append(
+                f"[{a_in}:a]aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo,"
+                f"apad,atrim=duration={_fmt(clip.duration)},asetpts=PTS-STARTPTS[a{i}]"
+            )
+        else:
+            chains.append(
+                f"anullsrc=r=44100:cl=stereo,aformat=sample_fmts=fltp,"
+                f"atrim=duration={_fmt(clip.duration)}[a{i}]"
+            )
+        labels.append((f"v{i}", f"a{i}"))
+
+    if transition and len(clips) > 1:
+        # 过渡不能超过最短片段的一半，否则 xfade 的 offset 会变成负数
+        t = min(transition_duration, min(c.duration for c in clips) / 2)
+        v_prev, a_prev = labels[0]
+        offset = 0.0
+        for k in range(1, len(labels)):
+            offset += clips[k - 1].duration - t
+            v_out = "outv" if k == len(labels) - 1 else f"vx{k}"
+            a_out = "outa" if k == len(labels) - 1 else f"ax{k}"
+            chains.append(
+                f"[{v_prev}][{labels[k][0]}]xfade=transition={transition}:"
+                f"duration={_fmt(t)}:offset={_fmt(offset)}[{v_out}]"
+            )
+            chains.append(f"[{a_prev}][{labels[k][1]}]acrossfade=d={_fmt(t)}[{a_out}]")
+            v_prev, a_prev = v_out, a_out
+        return inputs, ";".join(chains)
+
+    sequence: List[str] = []
+    for i, (v, a) in enumerate(labels):
+        sequence.append(f"[{v}][{a}]")
+        if spacer > 0 and i < len(labels) - 1:
+            chains.append(
+                f"color=c=black:s={width}x{height}:r={rate}:d={_fmt(spacer)},"
+                f"format=yuv420p,setsar=1,settb=AVTB[sv{i}]"
+            )
+            chains.append(
+                f"anullsrc=r=44100:cl=stereo,aformat=sample_fmts=fltp,"
+                f"atrim=duration={_fmt(spacer)}[sa{i}]"
+            )
+            sequence.append(f"[sv{i}][sa{i}]")
+    chains.append(f"{''.join(sequence)}concat=n={len(sequence)}:v=1:a=1[outv][outa]")
+    return inputs, ";".join(chains)
+
+def build_ladder_filtergraph(renditions: List[Rendition]) -> Tuple[str, List[str]]:
+    """
+    构建输出阶梯的 filter_complex: 源画面解码一次后 split 给每一档分别缩放，返回 (滤镜图, 各档输出标签)
+    - video: 按高度等比缩放 (宽度取偶数，满足 yuv420p)
+    - gif: 截取开头片段，降帧率后用 palettegen/paletteuse 生成调色板，避免色带
+    """
+    if not renditions:
+        raise ValueError("No renditions requested.")
+
+    chains = ["[0:v]split=" + str(len(renditions)) + "".join(f"[s{i}]" for i in range(len(renditions)))]
+    labels: List[str] = []
+    for i, r in enumerate(renditions):
+        if r.kind == "gif":
+            chains.append(
+                f"[s{i}]trim=duration={_fmt(r.gif_seconds)},setpts=PTS-STARTPTS,"
+                f"fps={_fmt(r.gif_fps)},scale=-2:{r.height}:flags=lanczos,split[g{i}a][g{i}b]"
+            )
+            chains.append(f"[g{i}a]palettegen=stats_mode=diff[p{i}]")
+            chains.append(f"[g{i}b][p{i}]paletteuse=dither=bayer[r{i}]")
+        else:
+            chains.append(f"[s{i}]scale=-2:{r.height}:flags=lanczos,setsar=1,format=yuv420p[r{i}]")
+        labels.append(f"r{i}")
+    return ";".join(chains), labels
@@ -0,0 +1,88 @@
+import os
+import time
+
+from src.components.audio_store import AudioStore
+
+def _staged(store, key, payload: bytes):
+    path = store.staging_path(key, "mp3")
+    path.write_bytes(payload)
+    return path
+
+def test_key_depends_on_every_parameter():
+    base = AudioStore.key_for("你好", "Cherry", "qwen3-tts-flash", "Chinese", "mp3")
+    assert base == AudioStore.key_for("你好", "Cherry", "qwen3-tts-flash", "Chinese", "mp3")
+    assert base != AudioStore.key_for("你好!", "Cherry", "qwen3-tts-flash", "Chinese", "mp3")
+    assert base != AudioStore.key_for("你好", "Ethan", "qwen3-tts-flash", "Chinese", "mp3")
+    assert base != AudioStore.key_for("你好", "Cherry", "qwen3-tts-flash", "Chinese", "m4a")
+
+def test_put_get_and_link(tmp_path):
+    store = AudioStore(root=tmp_path / "cache", max_bytes=0)
+    key = store.key_for("line", "v", "m", "Chinese", "mp3")
+
+    assert store.get(key) is None
+    entry = store.put(key, _staged(store, key, b"audio"), duration=1.25, text="line")
+
+    hit = store.get(key)
+    assert hit.duration == 1.25
+    assert hit.last_access >= entry.last_access
+
+    dest = store.link(hit, tmp_path / "run" / "audio" / "s1.mp3")
+    assert dest.read_bytes() == b"audio"
+
+    # 重新链接到已存在的目标会原子替换
+    other_key = store.key_for("other", "v", "m", "Chinese", "mp3")
+    other = store.put(other_key, _staged(store, other_key, b"other"), duration=2.0)
+    store.link(other, dest)
+    assert dest.read_bytes() == b"other"
+
+def test_lru_eviction_keeps_recent_entries(tmp_path):
+    store = AudioStore(root=tmp_path / "cache", max_bytes=10)
+    keys = [store.key_for(f"line{i}", "v", "m", "Chinese", "mp3") for i in range(3)]
+
+    e0 = store.put(keys[0], _staged(store, keys[0], b"x" * 4), duration=1.0)
+    dest = store.link(e0, tmp_path / "run" / "s0.mp3")
+    store.put(keys[1], _staged(store, keys[1], b"y" * 4), duration=1.0)
+    time.sleep(0.01)
+    store.get(keys[0])  # 刷新 keys[0]，keys[1] 成为最久未使用
+    time.sleep(0.01)
+    store.put(keys[2], _staged(store, keys[2], b"z" * 4), duration=1.0)
+
+    assert store.get(keys[1]) is None
+    assert store.get(keys[0]) is not None
+    assert store.get(keys[2]) is not None
+    # 运行目录中的链接不受淘汰影响
+    assert dest.read_bytes() == b"xxxx"
+    assert os.path.exists(dest)
+
+def test_zero_duration_is_reprobed_not_served(tmp_path, monkeypatch):
+    store = AudioStore(root=tmp_path / "cache", max_bytes=0)
+    key = store.key_for("line", "v", "m", "Chinese", "mp3")
+    # 写入时时长读取失败
+    store.put(key, _staged(store, key, b"audio"), duration=0.0)
+
+    def broken(path):
+        raise ValueError("unreadable")
+
+    monkeypatch.setattr("src.components.audio_store.media_info.probe_duration", broken)
+    assert store.get(key) is None
+
+    monkeypatch.setattr("src.components.audio_store.media_info.probe_duration", lambda path: 2.5)
+    assert store.get(key).duration == 2.5
+    # 修复后的时长写回元数据，之后不再解析
+    monkeypatch.setattr("src.components.audio_store.media_info.probe_duration", broken)
+    assert store.get(key).duration == 2.5
+
+def test_put_below_limit_does_not_rescan_metadata(tmp_path, monkeypatch):
+    store = AudioStore(root=tmp_path / "cache", max_bytes=100)
+    scans = []
+    original = store.entries
+    monkeypatch.setattr(store, "entries", lambda: scans.append(1) or original())
+
+    keys = [store.key_for(f"line{i}", "v", "m", "Chinese", "mp3") for i in range(5)]
+    for key in keys[:4]:
+        store.put(key, _staged(store, key, b"x" * 20), duration=1.0)
+    assert len(scans) == 1
+    # 超过上限时才扫描并淘汰
+    store.put(keys[4], _staged(store, keys[4], b"x" * 30), duration=1.0)
+    assert store._total_bytes <= 100
+    assert store.get(keys[0]) is None and store.get(keys[4]) is not None
@@ -0,0 +1,98 @@
+import asyncio
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src import batch
+from src.core.config import settings
+from src.core.models import RenderArtifact, SceneSpec
+
+def _storyboard(path: Path, *scene_ids: str) -> str:
+    scenes = [{"scene_id": sid, "description": "d", "duration": 2.0, "audio_script": "x"} for sid in scene_ids]
+    path.write_text(json.dumps({"scenes": scenes}), encoding="utf-8")
+    return str(path)
+
+@pytest.fixture
+def output(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path / "output")
+    monkeypatch.setattr(settings, "CHECKPOINT_ENABLED", False)
+    return tmp_path / "output"
+
+def test_job_ids_are_unique_per_file_name():
+    assert batch.job_ids(["a/intro.json", "b/intro.json", "c/outro.md"]) == ["intro", "intro_2", "outro"]
+
+def test_batch_shares_services_and_isolates_output_dirs(tmp_path, output, monkeypatch):
+    (tmp_path / "a").mkdir()
+    scripts = [
+        _storyboard(tmp_path / "a" / "intro.json", "s1", "s2"),
+        _storyboard(tmp_path / "intro.json", "s1"),
+        _storyboard(tmp_path / "broken.json", "s1"),
+    ]
+    calls = []
+    running = {"now": 0, "max": 0}
+
+    async def fake_run(scenes, run_id, **kwargs):
+        calls.append((run_id, kwargs))
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        if kwargs["job_id"] == "broken":
+            raise RuntimeError("render farm on fire")
+        return str(kwargs["output_dir"] / "full_movie.mp4")
+
+    monkeypatch.setattr(batch, "run_storyboard", fake_run)
+    with patch("src.core.graph.ManimRunner"):
+        manifest = asyncio.run(batch.run_batch(batch.new_manifest(scripts, "b1"), max_jobs=2))
+
+    assert running["max"] == 2
+    by_job = {kwargs["job_id"]: kwargs for _, kwargs in calls}
+    assert set(by_job) == {"intro", "intro_2", "broken"}
+    # 所有任务共用同一组组件与场景缓存，运行目录各自独立
+    assert len({id(k["services"]) for k in by_job.values()}) == 1
+    assert len({id(k["scene_cache"]) for k in by_job.values()}) == 1
+    assert by_job["intro_2"]["output_dir"] == output / "jobs" / "intro_2"
+
+    status = {j.job_id: j.status for j in manifest.jobs}
+    assert status == {"intro": "done", "intro_2": "done", "broken": "failed"}
+    saved = batch.BatchManifest.model_validate_json(batch.manifest_path("b1").read_text(encoding="utf-8"))
+    assert saved.jobs[2].error == "render farm on fire"
+    assert saved.jobs[0].movie_path.endswith("jobs/intro/full_movie.mp4") and saved.jobs[0].scenes == 2
+
+def test_resume_skips_finished_jobs(tmp_path, output, monkeypatch):
+    scripts = [_storyboard(tmp_path / "a.json", "s1"), _storyboard(tmp_path / "b.json", "s1")]
+    manifest = batch.new_manifest(scripts, "b2")
+    manifest.jobs[0].status = "done"
+    seen = []
+
+    async def fake_run(scenes, run_id, **kwargs):
+        seen.append(kwargs["job_id"])
+        return "movie.mp4"
+
+    monkeypatch.setattr(batch, "run_storyboard", fake_run)
+    with patch("src.core.graph.ManimRunner"):
+        asyncio.run(batch.run_batch(manifest, resume=True))
+    assert seen == ["b"]
+
+def test_job_graph_writes_to_its_own_output_dir(tmp_path, output):
+    with patch("src.core.graph.ManimRunner") as runner:
+        from src.core.graph import ManimGraph, SharedServices
+        services = SharedServices()
+        a = ManimGraph(job_id="a", output_dir=tmp_path / "jobs" / "a", services=services)
+        b = ManimGraph(job_id="b", output_dir=tmp_path / "jobs" / "b", services=services)
+
+    assert runner.call_args_list[0].kwargs["output_dir"] == tmp_path / "jobs" / "a"
+    assert a.coder_llm is b.coder_llm and a.critic is b.critic
+    # TTS 共享音频缓存与进行中的合成，旁白链接到各自的运行目录
+    assert a.tts.store is b.tts.store and a.tts._inflight is b.tts._inflight
+    assert a.tts.output_dir == tmp_path / "jobs" / "a" / "audio"
+    assert a.label("s1") == "a/s1"
+
+    scene = SceneSpec(scene_id="s1", description="d", duration=1.0, audio_script="x")
+    art = RenderArtifact(scene_id="s1", video_path="v.mp4", last_frame_path="f.png", code_content="")
+    asyncio.run(a.node_finalize({"scene_spec": scene, "artifact": art}))
+    from src.utils.logger import metrics
+    assert "a/s1" in metrics.scene_metrics
+    metrics.reset()
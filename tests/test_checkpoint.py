@@ -0,0 +1,92 @@
+import asyncio
+import operator
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+
+from src.core.checkpoint import SqliteCheckpointer, new_run_id
+from src.core.models import SentenceTiming
+
+class _SceneState(TypedDict):
+    item: SentenceTiming
+    step: int
+    out: Annotated[List[SentenceTiming], operator.add]
+
+class _RunState(TypedDict):
+    items: List[SentenceTiming]
+    out: Annotated[List[SentenceTiming], operator.add]
+
+def _build(calls, crash):
+    """与 ParallelManimFlow 相同的结构: Send 扇出到三节点子图"""
+    def node(name):
+        async def run(state):
+            index = int(state["item"].start)
+            calls.append((name, index))
+            if name == "render" and index in crash:
+                raise RuntimeError("killed")
+            if name == "finalize":
+                return {"out": [state["item"]]}
+            return {"step": state["step"] + 1}
+        return run
+
+    sub = StateGraph(_SceneState)
+    for name in ("plan", "render", "finalize"):
+        sub.add_node(name, node(name))
+    sub.add_edge(START, "plan")
+    sub.add_edge("plan", "render")
+    sub.add_edge("render", "finalize")
+    sub.add_edge("finalize", END)
+
+    graph = StateGraph(_RunState)
+    graph.add_node("process_scene", sub.compile())
+    graph.add_conditional_edges(
+        START, lambda s: [Send("process_scene", {"item": i, "step": 0, "out": []}) for i in s["items"]]
+    )
+    graph.add_edge("process_scene", END)
+    return graph
+
+def test_resume_after_crash_from_new_process(tmp_path):
+    db = tmp_path / "checkpoints.sqlite"
+    run_id = new_run_id()
+    config = {"configurable": {"thread_id": run_id}}
+    items = [SentenceTiming(text=str(i), start=i, end=i) for i in range(3)]
+
+    calls = []
+    app = _build(calls, crash={1}).compile(checkpointer=SqliteCheckpointer(db))
+    with pytest.raises(RuntimeError):
+        asyncio.run(app.ainvoke({"items": items, "out": []}, config))
+    assert ("plan", 1) in calls
+
+    # 新的 checkpointer 实例 (模拟重启进程) 只能从数据库读到状态
+    calls.clear()
+    saver = SqliteCheckpointer(db)
+    assert saver.latest_run() == run_id
+    assert [t.text for t in saver.run_value(run_id, "items")] == ["0", "1", "2"]
+    # 已结束的场景还没合并到父图状态，只在中断那一步的 pending writes 中
+    assert saver.run_value(run_id, "out") == []
+    assert sorted(t.text for out in saver.run_writes(run_id, "out") for t in out) == ["0", "2"]
+
+    app = _build(calls, crash=set()).compile(checkpointer=saver)
+    result = asyncio.run(app.ainvoke(None, config))
+
+    assert sorted(int(t.start) for t in result["out"]) == [0, 1, 2]
+    # 中断的场景从最后完成的节点之后继续，不再重新规划
+    assert ("plan", 1) not in calls
+    assert ("render", 1) in calls
+    # 其他场景也不会从头开始
+    assert ("plan", 0) not in calls and ("plan", 2) not in calls
+
+def test_delete_thread_removes_persisted_rows(tmp_path):
+    db = tmp_path / "checkpoints.sqlite"
+    config = {"configurable": {"thread_id": "run_a"}}
+    app = _build([], crash=set()).compile(checkpointer=SqliteCheckpointer(db))
+    asyncio.run(app.ainvoke({"items": [SentenceTiming(text="0", start=0, end=0)], "out": []}, config))
+
+    saver = SqliteCheckpointer(db)
+    assert saver.latest_run() == "run_a"
+    saver.delete_thread("run_a")
+    saver.close()
+
+    assert SqliteCheckpointer(db).latest_run() is None
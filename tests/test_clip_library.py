@@ -0,0 +1,41 @@
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from src.components.clip_library import ClipLibrary, ClipSpec
+
+def _fake_ffmpeg(calls):
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        Path(cmd[-1]).write_bytes(b"clip")
+        return MagicMock()
+    return run
+
+def test_clips_are_keyed_by_encoding_parameters(tmp_path):
+    library = ClipLibrary(tmp_path)
+    calls = []
+    base = ClipSpec(width=1920, height=1080, fps=30, timescale=15360)
+
+    with patch("src.components.clip_library.subprocess.run", side_effect=_fake_ffmpeg(calls)):
+        first = library.get(base)
+        again = ClipLibrary(tmp_path).get(base)  # 跨运行复用
+        other_resolution = library.get(base.model_copy(update={"width": 1280, "height": 720}))
+        other_fps = library.get(base.model_copy(update={"fps": 60}))
+        other_duration = library.get(base.model_copy(update={"duration": 0.5}))
+
+    assert first == again
+    assert len({first, other_resolution, other_fps, other_duration}) == 4
+    assert len(calls) == 4
+    assert not list(tmp_path.glob(".*"))
+
+def test_clip_command_matches_segment_encoding(tmp_path):
+    calls = []
+    spec = ClipSpec(width=854, height=480, fps=15, timescale=15360, duration=1.0, color="white")
+    with patch("src.components.clip_library.subprocess.run", side_effect=_fake_ffmpeg(calls)):
+        path = ClipLibrary(tmp_path).get(spec)
+
+    cmd = calls[0]
+    assert "color=c=white:s=854x480:r=15:d=1" in cmd
+    assert cmd[cmd.index("-pix_fmt") + 1] == "yuv420p"
+    assert cmd[cmd.index("-video_track_timescale") + 1] == "15360"
+    assert cmd[cmd.index("-c:a") + 1] == "aac" and "44100" in cmd
+    assert path.name.startswith("white_854x480_15fps_1s_")
@@ -1,7 +1,11 @@
+import json
 import unittest
 import tempfile
 import shutil
-from unittest.mock import patch
+import subprocess
+import threading
+import time
+from unittest.mock import MagicMock, patch
 from pathlib import Path
 import sys
 
@@ -10,6 +14,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from src.components.assembler import Assembler
 from src.core.models import RenderArtifact
+from src.utils.media_info import MediaInfo
 
 class TestAssembler(unittest.TestCase):
     def setUp(self):
@@ -17,6 +22,12 @@ class TestAssembler(unittest.TestCase):
         self.patcher_settings = patch('src.components.assembler.settings')
         self.mock_settings = self.patcher_settings.start()
         self.mock_settings.OUTPUT_DIR = Path(self.test_dir)
+        self.mock_settings.ASSEMBLER_WORKERS = 0
+        self.mock_settings.ASSEMBLER_FFMPEG_THREADS = 2
+        self.mock_settings.ASSEMBLY_ENGINE = "segments"
+        self.mock_settings.ASSEMBLY_STREAM_COPY = True
+        self.mock_settings.ASSEMBLY_INCREMENTAL = True
+        self.mock_settings.PROGRESSIVE_OUTPUT = False
         
         self.assembler = Assembler()
 
@@ -24,9 +35,16 @@ class TestAssembler(unittest.TestCase):
         self.patcher_settings.stop()
         shutil.rmtree(self.test_dir)
 
+    @staticmethod
+    def _fake_ffmpeg(cmd, **kwargs):
+        # 模拟 ffmpeg 写出输出文件
+        if cmd[0] == "ffmpeg":
+            Path(cmd[-1]).write_bytes(b"media")
+        return MagicMock()
+
     @patch('src.components.assembler.subprocess.run')
-    @patch('src.components.assembler.subprocess.check_output')
-    def test_assemble_with_spacer(self, mock_check_output, mock_run):
+    @patch('src.components.assembler.media_info.probe_resolution')
+    def test_assemble_with_spacer(self, mock_probe_resolution, mock_run):
         # Setup real files
         p_v1 = Path(self.test_dir) / "v1.mp4"
         p_v1.touch()
@@ -38,7 +56,8 @@ class TestAssembler(unittest.TestCase):
         p_a2.write_bytes(b'0' * 200)
 
         # Mocks
-        mock_check_output.return_value = "1920x1080\n"
+        mock_probe_resolution.return_value = "1920x1080"
+        mock_run.side_effect = self._fake_ffmpeg
         
         # Inputs
         artifacts = [
@@ -51,7 +70,7 @@ class TestAssembler(unittest.TestCase):
         self.assembler.assemble(artifacts, audio_paths)
         
         # Check resolution call
-        self.assertTrue(mock_check_output.called)
+        self.assertTrue(mock_probe_resolution.called)
         
         # Check spacer generation
         spacer_gen_called = False
@@ -67,9 +86,299 @@ class TestAssembler(unittest.TestCase):
         self.assertTrue(concat_file.exists())
         content = concat_file.read_text()
         
-        self.assertIn("black_spacer.mp4", content)
+        # 间隔片段来自按编码参数寻址的片段库
+        self.assertIn("cache/clips/black_1920x1080_30fps_1s_", content)
         self.assertIn("segment_000.mp4", content)
         self.assertIn("segment_001.mp4", content)
 
+    @patch('src.components.assembler.subprocess.run')
+    @patch('src.components.assembler.media_info.probe_resolution')
+    def test_mux_uses_audio_directly_without_temp_wav(self, mock_probe_resolution, mock_run):
+        mock_probe_resolution.return_value = "1920x1080"
+        p_v1 = Path(self.test_dir) / "v1.mp4"
+        p_v1.touch()
+        p_v2 = Path(self.test_dir) / "v2.mp4"
+        p_v2.touch()
+        p_a1 = Path(self.test_dir) / "a1.m4a"  # 标准 AAC 音轨
+        p_a1.write_bytes(b'0' * 200)
+        p_a2 = Path(self.test_dir) / "a2.mp3"
+        p_a2.write_bytes(b'0' * 200)
+
+        artifacts = [
+            RenderArtifact(scene_id="s1", video_path=str(p_v1), last_frame_path="i1.png", code_content=""),
+            RenderArtifact(scene_id="s2", video_path=str(p_v2), last_frame_path="i2.png", code_content="")
+        ]
+        self.assembler.assemble(artifacts, [str(p_a1), str(p_a2)])
+
+        cmds = [call_args[0][0] for call_args in mock_run.call_args_list]
+        self.assertFalse(any("pcm_s16le" in cmd for cmd in cmds))
+        mux_cmds = [cmd for cmd in cmds if "segment_" in cmd[-1]]
+        # 每个片段只有一次 ffmpeg 调用
+        self.assertEqual(len(mux_cmds), 2)
+        self.assertIn(str(p_a1), mux_cmds[0])
+        self.assertEqual(mux_cmds[0][mux_cmds[0].index("-c:a") + 1], "copy")
+        self.assertIn(str(p_a2), mux_cmds[1])
+        self.assertEqual(mux_cmds[1][mux_cmds[1].index("-c:a") + 1], "aac")
+
+    @patch('src.components.assembler.subprocess.run')
+    @patch('src.components.assembler.media_info.probe_resolution')
+    def test_parallel_mux_keeps_order_and_collects_errors(self, mock_probe_resolution, mock_run):
+        mock_probe_resolution.return_value = "1920x1080"
+        self.mock_settings.ASSEMBLER_WORKERS = 4
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def run(cmd, **kwargs):
+            out = cmd[-1]
+            if "segment_" in out:
+                index = int(out[-7:-4])
+                with lock:
+                    state["active"] += 1
+                    state["peak"] = max(state["peak"], state["active"])
+                # 靠前的片段更慢，完成顺序与提交顺序相反
+                time.sleep(0.02 * (5 - index))
+                with lock:
+                    state["active"] -= 1
+                if index == 2:
+                    raise subprocess.CalledProcessError(1, cmd, stderr=b"bad clip")
+                self.assertEqual(cmd[cmd.index("-threads") + 1], "2")
+            return MagicMock()
+
+        mock_run.side_effect = run
+        artifacts = []
+        for i in range(5):
+            p = Path(self.test_dir) / f"v{i}.mp4"
+            p.touch()
+            artifacts.append(RenderArtifact(scene_id=f"s{i}", video_path=str(p), last_frame_path="x.png", code_content=""))
+
+        self.assembler.assemble(artifacts, [None] * 5)
+
+        self.assertGreater(state["peak"], 1)
+        self.assertEqual(self.assembler.segment_errors, {2: "bad clip"})
+        lines = [l for l in (Path(self.test_dir) / "concat_list.txt").read_text().splitlines() if "segment_" in l]
+        self.assertEqual([l[-8:-5] for l in lines], ["000", "001", "003", "004"])
+
+    @patch('src.components.assembler.subprocess.run')
+    @patch('src.components.assembler.media_info.probe_resolution')
+    def test_worker_exception_only_drops_its_segment(self, mock_probe_resolution, mock_run):
+        mock_probe_resolution.return_value = "1920x1080"
+        mock_run.side_effect = self._fake_ffmpeg
+        artifacts = []
+        for i in range(3):
+            p = Path(self.test_dir) / f"v{i}.mp4"
+            p.write_bytes(f"video {i}".encode())
+            artifacts.append(RenderArtifact(scene_id=f"s{i}", video_path=str(p), last_frame_path="x.png", code_content=""))
+
+        from src.components import assembler as assembler_module
+        real_digest = assembler_module.file_digest
+
+        def file_digest(path, *args, **kwargs):
+            if Path(path).name == "v1.mp4":
+                raise PermissionError("v1.mp4: permission denied")
+            return real_digest(path, *args, **kwargs)
+
+        with patch('src.components.assembler.file_digest', side_effect=file_digest):
+            self.assembler.assemble(artifacts, [None] * 3)
+
+        self.assertEqual(self.assembler.segment_errors, {1: "v1.mp4: permission denied"})
+        lines = [l for l in (Path(self.test_dir) / "concat_list.txt").read_text().splitlines() if "segment_" in l]
+        self.assertEqual([l[-8:-5] for l in lines], ["000", "002"])
+
+    def _filtergraph_settings(self):
+        self.mock_settings.ASSEMBLY_ENGINE = "filtergraph"
+        self.mock_settings.ASSEMBLY_SPACER_SECONDS = 1.0
+        self.mock_settings.ASSEMBLY_TRANSITION = "none"
+        self.mock_settings.ASSEMBLY_TRANSITION_SECONDS = 0.5
+
+    def _two_clips(self):
+        artifacts, audio_paths = [], []
+        for i in range(2):
+            v = Path(self.test_dir) / f"v{i}.mp4"
+            v.touch()
+            a = Path(self.test_dir) / f"a{i}.m4a"
+            a.write_bytes(b'0' * 200)
+            artifacts.append(RenderArtifact(scene_id=f"s{i}", video_path=str(v), last_frame_path="x.png", code_content=""))
+            audio_paths.append(str(a))
+        return artifacts, audio_paths
+
+    @patch('src.components.assembler.subprocess.run')
+    @patch('src.components.assembler.media_info.probe_duration')
+    @patch('src.components.assembler.media_info.probe')
+    def test_filtergraph_engine_encodes_once(self, mock_probe, mock_probe_duration, mock_run):
+        self._filtergraph_settings()
+        mock_probe.return_value = MediaInfo(format="mp4", duration=3.0, width=1280, height=720, fps=30.0)
+        mock_probe_duration.return_value = 4.0
+        artifacts, audio_paths = self._two_clips()
+
+        output = self.assembler.assemble(artifacts, audio_paths, output_filename="full_movie.mp4")
+
+        self.assertEqual(mock_run.call_count, 1)
+        cmd = mock_run.call_args[0][0]
+        self.assertEqual(cmd[-1], output)
+        self.assertEqual(cmd.count("-i"), 4)
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        self.assertIn("color=c=black:s=1280x720", graph)
+        self.assertFalse((Path(self.test_dir) / "concat_list.txt").exists())
+
+    @patch('src.components.assembler.subprocess.run')
+    @patch('src.components.assembler.media_info.probe_resolution')
+    @patch('src.components.assembler.media_info.probe_duration')
+    @patch('src.components.assembler.media_info.probe')
+    def test_filtergraph_failure_falls_back_to_segments(self, mock_probe, mock_probe_duration, mock_probe_resolution, mock_run):
+        self._filtergraph_settings()
+        mock_probe.return_value = MediaInfo(format="mp4", duration=3.0, width=1280, height=720, fps=30.0)
+        mock_probe_duration.return_value = 4.0
+        mock_probe_resolution.return_value = "1280x720"
+
+        def run(cmd, **kwargs):
+            if "-filter_complex" in cmd:
+                raise subprocess.CalledProcessError(1, cmd, stderr=b"No such filter: 'xfade'")
+            return MagicMock()
+
+        mock_run.side_effect = run
+        artifacts, audio_paths = self._two_clips()
+        self.assembler.assemble(artifacts, audio_paths)
+
+        self.assertTrue((Path(self.test_dir) / "concat_list.txt").exists())
+
+    @patch('src.components.assembler.subprocess.run')
+    @patch('src.components.assembler.media_info.probe_resolution')
+    @patch('src.components.assembler.media_info.probe_duration')
+    @patch('src.components.assembler.media_info.probe')
+    def test_stream_copy_fast_path(self, mock_probe, mock_probe_duration, mock_probe_resolution, mock_run):
+        mock_probe_resolution.return_value = "1920x1080"
+        mock_run.side_effect = self._fake_ffmpeg
+        conforming = MediaInfo(format="mp4", duration=3.0, width=1920, height=1080, fps=60.0,
+                               video_codec="h264", pix_fmt="yuv420p", timescale=15360, avcc="0164002affe1")
+        other = conforming.model_copy(update={"pix_fmt": "yuv444p"})
+        clips = {}
+        for name in ("v0", "v1", "v2", "v3"):
+            p = Path(self.test_dir) / f"{name}.mp4"
+            p.touch()
+            clips[str(p)] = other if name == "v3" else conforming
+        # 间隔片段与尾帧由同一编码档位生成，参数集与原片段一致
+        mock_probe.side_effect = lambda path: clips.get(str(path), conforming)
+        # a0 比画面长 2 秒 (需要补尾帧)，a1 与画面等长，v2 无音频，v3 像素格式不一致
+        durations = {}
+        audio_paths = []
+        for name, duration in (("a0", 5.0), ("a1", 3.0), (None, None), ("a3", 5.0)):
+            if name is None:
+                audio_paths.append(None)
+                continue
+            p = Path(self.test_dir) / f"{name}.m4a"
+            p.write_bytes(b'0' * 200)
+            durations[str(p)] = duration
+            audio_paths.append(str(p))
+        mock_probe_duration.side_effect = lambda path: durations[str(path)]
+
+        artifacts = [
+            RenderArtifact(scene_id=f"s{i}", video_path=path, last_frame_path="x.png", code_content="")
+            for i, path in enumerate(clips)
+        ]
+        self.assembler.assemble(artifacts, audio_paths)
+
+        self.assertEqual(self.assembler.segment_modes, {0: "copy", 1: "copy", 2: "copy", 3: "encode"})
+        cmds = [c[0][0] for c in mock_run.call_args_list]
+        by_output = {}
+        for cmd in cmds:
+            by_output.setdefault(Path(cmd[-1]).name, []).append(cmd)
+
+        # 只有补齐的尾帧与像素格式不一致的片段会经过 libx264
+        encodes = [Path(cmd[-1]).name for cmd in cmds if "libx264" in cmd]
+        self.assertIn("segment_000.tail.mp4", encodes)
+        self.assertIn("segment_003.mp4", encodes)
+        self.assertNotIn("segment_000.mp4", encodes)
+        tail = by_output["segment_000.tail.mp4"][0]
+        self.assertIn("stop_duration=2.000", tail[tail.index("-vf") + 1])
+        self.assertEqual(tail[tail.index("-video_track_timescale") + 1], "15360")
+        joined = by_output["segment_000.mp4"][0]
+        self.assertIn("concat", joined)
+        self.assertEqual(joined[joined.index("-c:v") + 1], "copy")
+        self.assertEqual(by_output["segment_001.mp4"][0][by_output["segment_001.mp4"][0].index("-c:v") + 1], "copy")
+        self.assertIn("-an", by_output["segment_002.mp4"][0])
+        # 重新编码的片段使用相同的时间基，保证最终 concat 可直接复制
+        reencoded = by_output["segment_003.mp4"][0]
+        self.assertEqual(reencoded[reencoded.index("-video_track_timescale") + 1], "15360")
+        self.assertFalse(list(Path(self.test_dir, "segments").glob("*.tail.mp4")))
+
+    @patch('src.components.assembler.subprocess.run')
+    @patch('src.components.assembler.media_info.probe_resolution')
+    @patch('src.components.assembler.media_info.probe')
+    def test_stream_copy_requires_matching_parameter_sets(self, mock_probe, mock_probe_resolution, mock_run):
+        mock_probe_resolution.return_value = "1920x1080"
+        mock_run.side_effect = self._fake_ffmpeg
+        clip = MediaInfo(format="mp4", duration=3.0, width=1920, height=1080, fps=60.0,
+                         video_codec="h264", pix_fmt="yuv420p", timescale=15360, avcc="014d401fffe1")
+        spacer = clip.model_copy(update={"avcc": "0164002affe1"})
+        mock_probe.side_effect = lambda path: spacer if "cache" in Path(path).parts else clip
+
+        artifacts = []
+        for i in range(2):
+            p = Path(self.test_dir) / f"v{i}.mp4"
+            p.touch()
+            artifacts.append(RenderArtifact(scene_id=f"s{i}", video_path=str(p), last_frame_path="x.png", code_content=""))
+        self.assembler.assemble(artifacts, [None, None])
+
+        # 本机编码的间隔片段 SPS/PPS 与渲染片段不同，复制后拼接会花屏，只能全部重新编码
+        self.assertIsNone(self.assembler._target)
+        self.assertEqual(self.assembler.segment_modes, {0: "encode", 1: "encode"})
+        # 片段内容不同的参数集也不会被当作一致
+        self.assertFalse(self.assembler._conforms(spacer))
+
+    @patch('src.components.assembler.subprocess.run')
+    @patch('src.components.assembler.media_info.probe_resolution')
+    def test_incremental_rerun_only_rebuilds_changed_segments(self, mock_probe_resolution, mock_run):
+        mock_probe_resolution.return_value = "1920x1080"
+
+        def run(cmd, **kwargs):
+            # 模拟 ffmpeg 写出文件
+            if cmd[0] == "ffmpeg":
+                Path(cmd[-1]).write_bytes(b"segment")
+            return MagicMock()
+
+        mock_run.side_effect = run
+        artifacts, audio_paths = [], []
+        for i in range(3):
+            v = Path(self.test_dir) / f"v{i}.mp4"
+            v.write_bytes(f"video {i}".encode())
+            a = Path(self.test_dir) / f"a{i}.m4a"
+            a.write_bytes(f"audio {i}".encode() * 50)
+            artifacts.append(RenderArtifact(scene_id=f"s{i}", video_path=str(v), last_frame_path="x.png", code_content=""))
+            audio_paths.append(str(a))
+
+        def muxed_segments():
+            return sorted(
+                Path(c[0][0][-1]).name for c in mock_run.call_args_list
+                if c[0][0][0] == "ffmpeg" and Path(c[0][0][-1]).name.startswith("segment_")
+            )
+
+        self.assembler.assemble(artifacts, audio_paths)
+        self.assertEqual(muxed_segments(), ["segment_000.mp4", "segment_001.mp4", "segment_002.mp4"])
+
+        # 只修改场景 1 的画面
+        mock_run.reset_mock()
+        Path(artifacts[1].video_path).write_bytes(b"video 1 fixed")
+        self.assembler.assemble(artifacts, audio_paths)
+
+        self.assertEqual(muxed_segments(), ["segment_001.mp4"])
+        self.assertEqual(self.assembler.segment_modes[0], "cached")
+        self.assertEqual(self.assembler.segment_modes[2], "cached")
+        manifest = json.loads((Path(self.test_dir) / "segments" / "manifest.json").read_text())
+        self.assertEqual(
+            {name: entry["mode"] for name, entry in manifest["segments"].items()},
+            {"segment_000.mp4": "cached", "segment_001.mp4": "encode", "segment_002.mp4": "cached"}
+        )
+        # 拼接仍然执行，且顺序不变
+        content = (Path(self.test_dir) / "concat_list.txt").read_text()
+        self.assertLess(content.index("segment_000.mp4"), content.index("segment_001.mp4"))
+        self.assertLess(content.index("segment_001.mp4"), content.index("segment_002.mp4"))
+        self.assertTrue(any("concat" in c[0][0] and "-c" in c[0][0] for c in mock_run.call_args_list))
+
+        # 修改音频同样触发重建
+        mock_run.reset_mock()
+        Path(audio_paths[2]).write_bytes(b"new narration" * 20)
+        self.assembler.assemble(artifacts, audio_paths)
+        self.assertEqual(muxed_segments(), ["segment_002.mp4"])
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,82 +1,227 @@
+import asyncio
+import shutil
+import tempfile
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import sys
 from pathlib import Path
 
+import httpx
+from tenacity import wait_none
+
 
 # Add project root to sys.path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from src.components.tts import TTSEngine
+from src.components.tts import TTSEngine, scene_audio_path
+from src.core.config import settings
 
 class TestTTSEngine(unittest.TestCase):
     def setUp(self):
+        # 使用临时输出目录，避免测试音频进入真实的 output/ 和缓存
+        self.test_dir = tempfile.mkdtemp()
+        self.patcher_output = patch.object(settings, "OUTPUT_DIR", Path(self.test_dir))
+        self.patcher_output.start()
+        # 标准音轨转换依赖 ffmpeg，默认关闭，由专门的用例覆盖
+        self.patcher_canonical = patch.object(settings, "TTS_CANONICAL_AUDIO", False)
+        self.patcher_canonical.start()
         self.tts = TTSEngine()
 
     def tearDown(self):
-        # Clean up files created
-        for scene_id in ["test_scene_url"]:
-            p = self.tts.output_dir / f"{scene_id}.mp3"
-            if p.exists():
-                p.unlink()
-
-    @patch('src.components.tts.dashscope.MultiModalConversation.call')
-    @patch('src.components.tts.requests.get')
-    def test_generate_with_url(self, mock_get, mock_call):
-        # Ensure file doesn't exist so it doesn't skip
-        scene_id = "test_scene_url"
-        p = self.tts.output_dir / f"{scene_id}.mp3"
-        if p.exists():
-            p.unlink()
+        self.patcher_canonical.stop()
+        self.patcher_output.stop()
+        shutil.rmtree(self.test_dir)
 
+    def _mock_response(self, url="http://example.com/audio.mp3", status_code=200):
         # Mock the MultiModalConversation result
         mock_response = MagicMock()
-        mock_response.status_code = 200
-        
+        mock_response.status_code = status_code
+        mock_response.message = "error" if status_code != 200 else ""
+
         # Structure the mock to have output.audio.url
         mock_audio_info = MagicMock()
-        mock_audio_info.url = "http://example.com/audio.mp3"
-        # Make the mock support .get() just in case, though getattr is tried first or second
-        # But simpler to just rely on getattr which MagicMock supports
-        
+        mock_audio_info.url = url
         mock_output = MagicMock()
         mock_output.audio = mock_audio_info
-        
         mock_response.output = mock_output
-        mock_call.return_value = mock_response
+        return mock_response
+
+    def _mock_transport(self, content=b"fake audio content via url"):
+        requested = []
 
-        # Mock requests.get
-        mock_http_response = MagicMock()
-        mock_http_response.status_code = 200
-        mock_http_response.content = b"fake audio content via url"
-        mock_get.return_value = mock_http_response
+        def handler(request):
+            requested.append(str(request.url))
+            return httpx.Response(200, content=content)
+
+        self.tts._transport = httpx.MockTransport(handler)
+        return requested
+
+    @patch('src.components.tts.dashscope.AioMultiModalConversation.call', new_callable=AsyncMock)
+    def test_generate_with_url(self, mock_call):
+        # Ensure file doesn't exist so it doesn't skip
+        scene_id = "test_scene_url"
+        p = self.tts.output_dir / f"{scene_id}.mp3"
+        if p.exists():
+            p.unlink()
+
+        mock_call.return_value = self._mock_response()
+        requested = self._mock_transport()
 
         # Execute
-        output_path = self.tts.generate("Hello world", scene_id)
+        output_path = asyncio.run(self.tts.generate_async("Hello world", scene_id))
 
         # Verify
         expected_path = str(self.tts.output_dir / f"{scene_id}.mp3")
         self.assertEqual(output_path, expected_path)
         
-        # Check if file was written
+        # Check if file was written (and no partial file left behind)
         with open(output_path, "rb") as f:
             content = f.read()
         self.assertEqual(content, b"fake audio content via url")
+        self.assertEqual(list(self.tts.output_dir.glob(f".{scene_id}*.part")), [])
 
         # Verify calls
-        mock_call.assert_called_once()
-        mock_get.assert_called_once_with("http://example.com/audio.mp3")
+        mock_call.assert_awaited_once()
+        self.assertEqual(requested, ["http://example.com/audio.mp3"])
+
+    @patch('src.components.tts.dashscope.AioMultiModalConversation.call', new_callable=AsyncMock)
+    def test_generate_retries_failed_synthesis(self, mock_call):
+        scene_id = "test_scene_url"
+        self.tts.retry_wait = wait_none()
+        mock_call.side_effect = [self._mock_response(status_code=500), self._mock_response()]
+        self._mock_transport()
+
+        output_path = asyncio.run(self.tts.generate_async("Hello world", scene_id))
+
+        self.assertTrue(output_path.endswith(f"{scene_id}.mp3"))
+        self.assertEqual(mock_call.await_count, 2)
+
+    @patch('src.components.tts.dashscope.AioMultiModalConversation.call', new_callable=AsyncMock)
+    def test_generate_respects_provider_concurrency(self, mock_call):
+        state = {"active": 0, "peak": 0}
+
+        async def slow_call(**kwargs):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.01)
+            state["active"] -= 1
+            return self._mock_response(url=f"http://example.com/{kwargs['text']}.mp3")
+
+        mock_call.side_effect = slow_call
+        self._mock_transport()
+
+        async def run_all():
+            TTSEngine._semaphores.clear()
+            with patch('src.components.tts.settings.TTS_CONCURRENCY', 2):
+                return await asyncio.gather(*[
+                    self.tts.generate_async(f"line{i}", f"test_concurrency_{i}") for i in range(6)
+                ])
+
+        try:
+            paths = asyncio.run(run_all())
+        finally:
+            TTSEngine._semaphores.clear()
+            for p in self.tts.output_dir.glob("test_concurrency_*.mp3"):
+                p.unlink()
+
+        self.assertEqual(len([p for p in paths if p]), 6)
+        self.assertLessEqual(state["peak"], 2)
+
+    def test_semaphores_are_per_event_loop(self):
+        async def contend():
+            sem = TTSEngine._semaphore_for("dashscope")
+
+            async def hold():
+                async with sem:
+                    await asyncio.sleep(0.01)
+
+            # 并发数为 1 时第二个任务需要等待，等待会把信号量绑定到当前事件循环
+            await asyncio.gather(hold(), hold())
+            return sem, TTSEngine._semaphore_for("dashscope")
+
+        with patch('src.components.tts.settings.TTS_CONCURRENCY', 1):
+            # 批量模式/测试中连续多次 asyncio.run 不应出现 "bound to a different event loop"
+            first, same = asyncio.run(contend())
+            second, _ = asyncio.run(contend())
+
+        self.assertIs(first, same)
+        self.assertIsNot(first, second)
+
+    @patch('src.components.tts.dashscope.AioMultiModalConversation.call', new_callable=AsyncMock)
+    def test_generate_is_content_addressed(self, mock_call):
+        mock_call.return_value = self._mock_response()
+        self._mock_transport()
+
+        async def run():
+            with patch.object(TTSEngine, "get_duration", return_value=2.5):
+                # 相同文案、不同场景 (并发) -> 只合成一次
+                a, b = await asyncio.gather(
+                    self.tts.generate_async("Same line", "scene_a"),
+                    self.tts.generate_async("Same line", "scene_b"),
+                )
+                # 修改文案 -> 重新合成
+                c = await self.tts.generate_async("Edited line", "scene_a")
+                return a, b, c
+
+        a, b, c = asyncio.run(run())
+
+        self.assertEqual(mock_call.await_count, 2)
+        self.assertTrue(Path(b).exists())
+        self.assertEqual(a, c)
+        self.assertEqual(self.tts.get_duration(b), 2.5)
+        self.assertEqual(len(self.tts.store.entries()), 2)
+
+    @patch('src.components.tts.dashscope.AioMultiModalConversation.call', new_callable=AsyncMock)
+    def test_generate_emits_canonical_audio_once(self, mock_call):
+        mock_call.return_value = self._mock_response()
+        self._mock_transport()
+        conversions = []
+
+        def fake_convert(src, out_path):
+            conversions.append(src)
+            Path(out_path).write_bytes(b"aac audio")
+            return Path(out_path)
+
+        async def run():
+            with patch.object(settings, "TTS_CANONICAL_AUDIO", True), \
+                 patch("src.components.tts.to_canonical_audio", side_effect=fake_convert), \
+                 patch.object(TTSEngine, "get_duration", return_value=2.5):
+                first = await self.tts.generate_async("Hello world", "scene_a")
+                second = await self.tts.generate_async("Hello world", "scene_a")
+                return first, second, scene_audio_path("scene_a"), self.tts.cached_duration("Hello world")
+
+        first, second, resolved, cached = asyncio.run(run())
+
+        self.assertTrue(first.endswith("scene_a.m4a"))
+        self.assertEqual(first, second)
+        self.assertEqual(len(conversions), 1)
+        self.assertEqual(Path(first).read_bytes(), b"aac audio")
+        self.assertEqual(resolved, Path(first))
+        self.assertEqual(cached, 2.5)
+        self.assertFalse((self.tts.output_dir / "scene_a.mp3").exists())
+
+    @patch('src.components.tts.dashscope.AioMultiModalConversation.call', new_callable=AsyncMock)
+    def test_canonical_conversion_failure_falls_back_to_original(self, mock_call):
+        mock_call.return_value = self._mock_response()
+        self._mock_transport()
+
+        with patch.object(settings, "TTS_CANONICAL_AUDIO", True), \
+             patch("src.components.tts.to_canonical_audio", side_effect=FileNotFoundError("ffmpeg")):
+            output_path = asyncio.run(self.tts.generate_async("Hello world", "scene_a"))
+
+        self.assertTrue(output_path.endswith("scene_a.mp3"))
+        self.assertEqual(list(self.tts.store.root.glob("staging/*")), [])
 
-    @patch('src.components.tts.subprocess.run')
+    @patch('src.utils.media_info.subprocess.run')
     def test_get_duration(self, mock_run):
-        # Create a dummy file
+        # Create a dummy file (unknown format -> falls back to ffprobe)
         dummy_path = self.tts.output_dir / "test_duration.mp3"
-        dummy_path.touch()
+        dummy_path.write_bytes(b"not a known container")
         
         try:
             # Mock successful ffprobe
             mock_result = MagicMock()
-            mock_result.stdout = "5.5\n"
+            mock_result.stdout = '{"format": {"duration": "5.5"}}\n'
             mock_run.return_value = mock_result
             
             duration = self.tts.get_duration(str(dummy_path))
@@ -85,11 +230,11 @@ class TestTTSEngine(unittest.TestCase):
             if dummy_path.exists():
                 dummy_path.unlink()
 
-    @patch('src.components.tts.subprocess.run')
+    @patch('src.utils.media_info.subprocess.run')
     def test_get_duration_fail(self, mock_run):
          # Create a dummy file
          dummy_path = self.tts.output_dir / "test_duration_fail.mp3"
-         dummy_path.touch()
+         dummy_path.write_bytes(b"unreadable audio")
          
          try:
              # Mock failure
@@ -0,0 +1,113 @@
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from src.components.critic import VisionCritic
+from src.components.renderer import ManimRunner
+from src.core.config import settings
+from src.core.models import SceneSpec
+from src.utils.image_ops import build_contact_sheet
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    with patch.object(ManimRunner, "_check_docker_availability"):
+        return ManimRunner()
+
+def test_build_contact_sheet_grid(tmp_path):
+    frames = []
+    for i in range(5):
+        p = tmp_path / f"f{i}.png"
+        Image.new("RGB", (160, 90), (i * 40, 0, 0)).save(p)
+        frames.append(p)
+
+    out = build_contact_sheet(frames, [f"t={i}.00s" for i in range(5)], tmp_path / "sheet.png", columns=3, label_height=20)
+
+    with Image.open(out) as sheet:
+        assert sheet.size == (160 * 3, (90 + 20) * 2)
+
+def test_keyframe_times_even(runner, monkeypatch):
+    monkeypatch.setattr(settings, "CRITIC_KEYFRAMES", 4)
+    monkeypatch.setattr(settings, "CRITIC_KEYFRAME_MODE", "even")
+
+    times = runner._keyframe_times(duration=4.0, fps=10.0, layout_path=None)
+
+    assert times == [0.975, 1.95, 2.925, 3.9]
+
+def test_keyframe_times_from_play_boundaries(runner, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CRITIC_KEYFRAMES", 3)
+    monkeypatch.setattr(settings, "CRITIC_KEYFRAME_MODE", "play")
+    layout = tmp_path / "layout.json"
+    layout.write_text(json.dumps({"snapshots": [{"t": t} for t in (1.0, 2.0, 3.0, 4.0, 5.0)]}))
+
+    times = runner._keyframe_times(duration=5.0, fps=10.0, layout_path=layout)
+
+    assert times == [1.0, 3.0, 4.9]
+
+def test_extract_contact_sheet_uses_single_ffmpeg_pass(runner, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CRITIC_KEYFRAMES", 3)
+    monkeypatch.setattr(settings, "CRITIC_KEYFRAME_MODE", "even")
+    work_dir = tmp_path / "work"
+
+    def fake_ffmpeg(cmd, **kwargs):
+        out_pattern = Path(cmd[-1])
+        for i in range(3):
+            Image.new("RGB", (48, 27)).save(out_pattern.parent / f"frame_{i + 1:03d}.png")
+
+    with patch.object(runner, "_probe_video", return_value=(3.0, 10.0)), \
+         patch("src.components.renderer.subprocess.run", side_effect=fake_ffmpeg) as mock_run:
+        sheet, timestamps = runner._extract_contact_sheet(Path("clip.mp4"), "s1", work_dir, None)
+
+    assert mock_run.call_count == 1
+    vf = mock_run.call_args[0][0][mock_run.call_args[0][0].index("-vf") + 1]
+    assert vf.startswith("select='eq(n,10)+eq(n,19)+eq(n,29)'")
+    assert timestamps == [1.0, 1.9, 2.9]
+    assert sheet.exists()
+
+@pytest.mark.asyncio
+async def test_review_contact_sheet_reports_timestamps(tmp_path):
+    critic = VisionCritic()
+    critic.verdict_cache = None
+    sheet = tmp_path / "sheet.png"
+    Image.new("RGB", (300, 200)).save(sheet)
+
+    response = MagicMock()
+    response.choices[0].message.content = json.dumps({
+        "passed": False,
+        "score": 3,
+        "issues": [{"object": "Title", "description": "overlaps the arrow", "timestamp": 1.5}],
+        "suggestion": "Move the title up."
+    })
+    critic.llm_client = MagicMock()
+    critic.llm_client.client.chat.completions.create = AsyncMock(return_value=response)
+
+    scene = SceneSpec(scene_id="s1", description="d", duration=3.0, audio_script="a")
+    feedback = await critic.review_layout(str(sheet), scene, timestamps=[0.5, 1.5, 2.9])
+
+    kwargs = critic.llm_client.client.chat.completions.create.call_args.kwargs
+    assert "CONTACT SHEET" in kwargs["messages"][1]["content"][0]["text"]
+    assert "[t=1.5s] Title: overlaps the arrow" in feedback.suggestion
+    assert feedback.suggestion.startswith("Move the title up.")
+
+@pytest.mark.asyncio
+async def test_contact_sheet_skips_verdict_cache(tmp_path):
+    critic = VisionCritic()
+    critic.verdict_cache = MagicMock()
+    sheet = tmp_path / "sheet.png"
+    Image.new("RGB", (300, 200)).save(sheet)
+
+    response = MagicMock()
+    response.choices[0].message.content = json.dumps({"passed": False, "score": 3, "suggestion": "x"})
+    critic.llm_client = MagicMock()
+    critic.llm_client.client.chat.completions.create = AsyncMock(return_value=response)
+
+    scene = SceneSpec(scene_id="s1", description="d", duration=3.0, audio_script="a")
+    feedback = await critic.review_layout(str(sheet), scene, timestamps=[0.5, 1.5, 2.9])
+
+    # 拼图审查不查也不写结论缓存
+    assert not feedback.cached
+    critic.verdict_cache.lookup.assert_not_called()
+    critic.verdict_cache.store.assert_not_called()
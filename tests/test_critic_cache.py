@@ -0,0 +1,160 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from PIL import Image, ImageDraw
+
+from src.components.critic import VisionCritic
+from src.components.critic_cache import CriticCache
+from src.core.models import CritiqueFeedback, SceneSpec
+from src.utils.image_ops import pixel_digest
+
+def _frame(path, box=(100, 100, 400, 300), label=None, fmt="PNG"):
+    img = Image.new("RGB", (640, 360), (0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle(box, fill=(255, 255, 255))
+    if label:
+        draw.text(label, "Label", fill=(255, 0, 0))
+    img.save(path, format=fmt)
+    return str(path)
+
+@pytest.fixture
+def scene():
+    return SceneSpec(scene_id="s1", description="A box", duration=3.0, audio_script="a", elements=["Box"])
+
+def test_pixel_digest_ignores_encoding_but_not_layout(tmp_path):
+    a = pixel_digest(_frame(tmp_path / "a.png"))
+    # 同样的像素换一种无损编码，摘要不变
+    assert pixel_digest(_frame(tmp_path / "a.bmp", fmt="BMP")) == a
+    assert pixel_digest(_frame(tmp_path / "b.png", box=(101, 100, 401, 300))) != a
+
+def test_moved_label_is_a_cache_miss(tmp_path, scene):
+    cache = CriticCache(cache_path=tmp_path / "critic_cache.json")
+    # 标签压在方框上被否决，修复后移到方框下方 80px
+    overlapping = _frame(tmp_path / "v0.png", label=(200, 200))
+    cache.store(overlapping, scene, CritiqueFeedback(passed=False, score=3, suggestion="Label overlaps box"))
+
+    assert cache.lookup(_frame(tmp_path / "v1.png", label=(200, 280)), scene) is None
+    assert cache.lookup(_frame(tmp_path / "v2.png", label=(200, 200)), scene).suggestion == "Label overlaps box"
+
+def test_cache_roundtrip_and_persistence(tmp_path, scene):
+    cache_path = tmp_path / "critic_cache.json"
+    cache = CriticCache(cache_path=cache_path)
+    frame = _frame(tmp_path / "a.png")
+
+    assert cache.lookup(frame, scene) is None
+    cache.store(frame, scene, CritiqueFeedback(passed=False, score=3, suggestion="Title cut off"))
+
+    reloaded = CriticCache(cache_path=cache_path)
+    hit = reloaded.lookup(_frame(tmp_path / "b.png"), scene)
+    assert hit is not None
+    assert hit.cached is True
+    assert hit.suggestion == "Title cut off"
+
+    # 画面明显不同 / 场景描述不同 都不应命中
+    assert reloaded.lookup(_frame(tmp_path / "c.png", box=(300, 50, 600, 200)), scene) is None
+    other = scene.model_copy(update={"description": "Another scene"})
+    assert reloaded.lookup(frame, other) is None
+
+def test_store_dedupes_and_bounds_entries(tmp_path, scene):
+    cache_path = tmp_path / "critic_cache.json"
+    cache = CriticCache(cache_path=cache_path, max_entries=2, max_scenes=2)
+    frames = [_frame(tmp_path / f"f{i}.png", box=(20 + 150 * i, 20, 120 + 150 * i, 300)) for i in range(3)]
+
+    # 同一帧重复写入只保留一条 (最新结论)
+    cache.store(frames[0], scene, CritiqueFeedback(passed=False, score=3, suggestion="old"))
+    cache.store(frames[0], scene, CritiqueFeedback(passed=False, score=4, suggestion="new"))
+    key = cache.scene_key(scene)
+    assert len(cache._entries[key]) == 1
+    assert cache.lookup(frames[0], scene).suggestion == "new"
+
+    cache.store(frames[1], scene, CritiqueFeedback(passed=True, score=9))
+    cache.store(frames[2], scene, CritiqueFeedback(passed=True, score=9))
+    assert len(cache._entries[key]) == 2
+    assert cache.lookup(frames[0], scene) is None
+
+    # 场景数超出上限时丢弃最久未写入的场景
+    for desc in ("B", "C"):
+        cache.store(frames[0], scene.model_copy(update={"description": desc}), CritiqueFeedback(passed=True, score=9))
+    assert key not in CriticCache(cache_path=cache_path)._entries
+
+def test_cache_key_includes_model_and_prompt(tmp_path, scene):
+    cache_path = tmp_path / "critic_cache.json"
+    frame = _frame(tmp_path / "a.png")
+    CriticCache(cache_path=cache_path, namespace="model-a").store(frame, scene, CritiqueFeedback(passed=True, score=9))
+
+    assert CriticCache(cache_path=cache_path, namespace="model-a").lookup(frame, scene) is not None
+    assert CriticCache(cache_path=cache_path, namespace="model-b").lookup(frame, scene) is None
+
+@pytest.mark.asyncio
+async def test_review_layout_skips_vlm_on_cache_hit(tmp_path, scene):
+    critic = VisionCritic()
+    critic.verdict_cache = CriticCache(cache_path=tmp_path / "cache.json")
+
+    response = MagicMock()
+    response.choices[0].message.content = '{"passed": false, "score": 3, "suggestion": "Move title"}'
+    response.usage.total_tokens = 10
+    create = AsyncMock(return_value=response)
+    critic.llm_client = MagicMock()
+    critic.llm_client.client.chat.completions.create = create
+
+    first = await critic.review_layout(_frame(tmp_path / "v0.png"), scene)
+    second = await critic.review_layout(_frame(tmp_path / "v1.png"), scene)
+
+    assert create.await_count == 1
+    assert first.cached is False
+    assert second.cached is True
+    assert second.suggestion == "Move title"
+
+@pytest.mark.asyncio
+async def test_review_after_fix_only_reuses_passing_verdicts(tmp_path, scene):
+    critic = VisionCritic()
+    critic.verdict_cache = CriticCache(cache_path=tmp_path / "cache.json")
+    rejected = _frame(tmp_path / "rejected.png")
+    approved = _frame(tmp_path / "approved.png", box=(100, 20, 400, 120))
+    critic.verdict_cache.store(rejected, scene, CritiqueFeedback(passed=False, score=3, suggestion="Move title"))
+    critic.verdict_cache.store(approved, scene, CritiqueFeedback(passed=True, score=9))
+
+    response = MagicMock()
+    response.choices[0].message.content = '{"passed": false, "score": 4, "suggestion": "Still overlapping"}'
+    response.usage.total_tokens = 10
+    create = AsyncMock(return_value=response)
+    critic.llm_client = MagicMock()
+    critic.llm_client.client.chat.completions.create = create
+
+    # 否决的结论不复用: 重新审查，但标记画面与被否决的帧一致
+    again = await critic.review_layout(rejected, scene, reuse_rejections=False)
+    assert create.await_count == 1
+    assert not again.cached and again.unchanged_frame
+    assert again.suggestion == "Still overlapping"
+
+    passed = await critic.review_layout(approved, scene, reuse_rejections=False)
+    assert create.await_count == 1
+    assert passed.cached and passed.passed
+
+@pytest.mark.asyncio
+async def test_node_critic_flags_fix_without_visual_effect(tmp_path, monkeypatch, scene):
+    import src.core.config
+    from unittest.mock import patch
+    from src.core.models import RenderArtifact
+
+    monkeypatch.setattr(src.core.config.settings, "OUTPUT_DIR", tmp_path)
+    with patch("src.core.graph.ManimRunner"):
+        from src.core.graph import ManimGraph
+        graph = ManimGraph()
+
+    graph.critic = AsyncMock()
+    graph.critic.review_layout.return_value = CritiqueFeedback(
+        passed=False, score=3, suggestion="Move title", unchanged_frame=True
+    )
+    state = {
+        "scene_spec": scene,
+        "artifact": RenderArtifact(video_path="v.mp4", last_frame_path="f.png", code_content="", scene_id="s1"),
+        "visual_retries": 1,
+        "retries": 0,
+    }
+
+    result = await graph.node_critic(state)
+
+    assert "NO VISUAL EFFECT" in result["critic_feedback"]
+    assert "Move title" in result["critic_feedback"]
+    assert graph.critic.review_layout.call_args.kwargs["reuse_rejections"] is False
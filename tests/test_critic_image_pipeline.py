@@ -0,0 +1,100 @@
+import base64
+import io
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from PIL import Image
+
+from src.components.critic import VisionCritic
+from src.core.models import SceneSpec
+from src.utils.image_ops import encode_for_vlm
+from src.utils.logger import metrics
+
+def _make_png(path, size=(1920, 1080)):
+    Image.new("RGBA", size, (10, 20, 30, 255)).save(path, format="PNG")
+    return path
+
+def test_encode_for_vlm_downscales_and_converts(tmp_path):
+    src = _make_png(tmp_path / "frame.png")
+
+    encoded = encode_for_vlm(src, max_edge=640, fmt="jpeg", quality=80)
+
+    assert encoded.mime_type == "image/jpeg"
+    assert (encoded.width, encoded.height) == (640, 360)
+    assert encoded.size_bytes < src.stat().st_size or encoded.size_bytes < 50_000
+    assert encoded.data_url.startswith("data:image/jpeg;base64,")
+
+    decoded = Image.open(io.BytesIO(base64.b64decode(encoded.data)))
+    assert decoded.format == "JPEG"
+    assert decoded.size == (640, 360)
+
+def test_encode_for_vlm_rejects_unknown_format(tmp_path):
+    src = _make_png(tmp_path / "frame.png", size=(10, 10))
+    with pytest.raises(ValueError):
+        encode_for_vlm(src, fmt="bmp")
+
+def test_encode_image_is_cached_by_content(tmp_path, monkeypatch):
+    critic = VisionCritic()
+    calls = []
+
+    import src.components.critic as critic_module
+    real_encode = critic_module.encode_for_vlm
+
+    def counting_encode(*args, **kwargs):
+        calls.append(args)
+        return real_encode(*args, **kwargs)
+
+    monkeypatch.setattr(critic_module, "encode_for_vlm", counting_encode)
+
+    a = _make_png(tmp_path / "a.png", size=(64, 64))
+    b = _make_png(tmp_path / "b.png", size=(64, 64))  # 内容相同，文件不同
+
+    first = critic._encode_image(str(a))
+    second = critic._encode_image(str(b))
+
+    assert first is second
+    assert len(calls) == 1
+    assert critic._encode_image(str(tmp_path / "missing.png")) is None
+
+def test_encode_image_cache_is_bounded_lru(tmp_path, monkeypatch):
+    critic = VisionCritic()
+    monkeypatch.setattr(VisionCritic, "IMAGE_CACHE_SIZE", 2)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.png"
+        Image.new("RGB", (16, 16), (i, 0, 0)).save(path, format="PNG")
+        paths.append(str(path))
+
+    first = critic._encode_image(paths[0])
+    critic._encode_image(paths[1])
+    assert critic._encode_image(paths[0]) is first  # 命中后移到队尾
+    critic._encode_image(paths[2])
+
+    # 超出上限时淘汰最久未使用的 1.png
+    assert len(critic._image_cache) == 2
+    assert critic._encode_image(paths[0]) is first
+    assert critic._encode_image(paths[1]) is not None and len(critic._image_cache) == 2
+
+@pytest.mark.asyncio
+async def test_review_layout_sends_compressed_image(tmp_path):
+    critic = VisionCritic()
+    critic.verdict_cache = None
+    frame = _make_png(tmp_path / "frame.png")
+
+    response = MagicMock()
+    response.choices[0].message.content = '{"passed": true, "score": 9}'
+    response.usage.total_tokens = 321
+    critic.llm_client = MagicMock()
+    critic.llm_client.client.chat.completions.create = AsyncMock(return_value=response)
+
+    metrics.reset()
+    scene = SceneSpec(scene_id="s1", description="d", duration=3.0, audio_script="a")
+    feedback = await critic.review_layout(str(frame), scene)
+
+    assert feedback.passed is True
+    kwargs = critic.llm_client.client.chat.completions.create.call_args.kwargs
+    image_part = kwargs["messages"][1]["content"][1]
+    assert image_part["image_url"]["url"].startswith("data:image/jpeg;base64,")
+    assert metrics.critic_requests == 1
+    assert metrics.critic_tokens == 321
+    assert metrics.critic_image_bytes > 0
@@ -0,0 +1,81 @@
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.components.assembler import Assembler
+from src.tools import encode_benchmark
+from src.utils.encoding import PROFILES, EncodingProfile, get_profile
+from src.utils.media_info import MediaInfo
+
+def test_profile_arguments():
+    archival = PROFILES["archival"]
+    assert archival.video_args(30) == ["-preset", "slow", "-crf", "18", "-g", "60"]
+    # 没有帧率时无法换算 GOP
+    assert "-g" not in archival.video_args(None)
+    assert archival.audio_args()[archival.audio_args().index("-b:a") + 1] == "256k"
+
+    cbr = EncodingProfile(name="cbr", crf=20, video_bitrate="4M")
+    args = cbr.video_args()
+    assert "-crf" not in args
+    assert args[args.index("-b:v") + 1] == "4M"
+
+def test_balanced_profile_matches_legacy_defaults():
+    balanced = get_profile("balanced")
+    assert balanced.video_args(30) == ["-preset", "medium", "-crf", "23"]
+    assert balanced.audio_args() == ["-c:a", "aac", "-b:a", "192k", "-ar", "44100", "-ac", "2"]
+
+def test_unknown_profile_raises():
+    with pytest.raises(ValueError, match="Unknown encoding profile"):
+        get_profile("ultra")
+
+def test_assembler_uses_selected_profile(tmp_path):
+    with patch("src.components.assembler.settings") as mock_settings:
+        mock_settings.OUTPUT_DIR = tmp_path
+        assembler = Assembler(profile=PROFILES["preview"])
+        assembler._target = MediaInfo(format="mp4", width=1920, height=1080, fps=30.0, timescale=15360)
+        cmd = assembler._mux_command("scene.mp4", "scene.wav", tmp_path / "segment_000.mp4")
+
+    assert cmd[cmd.index("-preset") + 1] == "ultrafast"
+    assert cmd[cmd.index("-crf") + 1] == "30"
+    assert cmd[cmd.index("-g") + 1] == "60"
+    assert cmd[cmd.index("-threads") + 1] == "1"
+    assert cmd[cmd.index("-b:a") + 1] == "96k"
+
+def test_quality_log_parsing():
+    ssim_log = "[Parsed_ssim_0 @ 0x1] SSIM Y:0.991 (20.4) U:0.995 V:0.996 All:0.992614 (21.3)"
+    vmaf_log = "[Parsed_libvmaf_0 @ 0x1] VMAF score: 93.412871"
+    assert encode_benchmark.parse_ssim(ssim_log) == pytest.approx(0.992614)
+    assert encode_benchmark.parse_vmaf(vmaf_log) == pytest.approx(93.412871)
+    assert encode_benchmark.parse_ssim("no metrics here") is None
+
+def test_benchmark_reports_fps_size_and_quality(tmp_path):
+    clip = tmp_path / "scene.mp4"
+    clip.write_bytes(b"source")
+
+    def fake_run(cmd, **kwargs):
+        if "-lavfi" in cmd:
+            metric = cmd[cmd.index("-lavfi") + 1]
+            log = "SSIM Y:0.9 All:0.95 (13.0)" if "ssim" in metric else "VMAF score: 91.5"
+            return MagicMock(stderr=log)
+        Path(cmd[-1]).write_bytes(b"x" * 25_000)
+        return MagicMock()
+
+    info = MediaInfo(format="mp4", duration=2.0, fps=30.0, width=1920, height=1080)
+    with patch("src.tools.encode_benchmark.subprocess.run", side_effect=fake_run), \
+         patch("src.tools.encode_benchmark.media_info.probe", return_value=info):
+        results = encode_benchmark.run_benchmark(
+            [clip], [PROFILES["fast"], PROFILES["archival"]], tmp_path / "encodes", vmaf=True
+        )
+
+    assert [r.profile for r in results] == ["fast", "archival"]
+    fast = results[0]
+    assert fast.error is None
+    assert fast.frames == 60 and fast.encode_fps > 0
+    assert fast.size_bytes == 25_000 and fast.bitrate_kbps == pytest.approx(100.0)
+    assert fast.ssim == pytest.approx(0.95) and fast.vmaf == pytest.approx(91.5)
+
+    summary = encode_benchmark.summarize(results)
+    assert set(summary) == {"fast", "archival"}
+    assert summary["fast"]["clips"] == 1 and summary["fast"]["failed"] == 0
+    assert "archival" in encode_benchmark.format_table(summary)
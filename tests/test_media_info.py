@@ -0,0 +1,129 @@
+import struct
+import wave
+from unittest.mock import patch
+
+import pytest
+
+from src.utils import media_info
+
+# --- 构造最小可解析的媒体文件 ---
+
+MP3_HEADER = b"\xff\xfb\x90\x64"  # MPEG1 Layer III, 128 kbps, 44.1 kHz, joint stereo
+MP3_FRAME_LEN = 417
+
+def mp3_bytes(frames: int, xing_frames: int = None) -> bytes:
+    out = bytearray()
+    if xing_frames is not None:
+        info = bytearray(MP3_HEADER + bytes(MP3_FRAME_LEN - 4))
+        info[4 + 32:4 + 32 + 12] = b"Xing" + struct.pack(">II", 1, xing_frames)
+        out += info
+    for _ in range(frames):
+        out += MP3_HEADER + bytes(MP3_FRAME_LEN - 4)
+    return bytes(out)
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+def full_box(box_type: bytes, payload: bytes, version: int = 0) -> bytes:
+    return box(box_type, bytes([version, 0, 0, 0]) + payload)
+
+def avc1_entry(profile=100, chroma=1, bit_depth=8) -> bytes:
+    sps, pps = b"\x67" + bytes(8), b"\x68" + bytes(3)
+    avcc = bytes([1, profile, 0, 40, 0xFF, 0xE1]) + struct.pack(">H", len(sps)) + sps
+    avcc += bytes([1]) + struct.pack(">H", len(pps)) + pps
+    if profile in (100, 110, 122, 144):
+        avcc += bytes([0xFC | chroma, 0xF8 | (bit_depth - 8), 0xF8 | (bit_depth - 8), 0])
+    return box(b"avc1", bytes(78) + box(b"avcC", avcc))
+
+def mp4_bytes(width=854, height=480, timescale=15360, delta=1024, duration_ms=2500, sample_entry=None) -> bytes:
+    mvhd = full_box(b"mvhd", struct.pack(">IIII", 0, 0, 1000, duration_ms) + bytes(80))
+    tkhd = full_box(b"tkhd", struct.pack(">IIIII", 0, 0, 1, 0, duration_ms) + bytes(16) + bytes(36)
+                    + struct.pack(">II", width << 16, height << 16))
+    mdhd = full_box(b"mdhd", struct.pack(">IIII", 0, 0, timescale, 0) + bytes(4))
+    hdlr = full_box(b"hdlr", struct.pack(">I4s", 0, b"vide") + bytes(12))
+    stts = full_box(b"stts", struct.pack(">III", 1, 38, delta))
+    stsd = full_box(b"stsd", struct.pack(">I", 1) + sample_entry) if sample_entry else b""
+    minf = box(b"minf", box(b"stbl", stts + stsd))
+    trak = box(b"trak", tkhd + box(b"mdia", mdhd + hdlr + minf))
+    return box(b"ftyp", b"isom" + bytes(4)) + box(b"moov", mvhd + trak) + box(b"mdat", bytes(16))
+
+@pytest.fixture(autouse=True)
+def clear_memo():
+    media_info._memo.clear()
+    yield
+    media_info._memo.clear()
+
+def test_mp3_cbr_duration(tmp_path):
+    path = tmp_path / "a.mp3"
+    path.write_bytes(b"ID3\x03\x00\x00\x00\x00\x00\x0a" + bytes(10) + mp3_bytes(100))
+
+    info = media_info.probe(path)
+
+    assert info.format == "mp3"
+    assert info.duration == pytest.approx(100 * MP3_FRAME_LEN * 8 / 128000, abs=1e-3)
+
+def test_mp3_xing_frame_count(tmp_path):
+    path = tmp_path / "vbr.mp3"
+    path.write_bytes(mp3_bytes(10, xing_frames=200))
+
+    assert media_info.probe_duration(path) == pytest.approx(200 * 1152 / 44100, abs=1e-3)
+
+def test_wav_duration(tmp_path):
+    path = tmp_path / "tts.mp3"  # DashScope 返回的其实是 WAV，扩展名不可靠
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(24000)
+        w.writeframes(bytes(2 * 24000 * 3))
+
+    info = media_info.probe(path)
+
+    assert info.format == "wav"
+    assert info.duration == 3.0
+
+def test_mp4_resolution_duration_fps(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(mp4_bytes())
+
+    info = media_info.probe(path)
+
+    assert (info.format, info.duration, info.fps) == ("mp4", 2.5, 15.0)
+    assert media_info.probe_resolution(path) == "854x480"
+
+@pytest.mark.parametrize("entry, expected", [
+    (avc1_entry(profile=100, chroma=1), ("h264", "yuv420p")),
+    (avc1_entry(profile=144, chroma=3, bit_depth=10), ("h264", "yuv444p10le")),
+    (avc1_entry(profile=77), ("h264", "yuv420p")),
+    (box(b"hvc1", bytes(78)), ("hevc", None)),
+])
+def test_mp4_codec_pix_fmt_and_timescale(tmp_path, entry, expected):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(mp4_bytes(timescale=15360, sample_entry=entry))
+
+    info = media_info.probe(path)
+
+    assert (info.video_codec, info.pix_fmt) == expected
+    assert info.timescale == 15360
+    # avcC 原样保留 (含 SPS/PPS)，拼接前用来判断两个片段的参数集是否一致
+    assert (info.avcc is not None) == (expected[0] == "h264")
+    if info.avcc:
+        assert bytes.fromhex(info.avcc)[:2] == entry[8 + 78 + 8:8 + 78 + 10]
+
+def test_unknown_format_falls_back_to_ffprobe_and_is_memoized(tmp_path):
+    path = tmp_path / "weird.bin"
+    path.write_bytes(b"\x00unknown")
+
+    with patch("src.utils.media_info.subprocess.run") as mock_run, \
+         patch("src.utils.media_info.open", side_effect=open) as mock_open:
+        mock_run.return_value.stdout = '{"format": {"duration": "4.2"}, "streams": []}'
+        assert media_info.probe_duration(path) == 4.2
+        # 文件未变化 -> 只做 stat，不读内容，也不再启动 ffprobe
+        assert media_info.probe_duration(path) == 4.2
+        assert mock_run.call_count == 1 and mock_open.call_count == 1
+
+        # 文件被改写 (大小 / 修改时间变化) -> 重新解析
+        path.write_bytes(b"\x00unknown, rewritten")
+        mock_run.return_value.stdout = '{"format": {"duration": "5.0"}, "streams": []}'
+        assert media_info.probe_duration(path) == 5.0
+
+    assert mock_run.call_count == 2
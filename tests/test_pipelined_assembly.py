@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.components.assembler import Assembler
+from src.core.config import settings
+from src.core.models import RenderArtifact, SceneSpec
+
+@pytest.fixture
+def assembler(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(settings, "ASSEMBLER_WORKERS", 2)
+    return Assembler()
+
+def _artifact(tmp_path, i):
+    video = tmp_path / f"v{i}.mp4"
+    video.write_bytes(f"video {i}".encode())
+    return RenderArtifact(scene_id=f"s{i}", video_path=str(video), last_frame_path="x.png", code_content="")
+
+def test_segments_are_muxed_as_scenes_arrive(assembler, tmp_path):
+    started = []
+    release = threading.Event()
+
+    def run(cmd, **kwargs):
+        if cmd[0] == "ffmpeg" and Path(cmd[-1]).name.startswith("segment_"):
+            started.append(Path(cmd[-1]).name)
+            release.wait(timeout=5)
+        if cmd[0] == "ffmpeg":
+            Path(cmd[-1]).write_bytes(b"segment")
+        return MagicMock()
+
+    with patch("src.components.assembler.subprocess.run", side_effect=run), \
+         patch("src.components.assembler.media_info.probe_resolution", return_value="1920x1080"):
+        assembler.begin(expected=3)
+        # 场景按完成顺序到达 (与故事板顺序不同)
+        assembler.submit(2, _artifact(tmp_path, 2), None)
+        future = assembler.submit(0, _artifact(tmp_path, 0), None)
+        # 提交后立即开始合成，不等待其他场景
+        for _ in range(100):
+            if len(started) == 2:
+                break
+            threading.Event().wait(0.01)
+        assert sorted(started) == ["segment_000.mp4", "segment_002.mp4"]
+        assert not future.done()
+
+        release.set()
+        assembler.submit(1, _artifact(tmp_path, 1), None)
+        output = assembler.finish("full_movie.mp4")
+
+    assert output.endswith("full_movie.mp4")
+    lines = [l for l in (tmp_path / "concat_list.txt").read_text().splitlines() if "segment_" in l]
+    assert [l.split("segment_")[1][:3] for l in lines] == ["000", "001", "002"]
+
+def test_finalize_reports_artifacts_to_callback(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    received = []
+    with patch("src.core.graph.ManimRunner"):
+        from src.core.graph import ManimGraph
+        graph = ManimGraph(on_artifact=lambda scene_id, art: received.append((scene_id, art)))
+
+    scene = SceneSpec(scene_id="s1", description="d", duration=1.0, audio_script="x")
+    art = _artifact(tmp_path, 1)
+    ok = asyncio.run(graph.node_finalize({"scene_spec": scene, "artifact": art}))
+    failed = asyncio.run(graph.node_finalize({"scene_spec": scene, "artifact": None}))
+
+    assert ok == {"output_artifacts": [art]}
+    assert failed == {"output_artifacts": []}
+    assert received == [("s1", art), ("s1", None)]
+
+def test_progressive_playlist_grows_with_pipelined_segments(assembler, tmp_path, monkeypatch):
+    from tests.test_progressive_output import fake_hls
+    monkeypatch.setattr(settings, "PROGRESSIVE_OUTPUT", True)
+
+    def run(cmd, **kwargs):
+        if "hls" in cmd:
+            return fake_hls(cmd)
+        if cmd[0] == "ffmpeg":
+            Path(cmd[-1]).write_bytes(b"segment")
+        return MagicMock()
+
+    with patch("src.components.assembler.subprocess.run", side_effect=run), \
+         patch("src.components.assembler.media_info.probe_resolution", return_value="1920x1080"):
+        assembler.begin(expected=3)
+        assembler.submit(0, _artifact(tmp_path, 0), None).result()
+        playlist = tmp_path / "progressive" / "index.m3u8"
+        assert "scene_000_000.ts" in playlist.read_text()
+
+        assembler.skip(1)
+        assembler.submit(2, _artifact(tmp_path, 2), None)
+        assembler.finish("full_movie.mp4")
+
+    text = playlist.read_text()
+    assert "scene_002_000.ts" in text and "spacer_000.ts" in text
+    assert text.rstrip().endswith("#EXT-X-ENDLIST")
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import operator
+import time
+from typing import Annotated, List, Optional, TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+
+from src.core.models import SceneSpec
+from src.core.progress import SCENE_PATH, NodeHistory, ProgressTracker
+from src.core.scheduler import PriorityLimiter, Scheduler, Ticket
+
+class _SceneState(TypedDict):
+    scene_spec: SceneSpec
+    retries: int
+    output_artifacts: Annotated[List[str], operator.add]
+
+class _RunState(TypedDict):
+    scenes: List[SceneSpec]
+    output_artifacts: Annotated[List[str], operator.add]
+
+def _app(fail: Optional[str] = None):
+    """与 ParallelManimFlow 相同的结构: Send 扇出到场景子图"""
+    async def plan(state):
+        await asyncio.sleep(0.01)
+        return {"retries": 0}
+
+    async def finalize(state):
+        if state["scene_spec"].scene_id == fail:
+            return {"output_artifacts": []}
+        return {"output_artifacts": [state["scene_spec"].scene_id]}
+
+    sub = StateGraph(_SceneState)
+    sub.add_node("plan", plan)
+    sub.add_node("finalize", finalize)
+    sub.add_edge(START, "plan")
+    sub.add_edge("plan", "finalize")
+    sub.add_edge("finalize", END)
+
+    graph = StateGraph(_RunState)
+    graph.add_node("process_scene", sub.compile())
+    graph.add_conditional_edges(
+        START,
+        lambda s: [Send("process_scene", {"scene_spec": sc, "retries": 0, "output_artifacts": []}) for sc in s["scenes"]]
+    )
+    graph.add_edge("process_scene", END)
+    return graph.compile()
+
+def _scenes(n):
+    return [SceneSpec(scene_id=f"s{i}", description="d", duration=1.0, audio_script="x") for i in range(n)]
+
+def test_history_remaining_follows_scene_path(tmp_path):
+    history = NodeHistory(tmp_path / "durations.json")
+    for node in SCENE_PATH:
+        history.observe(node, 2.0)
+    history.observe("render", 10.0)  # render 平均 6s
+
+    assert history.remaining("render", elapsed=1.0) == pytest.approx(5.0 + 2.0 + 2.0)
+    assert history.remaining("render", finished=True) == pytest.approx(4.0)
+    # 修复分支之后回到 generate 重新走一遍
+    assert history.remaining("fixer", finished=True) == pytest.approx(2.0 * 5 + 6.0)
+    assert history.remaining("finalize", finished=True) == 0.0
+
+    history.save()
+    assert NodeHistory(tmp_path / "durations.json").mean("render") == pytest.approx(6.0)
+
+def test_stream_writes_node_and_scene_events(tmp_path):
+    events_path = tmp_path / "events.jsonl"
+    history = NodeHistory(tmp_path / "durations.json")
+    tracker = ProgressTracker("run_1", ["s0", "s1"], events_path=events_path, history=history, sched=Scheduler())
+
+    final = asyncio.run(tracker.stream(
+        _app(fail="s1"), {"scenes": _scenes(2), "output_artifacts": []}, {}, dashboard=False
+    ))
+    tracker.close()
+
+    assert final["output_artifacts"] == ["s0"]
+    events = [json.loads(line) for line in events_path.read_text(encoding="utf-8").splitlines()]
+    assert events[0]["event"] == "run_start" and events[-1]["event"] == "run_end"
+    assert events[-1]["success"] is True
+
+    s0 = [(e["event"], e.get("node")) for e in events if e.get("scene_id") == "s0"]
+    assert s0 == [
+        ("scene_start", None),
+        ("node_start", "plan"), ("node_end", "plan"),
+        ("node_start", "finalize"), ("node_end", "finalize"),
+        ("scene_end", None),
+    ]
+    node_start = next(e for e in events if e["event"] == "node_start")
+    assert node_start["attempt"] == "v0s0" and node_start["eta"] > 0
+
+    ends = {e["scene_id"]: e for e in events if e["event"] == "scene_end"}
+    assert ends["s0"]["success"] is True and ends["s1"]["success"] is False
+    assert tracker.finished == 2 and tracker.scenes["s1"].status == "failed"
+    # 节点耗时计入历史，供下一次运行估算
+    assert 0.005 < history.mean("plan") < 5
+
+def test_sample_reports_queue_depth_and_stalled_nodes(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.core.progress.settings.PROGRESS_STALL_FACTOR", 3.0)
+    sched = Scheduler()
+    sched._limiters["render"] = PriorityLimiter("render", 1, {})
+    tracker = ProgressTracker("run_1", ["s0"], history=NodeHistory(tmp_path / "d.json"), sched=sched)
+
+    async def run():
+        await sched.limiter("render").acquire(Ticket(order=0))
+        waiting = asyncio.create_task(sched.limiter("render").acquire(Ticket(order=1)))
+        await asyncio.sleep(0)
+        scene = tracker.scenes["s0"]
+        scene.status, scene.node, scene.attempt = "running", "render", "v0s0"
+        # 默认 render 40s，超过 3 倍视为卡住
+        scene.node_started = time.monotonic() - 200
+        events = tracker.sample()
+        again = tracker.sample()
+        lines = tracker.dashboard_lines()
+        waiting.cancel()
+        return events, again, lines
+
+    events, again, lines = asyncio.run(run())
+    assert events[0].resources["render"] == {"active": 1, "waiting": 1, "capacity": 1}
+    assert [e.event for e in events] == ["resources", "stalled"]
+    assert events[1].scene_id == "s0" and events[1].node == "render"
+    # 同一个节点只报告一次
+    assert [e.event for e in again] == ["resources"]
+
+    assert lines[0].startswith("📺 0/1 scenes done")
+    assert any("render" in l and "queue 1" in l for l in lines)
+    assert any("stalled" in l for l in lines)
+
+def test_restore_marks_checkpointed_scenes_done(tmp_path):
+    events_path = tmp_path / "events.jsonl"
+    tracker = ProgressTracker(
+        "run_1", ["s0", "s1", "s2"], events_path=events_path,
+        history=NodeHistory(tmp_path / "d.json"), sched=Scheduler()
+    )
+    # 续跑: s0/s1 已在上一次运行中完成，不会再有任务事件
+    tracker.restore(["s0", "s1", "unknown"])
+    assert tracker.finished == 2 and "unknown" not in tracker.scenes
+    assert tracker.scene_eta(tracker.scenes["s0"]) == 0.0
+    assert tracker.dashboard_lines()[0].startswith("📺 2/3 scenes done")
+
+    asyncio.run(tracker.stream(_app(), {"scenes": _scenes(3)[2:], "output_artifacts": []}, {}, dashboard=False))
+    tracker.close()
+    events = [json.loads(line) for line in events_path.read_text(encoding="utf-8").splitlines()]
+    assert events[0]["event"] == "run_start" and events[0]["done"] == 2
+    assert events[-1]["done"] == 3
@@ -0,0 +1,111 @@
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.components.progressive import ProgressiveWriter
+from src.core.config import settings
+
+def fake_hls(cmd, **kwargs):
+    """模拟 ffmpeg -f hls: 每个输入切成两个 3 秒的分片"""
+    playlist = Path(cmd[-1])
+    pattern = cmd[cmd.index("-hls_segment_filename") + 1]
+    names = [Path(pattern % n).name for n in range(2)]
+    for name in names:
+        (playlist.parent / name).write_bytes(b"ts")
+    playlist.write_text(
+        "#EXTM3U\n#EXT-X-TARGETDURATION:3\n" + "".join(f"#EXTINF:3.000000,\n{n}\n" for n in names) + "#EXT-X-ENDLIST\n"
+    )
+    return MagicMock()
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    spacer = tmp_path / "spacer.mp4"
+    spacer.write_bytes(b"spacer")
+    with patch("src.components.progressive.subprocess.run", side_effect=fake_hls):
+        yield ProgressiveWriter(4, spacer_factory=lambda ref: spacer)
+
+def _uris(writer):
+    return [l for l in writer.playlist_path.read_text().splitlines() if l and not l.startswith("#")]
+
+def test_scenes_are_published_in_storyboard_order(writer, tmp_path):
+    writer.add(1, tmp_path / "segment_001.mp4")
+    # 场景 0 还没完成，场景 1 不能出现
+    assert not writer.playlist_path.exists()
+    assert writer.published == 0
+
+    writer.add(0, tmp_path / "segment_000.mp4")
+    assert writer.published == 2
+    assert _uris(writer) == [
+        "scene_000_000.ts", "scene_000_001.ts",
+        "spacer_000.ts", "spacer_001.ts",
+        "scene_001_000.ts", "scene_001_001.ts",
+    ]
+    text = writer.playlist_path.read_text()
+    assert "#EXT-X-PLAYLIST-TYPE:EVENT" in text
+    assert text.count("#EXT-X-DISCONTINUITY") == 2
+    assert "#EXT-X-ENDLIST" not in text
+
+def test_failed_scenes_are_skipped_and_finalize_ends_playlist(writer, tmp_path):
+    writer.add(0, tmp_path / "segment_000.mp4")
+    writer.add(1, None)
+    writer.add(2, tmp_path / "segment_002.mp4")
+    assert writer.published == 3
+
+    # 场景 3 从未到达
+    writer.finalize()
+    assert writer.published == 4
+    assert _uris(writer)[-2:] == ["scene_002_000.ts", "scene_002_001.ts"]
+    assert not any("scene_001" in uri for uri in _uris(writer))
+    assert writer.playlist_path.read_text().rstrip().endswith("#EXT-X-ENDLIST")
+
+def test_target_duration_is_fixed_and_long_gops_are_resegmented(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(settings, "PROGRESSIVE_SEGMENT_SECONDS", 6)
+    calls = []
+
+    def hls(cmd, **kwargs):
+        calls.append(cmd)
+        # 直接复制时关键帧间隔 10 秒，强制关键帧后按 6 秒切分
+        playlist = Path(cmd[-1])
+        durations = [6.0, 4.0] if "-force_key_frames" in cmd else [10.0]
+        pattern = cmd[cmd.index("-hls_segment_filename") + 1]
+        text = "#EXTM3U\n"
+        for n, d in enumerate(durations):
+            (playlist.parent / Path(pattern % n).name).write_bytes(b"ts")
+            text += f"#EXTINF:{d:.6f},\n{Path(pattern % n).name}\n"
+        playlist.write_text(text)
+        return MagicMock()
+
+    writer = ProgressiveWriter(2)
+    with patch("src.components.progressive.subprocess.run", side_effect=hls):
+        writer.add(0, tmp_path / "segment_000.mp4")
+        first = writer.playlist_path.read_text()
+        writer.add(1, tmp_path / "segment_001.mp4")
+        writer.finalize()
+
+    # RFC 8216: 列表重新加载时 TARGETDURATION 不能变化
+    assert "#EXT-X-TARGETDURATION:6" in first
+    assert "#EXT-X-TARGETDURATION:6" in writer.playlist_path.read_text()
+    assert "-c" in calls[0] and "-force_key_frames" in calls[1]
+    assert "#EXTINF:10.000," not in writer.playlist_path.read_text()
+
+def test_spacer_is_built_outside_the_playlist_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    spacer = tmp_path / "spacer.mp4"
+    spacer.write_bytes(b"spacer")
+    locked = []
+
+    def factory(ref):
+        locked.append(writer._lock.locked())
+        return spacer
+
+    with patch("src.components.progressive.subprocess.run", side_effect=fake_hls):
+        writer = ProgressiveWriter(2, spacer_factory=factory)
+        writer.add(1, tmp_path / "segment_001.mp4")
+        writer.add(0, tmp_path / "segment_000.mp4")
+
+    # 只生成一次，且编码期间其他场景仍可追加播放列表
+    assert locked == [False]
+    assert "spacer_000.ts" in writer.playlist_path.read_text()
@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.components.assembler import Assembler
+from src.utils.encoding import RENDITIONS, get_renditions
+from src.utils.media_info import MediaInfo, MediaInfoError
+from src.utils.video_ops import build_ladder_filtergraph
+
+def test_ladder_graph_splits_source_once():
+    graph, labels = build_ladder_filtergraph(get_renditions(["1080p", "720p", "gif"]))
+
+    assert labels == ["r0", "r1", "r2"]
+    assert graph.count("[0:v]") == 1
+    assert graph.startswith("[0:v]split=3[s0][s1][s2]")
+    assert "[s1]scale=-2:720" in graph
+    assert "palettegen" in graph and "paletteuse" in graph
+    assert "trim=duration=10" in graph
+
+def test_unknown_rendition_raises():
+    with pytest.raises(ValueError, match="Unknown rendition"):
+        get_renditions(["4k"])
+
+def test_render_ladder_single_invocation_with_manifest(tmp_path):
+    source = tmp_path / "full_movie.mp4"
+    source.write_bytes(b"movie")
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        for arg in cmd:
+            if arg.endswith((".mp4", ".gif")) and "renditions" in arg:
+                Path(arg).write_bytes(b"x" * 100)
+        return MagicMock()
+
+    info = MediaInfo(format="mp4", duration=30.0, width=1280, height=720, fps=30.0)
+
+    def probe(path):
+        name = Path(path).name
+        if name == "full_movie_480p.mp4":
+            # scale=-2:480 的实际输出宽度 (1280*480/720 = 853.3 -> 854)
+            return MediaInfo(format="mp4", duration=30.0, width=854, height=480, fps=30.0)
+        if name.endswith(".gif"):
+            raise MediaInfoError("unsupported")
+        return info
+
+    with patch("src.components.assembler.settings") as mock_settings, \
+         patch("src.components.assembler.subprocess.run", side_effect=fake_run), \
+         patch("src.components.assembler.media_info.probe", side_effect=probe):
+        mock_settings.OUTPUT_DIR = tmp_path
+        mock_settings.RENDITION_LADDER = ["1080p", "720p", "480p", "gif"]
+        manifest_path = Assembler().render_ladder(str(source))
+
+    # 一次解码: 只有一个 ffmpeg 进程，只有一个输入
+    assert len(calls) == 1
+    cmd = calls[0]
+    assert cmd.count("-i") == 1
+    assert cmd.count("-c:a") == 2 and cmd[cmd.index("-c:a") + 1] == "copy"
+
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    names = [r["name"] for r in manifest["renditions"]]
+    # 源只有 720p，1080p 不放大
+    assert names == ["720p", "480p", "gif"]
+    r480 = manifest["renditions"][1]
+    assert (r480["width"], r480["height"], r480["profile"]) == (854, 480, RENDITIONS["480p"].profile)
+    assert r480["path"] == "full_movie_480p.mp4" and r480["size_bytes"] == 100
+    gif = manifest["renditions"][2]
+    assert gif["path"] == "full_movie_gif.gif" and gif["width"] is None
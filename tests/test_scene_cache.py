@@ -0,0 +1,144 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.components import scene_cache as scene_cache_module
+from src.components.scene_cache import SceneCache
+from src.core.config import settings
+from src.core.models import RenderArtifact, SceneSpec
+from src.utils.logger import metrics
+
+def _scene(scene_id="s1", description="A server answers a request"):
+    return SceneSpec(scene_id=scene_id, description=description, duration=3.0, audio_script="服务器返回响应")
+
+def _artifact(tmp_path, name="s1"):
+    video = tmp_path / f"{name}.mp4"
+    frame = tmp_path / f"{name}.png"
+    video.write_bytes(b"video " + name.encode())
+    frame.write_bytes(b"png")
+    return RenderArtifact(scene_id=name, video_path=str(video), last_frame_path=str(frame), code_content="code")
+
+@pytest.fixture
+def cache(tmp_path):
+    lib = tmp_path / "lib"
+    lib.mkdir()
+    (lib / "api_stubs.txt").write_text("stubs", encoding="utf-8")
+    return SceneCache(root=tmp_path / "scenes", lib_dir=lib)
+
+def test_key_ignores_scene_id_but_tracks_content(cache):
+    assert cache.key_for(_scene("s1")) == cache.key_for(_scene("intro_07"))
+    assert cache.key_for(_scene()) != cache.key_for(_scene(description="A client sends a request"))
+    assert cache.key_for(_scene(), "voice_a") != cache.key_for(_scene(), "voice_b")
+
+def test_key_changes_with_lib_assets_and_prompts(cache, tmp_path, monkeypatch):
+    key = cache.key_for(_scene())
+
+    (cache.lib_dir / "api_stubs.txt").write_text("stubs v2", encoding="utf-8")
+    lib_key = SceneCache(root=cache.root, lib_dir=cache.lib_dir).key_for(_scene())
+    assert lib_key != key
+
+    prompts = tmp_path / "prompts.py"
+    prompts.write_text("PROMPT = 'v2'", encoding="utf-8")
+    monkeypatch.setattr(scene_cache_module, "PROMPT_SOURCES", (prompts,))
+    assert SceneCache(root=cache.root, lib_dir=cache.lib_dir).key_for(_scene()) not in (key, lib_key)
+
+def test_store_copies_files_and_survives_run_cleanup(cache, tmp_path):
+    scene = _scene()
+    key = cache.key_for(scene)
+    art = _artifact(tmp_path)
+    assert cache.get(key, "s1") is None
+
+    cache.store(key, scene, art)
+    # 运行目录中的原文件被下一次运行覆盖/删除
+    (tmp_path / "s1.mp4").unlink()
+
+    hit = cache.get(key, "intro_07")
+    assert hit.scene_id == "intro_07"
+    assert hit.code_content == "code"
+    assert hit.video_path.startswith(str(cache.root))
+    with open(hit.video_path, "rb") as f:
+        assert f.read() == b"video s1"
+
+    assert cache.clear() == 1
+    assert cache.get(key, "s1") is None
+
+def test_evicts_least_recently_hit_entries(cache, tmp_path):
+    scenes = [_scene(f"s{i}", description=f"Scene number {i}") for i in range(3)]
+    keys = [cache.key_for(s) for s in scenes]
+    cache.store(keys[0], scenes[0], _artifact(tmp_path, "s0"))
+    cache.store(keys[1], scenes[1], _artifact(tmp_path, "s1"))
+    entry_size = SceneCache._dir_size(cache._entry_dir(keys[0]))
+    cache.max_bytes = int(entry_size * 2.5)
+
+    # s0 写入更早，但最近被命中 (其他故事板留下的 s1 不会再被使用)
+    for i, key in enumerate(keys[:2]):
+        os.utime(cache._entry_dir(key) / "entry.json", (1000 + i, 1000 + i))
+    assert cache.get(keys[0], "s0") is not None
+
+    cache.store(keys[2], scenes[2], _artifact(tmp_path, "s2"))
+    assert cache.get(keys[1], "s1") is None
+    assert cache.get(keys[0], "s0") is not None and cache.get(keys[2], "s2") is not None
+
+@pytest.fixture
+def flow(cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    received = []
+    with patch("src.core.graph.ManimRunner"):
+        from src.core.graph import ParallelManimFlow
+
+        def build(**kwargs):
+            f = ParallelManimFlow(
+                on_artifact=lambda scene_id, art: received.append(scene_id), scene_cache=cache, **kwargs
+            )
+            f.manim._run_tts = AsyncMock(return_value=("audio.mp3", 3.0))
+            return f
+        yield build, received
+
+def test_map_scenes_routes_hits_around_subgraph(flow, cache, tmp_path):
+    build, _ = flow
+    cached, fresh = _scene("s1"), _scene("s2", description="Something new")
+    f = build()
+    cache.store(f._cached_artifact(cached)[0], cached, _artifact(tmp_path))
+
+    sends = f.map_scenes({"scenes": [cached, fresh]})
+    assert [s.node for s in sends] == ["cached_scene", "process_scene"]
+    assert sends[0].arg["artifact"].scene_id == "s1"
+    assert sends[1].arg["scene_key"] == f._cached_artifact(fresh)[0]
+
+    # --rerender: 强制未命中，仍携带 key 以便覆盖旧条目
+    sends = build(rerender=["s1"]).map_scenes({"scenes": [cached]})
+    assert sends[0].node == "process_scene" and sends[0].arg["scene_key"]
+
+def test_cached_scenes_skip_generation(flow, cache, tmp_path):
+    build, received = flow
+    metrics.reset()
+    f = build()
+    scenes = [_scene("s1"), _scene("s2", description="Second")]
+    for scene in scenes:
+        cache.store(f._cached_artifact(scene)[0], scene, _artifact(tmp_path, scene.scene_id))
+
+    app = f.compile()
+    result = asyncio.run(app.ainvoke({"scenes": scenes, "output_artifacts": []}))
+
+    assert sorted(a.scene_id for a in result["output_artifacts"]) == ["s1", "s2"]
+    assert sorted(received) == ["s1", "s2"]
+    # 旁白仍需要落到运行目录，供组装使用
+    assert f.manim._run_tts.await_count == 2
+    assert metrics.cached_scenes == 2 and metrics.scene_metrics["s1"]["cached"]
+    metrics.reset()
+
+def test_finalize_stores_only_approved_artifacts(flow, cache, tmp_path):
+    build, _ = flow
+    f = build()
+    scene = _scene()
+    key = f._cached_artifact(scene)[0]
+    state = {"scene_spec": scene, "artifact": _artifact(tmp_path), "scene_key": key}
+
+    asyncio.run(f.manim.node_finalize({**state, "critic_feedback": "Text overlaps the box"}))
+    assert cache.get(key, "s1") is None
+
+    asyncio.run(f.manim.node_finalize({**state, "critic_feedback": None}))
+    assert cache.get(key, "s1") is not None
+    metrics.reset()
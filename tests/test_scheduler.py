@@ -0,0 +1,111 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from src.core.scheduler import PriorityLimiter, Scheduler, Ticket
+
+async def _run_order(limiter, tickets, hold=0.01):
+    """先占满名额，再让所有 ticket 排队，记录实际获得名额的顺序"""
+    order = []
+    blocker = Ticket(job="blocker", order=-1)
+    await limiter.acquire(blocker)
+
+    async def worker(name, ticket):
+        await limiter.acquire(ticket)
+        order.append(name)
+        await asyncio.sleep(hold)
+        limiter.release(ticket)
+
+    tasks = [asyncio.create_task(worker(name, t)) for name, t in tickets]
+    await asyncio.sleep(0)  # 全部进入等待队列
+    limiter.release(blocker)
+    await asyncio.gather(*tasks)
+    return order
+
+def test_earlier_scenes_first():
+    limiter = PriorityLimiter("render", 1, {})
+    tickets = [(f"s{i}", Ticket(order=i)) for i in (5, 2, 9, 0)]
+    assert asyncio.run(_run_order(limiter, tickets)) == ["s0", "s2", "s5", "s9"]
+
+def test_retry_boost_moves_scene_forward():
+    limiter = PriorityLimiter("render", 1, {})
+    tickets = [("s1", Ticket(order=1)), ("s4_retry", Ticket(order=4, retries=2))]
+    with patch("src.core.scheduler.settings.SCHEDULER_RETRY_BOOST", 2):
+        # rank: 4 - 2*2 = 0 < 1
+        assert asyncio.run(_run_order(limiter, tickets)) == ["s4_retry", "s1"]
+
+def test_fair_share_between_jobs():
+    limiter = PriorityLimiter("llm", 2, {})
+    tickets = [
+        ("a0", Ticket(job="a", order=0)),
+        ("a1", Ticket(job="a", order=1)),
+        ("a2", Ticket(job="a", order=2)),
+        ("b5", Ticket(job="b", order=5)),
+    ]
+
+    async def run():
+        order = []
+        holders = [Ticket(job="a", order=-2), Ticket(job="a", order=-1)]
+        for t in holders:
+            await limiter.acquire(t)
+
+        async def worker(name, ticket):
+            await limiter.acquire(ticket)
+            order.append(name)
+            await asyncio.sleep(0.01)
+            limiter.release(ticket)
+
+        tasks = [asyncio.create_task(worker(n, t)) for n, t in tickets]
+        await asyncio.sleep(0)
+        # 释放一个 a 的名额: a 仍占 1 个，b 占 0 个，b 优先
+        limiter.release(holders[0])
+        await asyncio.sleep(0)
+        limiter.release(holders[1])
+        await asyncio.gather(*tasks)
+        return order
+
+    with patch("src.core.scheduler.settings.SCHEDULER_FAIR_SHARE", True):
+        order = asyncio.run(run())
+    assert order[0] == "b5"
+    assert order[1:] == ["a0", "a1", "a2"]
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def run():
+        limiter = PriorityLimiter("lint", 1, {})
+        holder = Ticket(order=0)
+        await limiter.acquire(holder)
+        waiting = asyncio.create_task(limiter.acquire(Ticket(order=1)))
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        limiter.release(holder)
+        return limiter.active, limiter.waiting
+
+    assert asyncio.run(run()) == (0, 0)
+
+def test_bound_ticket_is_used_by_slot():
+    sched = Scheduler()
+
+    async def run():
+        seen = []
+        original = PriorityLimiter.acquire
+
+        async def spy(self, ticket):
+            seen.append(ticket)
+            await original(self, ticket)
+
+        with patch.object(PriorityLimiter, "acquire", spy):
+            with sched.bind(Ticket(job="j", order=3)):
+                async with sched.slot("render"):
+                    pass
+            async with sched.slot("render"):
+                pass
+        return seen
+
+    seen = asyncio.run(run())
+    assert (seen[0].job, seen[0].order) == ("j", 3)
+    # 未绑定时排在所有场景之后
+    assert seen[1].order > 1000
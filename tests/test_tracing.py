@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+from src.core.scheduler import PriorityLimiter, Scheduler, Ticket
+from src.utils.tracing import Span, Tracer
+
+S = 1_000_000_000
+
+def _span(span_id, name, category, start, end, parent=None, **attrs):
+    return Span(
+        span_id=span_id, parent_id=parent, name=name, category=category,
+        start_ns=int(start * S), end_ns=int(end * S), attrs={"scene_id": "s1", **attrs}
+    )
+
+def test_child_spans_inherit_scene_attributes(tmp_path):
+    tracer = Tracer()
+
+    async def run():
+        with tracer.span("node.render", "node", scene_id="scene_01", node="render", attempt="v0s0"):
+            with tracer.span("render.docker", "render"):
+                await asyncio.to_thread(lambda: None)
+
+    asyncio.run(run())
+    node, docker = sorted(tracer.spans, key=lambda s: s.start_ns)
+    assert docker.parent_id == node.span_id
+    assert docker.attrs["scene_id"] == "scene_01" and docker.attrs["attempt"] == "v0s0"
+
+    trace = json.loads(tracer.export_chrome(tmp_path / "trace.json").read_text(encoding="utf-8"))
+    events = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    tracks = {e["args"]["name"]: e["tid"] for e in trace["traceEvents"] if e["ph"] == "M"}
+    assert {e["name"] for e in events} == {"node.render", "render.docker"}
+    assert all(e["tid"] == tracks["scene_01"] for e in events)
+
+def test_span_records_errors():
+    tracer = Tracer()
+    with pytest.raises(ValueError):
+        with tracer.span("llm.chat", "llm"):
+            raise ValueError("boom")
+    assert tracer.spans[0].attrs["error"] == "ValueError"
+
+def test_critical_path_breakdown_uses_self_time():
+    tracer = Tracer()
+    tracer._spans = [
+        _span("n1", "node.plan", "node", 0, 4, node="plan"),
+        _span("l1", "llm.chat", "llm", 0.5, 3.5, parent="n1"),
+        _span("w1", "wait.llm", "wait", 0.5, 1.5, parent="l1"),
+        _span("n2", "node.tts", "node", 4, 4.2, node="tts"),
+        # 后台 TTS 任务: 超出所属节点的结束时间，不在关键路径上
+        _span("t1", "tts.synthesize", "tts", 4.1, 9, parent="n2"),
+        _span("n3", "node.render", "node", 4.2, 10, node="render"),
+        _span("r1", "render.docker", "render", 4.2, 10, parent="n3"),
+        _span("w2", "wait.render", "wait", 4.2, 6.2, parent="r1"),
+    ]
+
+    (scene,) = tracer.critical_path()
+    assert scene.scene_id == "s1"
+    assert scene.wall == pytest.approx(10)
+    b = scene.breakdown
+    assert b["llm"] == pytest.approx(2.0)
+    assert b["wait.llm"] == pytest.approx(1.0)
+    assert b["render"] == pytest.approx(3.8)
+    assert b["wait.render"] == pytest.approx(2.0)
+    assert b["node:plan"] == pytest.approx(1.0)
+    assert b["node:tts"] == pytest.approx(0.2)
+    assert "tts" not in b
+    assert tracer.summary_lines()[0].startswith("🔥 s1: 10.0s")
+
+def test_scheduler_records_queue_wait(monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setattr("src.core.scheduler.tracer", tracer)
+    sched = Scheduler()
+    sched._limiters["render"] = PriorityLimiter("render", 1, {})
+
+    async def hold():
+        async with sched.slot("render", Ticket(order=0)):
+            await asyncio.sleep(0.02)
+
+    async def run():
+        first = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with tracer.span("render.docker", "render", scene_id="s2"):
+            async with sched.slot("render", Ticket(order=1)):
+                pass
+        await first
+
+    asyncio.run(run())
+    waits = [s for s in tracer.spans if s.category == "wait"]
+    assert len(waits) == 1
+    assert waits[0].name == "wait.render" and waits[0].attrs["scene_id"] == "s2"
+    assert waits[0].duration > 0.01
@@ -0,0 +1,149 @@
+import asyncio
+import io
+import json
+import wave
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from tenacity import wait_none
+
+from src.components.tts import TTSEngine
+from src.core.config import settings
+from src.core.models import CodeGenerationRequest, SceneSpec, SentenceTiming
+from src.llm.prompts import build_code_user_prompt, build_planner_user_prompt
+from src.utils import media_info
+from src.utils.audio_ops import concat_audio, split_sentences
+
+from tests.test_media_info import mp3_bytes
+
+def wav_bytes(seconds: float, rate: int = 8000, fill: int = 0) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(bytes([fill]) * int(rate * seconds) * 2)
+    return buf.getvalue()
+
+@pytest.fixture(autouse=True)
+def clear_memo():
+    media_info._memo.clear()
+    yield
+    media_info._memo.clear()
+
+def test_split_sentences_merges_short_fragments():
+    text = "第一句话在这里。好！第二句话是问题吗？\nThird sentence here."
+    assert split_sentences(text) == [
+        "第一句话在这里。好！",
+        "第二句话是问题吗？",
+        "Third sentence here.",
+    ]
+    assert split_sentences("没有标点的一句") == ["没有标点的一句"]
+    assert split_sentences("   ") == []
+
+def test_split_english_sentences_keeps_decimals_and_abbreviations():
+    text = (
+        "Binary search runs in O(log n) time. It takes 3.5 ms on average, e.g. for 10 items. "
+        "Dr. J. Smith checked example.com today! Ok. Version 2.0 ships next week..."
+    )
+    assert split_sentences(text) == [
+        "Binary search runs in O(log n) time.",
+        "It takes 3.5 ms on average, e.g. for 10 items.",
+        "Dr. J. Smith checked example.com today! Ok.",
+        "Version 2.0 ships next week...",
+    ]
+    # 中英混排: 英文句号后没有空白时不切分
+    assert split_sentences("版本号是 3.14。下一句话") == ["版本号是 3.14。", "下一句话"]
+
+def test_concat_wav_is_lossless(tmp_path):
+    a, b = tmp_path / "a.wav", tmp_path / "b.wav"
+    a.write_bytes(wav_bytes(1.0, fill=1))
+    b.write_bytes(wav_bytes(0.5, fill=2))
+
+    out = concat_audio([a, b], tmp_path / "out.wav")
+    assert media_info.probe_duration(out) == pytest.approx(1.5)
+    with wave.open(str(out), "rb") as w:
+        frames = w.readframes(w.getnframes())
+    assert frames[:2] == b"\x01\x01" and frames[-2:] == b"\x02\x02"
+
+def test_concat_mp3_drops_info_frames(tmp_path):
+    a, b = tmp_path / "a.mp3", tmp_path / "b.mp3"
+    a.write_bytes(b"ID3\x03\x00\x00\x00\x00\x00\x00" + mp3_bytes(10, xing_frames=10))
+    b.write_bytes(mp3_bytes(20, xing_frames=20))
+
+    out = concat_audio([a, b], tmp_path / "out.mp3")
+    # 30 帧 × 1152 / 44100 (CBR 按文件大小估算，合成帧没有 padding，允许少量误差)
+    assert media_info.probe_duration(out) == pytest.approx(30 * 1152 / 44100, abs=5e-3)
+
+def test_prompts_include_narration_timing():
+    scene = SceneSpec(scene_id="s1", description="d", duration=3.5, audio_script="甲。乙。")
+    timing = [SentenceTiming(text="甲。", start=0, end=1.2), SentenceTiming(text="乙。", start=1.2, end=3.0)]
+
+    assert "NARRATION TIMING" in build_planner_user_prompt(scene, timing)
+    code_prompt = build_code_user_prompt(CodeGenerationRequest(scene=scene), timing=timing)
+    assert "[1.2s - 3.0s] 乙。" in code_prompt
+    # 单句旁白没有节拍可对齐
+    assert "NARRATION TIMING" not in build_planner_user_prompt(scene, timing[:1])
+
+class TestChunkedGenerate:
+    @pytest.fixture
+    def tts(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+        engine = TTSEngine()
+        engine.retry_wait = wait_none()
+        return engine
+
+    def _serve(self, tts, durations):
+        """每句合成返回不同 URL，下载内容为对应时长的 WAV"""
+        calls = []
+
+        async def call(**kwargs):
+            calls.append(kwargs["text"])
+            response = MagicMock(status_code=200)
+            response.output = {"audio": {"url": f"http://audio/{len(calls)}"}}
+            return response
+
+        def handler(request):
+            index = int(str(request.url).rsplit("/", 1)[1])
+            return httpx.Response(200, content=wav_bytes(durations[index - 1], fill=index))
+
+        tts._transport = httpx.MockTransport(handler)
+        return calls, call
+
+    def test_sentences_synthesized_in_parallel_with_timing(self, tts):
+        calls, call = self._serve(tts, [1.0, 2.0, 0.5])
+        text = "第一句旁白内容。第二句旁白内容！第三句旁白内容？"
+
+        with patch("src.components.tts.dashscope.AioMultiModalConversation.call", new=AsyncMock(side_effect=call)):
+            path = asyncio.run(tts.generate_async(text, "s1"))
+
+        assert sorted(calls) == sorted(split_sentences(text))
+        assert tts.get_duration(path) == pytest.approx(3.5)
+
+        manifest = json.loads(tts.timing_path("s1").read_text(encoding="utf-8"))
+        assert manifest["duration"] == pytest.approx(3.5)
+        assert [(s["start"], s["end"]) for s in manifest["sentences"]] == [(0.0, 1.0), (1.0, 3.0), (3.0, 3.5)]
+        assert tts.cached_duration(text) == pytest.approx(3.5)
+
+    def test_editing_one_sentence_only_resynthesizes_it(self, tts):
+        calls, call = self._serve(tts, [1.0, 1.0, 1.0])
+
+        with patch("src.components.tts.dashscope.AioMultiModalConversation.call", new=AsyncMock(side_effect=call)):
+            asyncio.run(tts.generate_async("第一句旁白内容。第二句旁白内容。", "s1"))
+            asyncio.run(tts.generate_async("第一句旁白内容。第二句已经修改。", "s2"))
+
+        assert len(calls) == 3
+        assert calls[-1] == "第二句已经修改。"
+        assert [t.text for t in tts.load_timing("s2")] == ["第一句旁白内容。", "第二句已经修改。"]
+
+    def test_chunking_disabled_synthesizes_whole_script(self, tts, monkeypatch):
+        monkeypatch.setattr(settings, "TTS_SENTENCE_CHUNKING", False)
+        calls, call = self._serve(tts, [2.0])
+        text = "第一句旁白内容。第二句旁白内容。"
+
+        with patch("src.components.tts.dashscope.AioMultiModalConversation.call", new=AsyncMock(side_effect=call)):
+            asyncio.run(tts.generate_async(text, "s1"))
+
+        assert calls == [text]
+        assert len(tts.load_timing("s1")) == 1
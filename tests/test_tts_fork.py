@@ -0,0 +1,92 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.components.tts import DurationEstimator
+from src.core.config import settings
+from src.core.models import SceneSpec
+
+@pytest.fixture
+def graph(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path)
+    with patch("src.core.graph.ManimRunner"):
+        from src.core.graph import ManimGraph
+        g = ManimGraph()
+    g.tts = MagicMock()
+    g.tts.estimator = DurationEstimator(path=tmp_path / "rate.json")
+    g.tts.cached_duration.return_value = None
+    return g
+
+def _scene(text="一二三四五六七八九十一二三四五六七八九十"):
+    return SceneSpec(scene_id="s1", description="d", duration=1.0, audio_script=text)
+
+def test_estimator_calibrates_from_observations(tmp_path):
+    est = DurationEstimator(path=tmp_path / "rate.json")
+    assert est.estimate("一" * 20) == 5.0  # 默认 4 字/秒
+
+    est.observe("一" * 60, 30.0)          # 实测 2 字/秒
+    reloaded = DurationEstimator(path=tmp_path / "rate.json")
+    assert reloaded.chars_per_second == 2.0
+    assert reloaded.estimate("一" * 20) == 10.0
+
+@pytest.mark.asyncio
+async def test_tts_runs_in_background_with_estimated_duration(graph):
+    release = asyncio.Event()
+
+    async def slow_generate(text, scene_id):
+        await release.wait()
+        return "/tmp/s1.mp3"
+
+    graph.tts.generate_async.side_effect = slow_generate
+    graph.tts.get_duration.return_value = 5.2
+
+    update = await graph.node_tts({"scene_spec": _scene()})
+
+    # 不等待合成，立即按字数估算 (20 字 / 4 = 5s，+0.5 余量)
+    assert update["audio_pending"] is True
+    assert update["scene_spec"].duration == 5.5
+
+    release.set()
+    state = {"scene_spec": update["scene_spec"], "audio_pending": True, "code": "code"}
+    result = await graph.node_reconcile_audio(state)
+
+    assert result["audio_mismatch"] is False
+    assert result["scene_spec"].duration == 5.7
+    assert graph.edge_router_after_reconcile({**state, **result}) == "render"
+
+@pytest.mark.asyncio
+async def test_reconcile_requests_regeneration_when_duration_is_far_off(graph):
+    async def generate(text, scene_id):
+        return "/tmp/s1.mp3"
+
+    graph.tts.generate_async.side_effect = generate
+    graph.tts.get_duration.return_value = 12.0
+
+    update = await graph.node_tts({"scene_spec": _scene()})
+    state = {"scene_spec": update["scene_spec"], "audio_pending": True, "code": "old code", "retries": 1}
+    result = await graph.node_reconcile_audio(state)
+
+    assert result["audio_mismatch"] is True
+    assert result["code"] is None
+    assert result["scene_spec"].duration == 12.5
+    assert graph.edge_router_after_reconcile({**state, **result}) == "generate"
+
+    # 重新生成后再次经过 reconcile 时直接放行
+    again = await graph.node_reconcile_audio({**state, **result})
+    assert again == {"audio_mismatch": False}
+
+@pytest.mark.asyncio
+async def test_tts_uses_real_duration_on_cache_hit(graph):
+    async def generate(text, scene_id):
+        return "/tmp/s1.mp3"
+
+    graph.tts.cached_duration.return_value = 3.0
+    graph.tts.generate_async.side_effect = generate
+    graph.tts.get_duration.return_value = 3.0
+
+    update = await graph.node_tts({"scene_spec": _scene()})
+
+    assert update["audio_pending"] is False
+    assert update["scene_spec"].duration == 3.5
+    assert graph._tts_jobs == {}
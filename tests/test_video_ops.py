@@ -0,0 +1,45 @@
+import pytest
+
+from src.utils.video_ops import TimelineClip, build_filtergraph
+
+def _clips():
+    return [
+        TimelineClip(video_path="v0.mp4", audio_path="a0.m4a", video_duration=3.0, duration=5.0),
+        TimelineClip(video_path="v1.mp4", audio_path=None, video_duration=4.0, duration=4.0),
+        TimelineClip(video_path="v2.mp4", audio_path="a2.m4a", video_duration=6.0, duration=2.0),
+    ]
+
+def test_filtergraph_with_spacers():
+    inputs, graph = build_filtergraph(_clips(), 1920, 1080, 30, spacer=1.0)
+
+    assert inputs == ["-i", "v0.mp4", "-i", "a0.m4a", "-i", "v1.mp4", "-i", "v2.mp4", "-i", "a2.m4a"]
+    # 输入序号与 -i 顺序一致
+    assert "[0:v]" in graph and "[1:a]" in graph and "[2:v]" in graph and "[3:v]" in graph and "[4:a]" in graph
+    # 画面补齐到音频时长 (5 - 3 + 1 帧)，过长的画面截断到音频时长
+    assert "tpad=stop_mode=clone:stop_duration=2.033" in graph
+    assert "trim=duration=2," in graph
+    # 无音频的场景使用静音
+    assert "anullsrc=r=44100:cl=stereo,aformat=sample_fmts=fltp,atrim=duration=4[a1]" in graph
+    # 3 个场景 + 2 段黑屏
+    assert graph.count("color=c=black:s=1920x1080:r=30:d=1") == 2
+    assert graph.endswith("[v0][a0][sv0][sa0][v1][a1][sv1][sa1][v2][a2]concat=n=5:v=1:a=1[outv][outa]")
+
+def test_filtergraph_with_xfade_transitions():
+    _, graph = build_filtergraph(_clips(), 1280, 720, 25, transition="fade", transition_duration=0.5)
+
+    assert "color=" not in graph
+    assert "[v0][v1]xfade=transition=fade:duration=0.5:offset=4.5[vx1]" in graph
+    assert "[vx1][v2]xfade=transition=fade:duration=0.5:offset=8[outv]" in graph
+    assert "[ax1][a2]acrossfade=d=0.5[outa]" in graph
+
+def test_transition_is_clamped_to_shortest_clip():
+    clips = [
+        TimelineClip(video_path="v0.mp4", video_duration=0.6, duration=0.6),
+        TimelineClip(video_path="v1.mp4", video_duration=2.0, duration=2.0),
+    ]
+    _, graph = build_filtergraph(clips, 640, 360, 30, transition="fade", transition_duration=1.0)
+    assert "xfade=transition=fade:duration=0.3:offset=0.3[outv]" in graph
+
+def test_filtergraph_requires_clips():
+    with pytest.raises(ValueError):
+        build_filtergraph([], 640, 360, 30)